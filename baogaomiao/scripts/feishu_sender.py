@@ -76,7 +76,7 @@ class FeishuSender:
                 else:
                     results.append({'success': False, 'error': f'消息 {i}/3 发送失败: {response_data.get("msg", "未知错误")}'})
 
-                # 每条消息间隔1秒，避免限流
+                # 每条消息间隔1秒，避免限流（自定义机器人 webhook 不经过 feishu_http 限流）
                 if i < len(messages):
                     time.sleep(1)
 
@@ -136,7 +136,6 @@ class FeishuSender:
 
         try:
             import subprocess
-            import time
 
             # 支持单条消息或列表消息（分批发送）
             messages = content if isinstance(content, list) else [content]
@@ -155,10 +154,6 @@ class FeishuSender:
                 else:
                     results.append({'success': False, 'error': f'消息 {i}/3 发送失败: {result.stderr}'})
 
-                # 每条消息间隔1秒，避免限流
-                if i < len(messages):
-                    time.sleep(1)
-
             all_success = all(r['success'] for r in results)
             if all_success:
                 return {
@@ -221,7 +216,8 @@ class FeishuSender:
             from scripts.feishu_bot_notifier import FeishuBotNotifier
 
             notifier = FeishuBotNotifier()
-            results = notifier.send_image_batch(screenshot_paths, delay=1)
+            # 限流由共享的飞书客户端按接口频控处理，无需固定间隔
+            results = notifier.send_image_batch(screenshot_paths)
 
             if results['success'] == results['total']:
                 return {
@@ -9,13 +9,23 @@ B站收藏夹视频自动总结工具
 4. AI生成结构化摘要
 5. 保存到飞书Base
 6. 更新处理记录
+
+批量处理默认走流水线：字幕提取、AI 摘要、写入飞书三个阶段各有独立的线程数，
+阶段之间用有界队列衔接，网络/LLM 等待可以重叠；每个视频完成一个阶段就写入检查点，
+中途崩溃后重新运行会从上次完成的阶段继续（--serial 恢复逐个处理）。
 """
 
 import argparse
 import json
 import logging
 import os
+import queue
+import random
 import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional
@@ -23,6 +33,11 @@ from typing import Dict, List, Optional
 import requests
 from openai import OpenAI
 
+# 引入 feishu-universal 的共享 token 提供者
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent / "feishu-universal" / "scripts"))
+from feishu_http import get_feishu_client
+from feishu_token_provider import FeishuTokenError, get_token_provider, get_user_token
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -30,6 +45,22 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# 流水线各阶段默认线程数（可在 config.json 的 pipeline.concurrency 中覆盖）
+PIPELINE_CONCURRENCY = {"subtitle": 4, "summary": 3, "save": 1}
+# 阶段之间队列的容量
+PIPELINE_QUEUE_SIZE = 16
+# 流水线检查点文件（可在 config.json 的 pipeline.checkpoint_file 中覆盖）
+DEFAULT_CHECKPOINT_FILE = "pipeline_checkpoint.json"
+
+# 长字幕分段提取要点时的并发上限和重试次数（可在 config.json 的 ai 中覆盖）
+DEFAULT_MAP_CONCURRENCY = 4
+DEFAULT_MAP_RETRIES = 3
+# 重试退避基数（秒），第 n 次重试等待 base * 2^n 加随机抖动
+MAP_RETRY_BACKOFF = 2.0
+
+# 通知下一阶段结束的哨兵
+_STOP = object()
+
 
 class BilibiliSummarizer:
     """B站视频总结器"""
@@ -49,7 +80,16 @@ class BilibiliSummarizer:
 
         # 加载飞书配置
         self.feishu_config = self._load_feishu_config()
-        self.tenant_access_token = None
+
+        # 流水线检查点（bvid -> 已完成阶段及中间结果）
+        pipeline_config = self.config.get("pipeline", {})
+        self.checkpoint_path = Path(pipeline_config.get("checkpoint_file", DEFAULT_CHECKPOINT_FILE))
+        self._state_lock = threading.Lock()
+
+        # 所有视频共享的分段要点提取并发上限（流水线中多个摘要线程同时运行时也不超过）
+        self._map_slots = threading.BoundedSemaphore(
+            max(1, self.config.get("ai", {}).get("map_concurrency", DEFAULT_MAP_CONCURRENCY))
+        )
 
     def _init_ai_client(self) -> Optional[OpenAI]:
         """初始化 DeepSeek AI 客户端"""
@@ -192,11 +232,10 @@ class BilibiliSummarizer:
                 }
 
                 headers = {
-                    "Authorization": f"Bearer {token}",
                     "Content-Type": "application/json; charset=utf-8"
                 }
 
-                response = requests.post(url, headers=headers, json=payload, timeout=10)
+                response = self._feishu_client().post(url, token=token, headers=headers, json=payload, timeout=10)
                 result = response.json()
 
                 if result.get("code") == 0:
@@ -495,47 +534,14 @@ class BilibiliSummarizer:
         chunks = self._split_text(transcript, max_length)
         logger.info(f"字幕分为 {len(chunks)} 段处理")
 
-        # 收集所有核心观点
-        all_key_points = []
-
-        for i, chunk in enumerate(chunks):
-            logger.info(f"处理字幕段 {i+1}/{len(chunks)}...")
-
-            prompt = f"""请从以下B站视频字幕中提取核心内容，要求详细、易懂：
-
-视频：{video_info['title']}
-作者：{video_info['author']}
-
-字幕内容：
-{chunk}
-
-请按以下要求提取：
-1. 如果是教程类视频（how-to），请提取具体步骤，每步都要详细
-2. 如果有观点，请完整描述观点的背景、论据和结论
-3. 如果有技术术语，请用中学生能理解的语言解释
-4. 每个要点要独立完整，包含必要的上下文
-
-请只输出要点列表，每项一行，不要编号，不要其他内容。"""
-
-            try:
-                response = self.ai_client.chat.completions.create(
-                    model=self.config["ai"]["model"],
-                    messages=[
-                        {"role": "system", "content": "你是专业的视频内容分析助手，擅长提取核心观点。"},
-                        {"role": "user", "content": prompt}
-                    ],
-                    max_tokens=1000,
-                    temperature=self.config["ai"].get("temperature", 0.7)
-                )
-
-                content = response.choices[0].message.content.strip()
-                points = [p.strip() for p in content.split('\n') if p.strip() and len(p.strip()) > 2]
-                all_key_points.extend(points)
-                logger.info(f"  提取到 {len(points)} 个观点")
-
-            except Exception as e:
-                logger.error(f"  AI 调用失败: {e}")
-                continue
+        # 各段并行提取要点（map），按段落顺序合并
+        concurrency = max(1, self.config["ai"].get("map_concurrency", DEFAULT_MAP_CONCURRENCY))
+        with ThreadPoolExecutor(max_workers=min(len(chunks), concurrency)) as executor:
+            chunk_points = list(executor.map(
+                lambda args: self._extract_key_points(args[1], video_info, args[0], len(chunks)),
+                enumerate(chunks)
+            ))
+        all_key_points = [point for points in chunk_points for point in points]
 
         if not all_key_points:
             logger.error("未能提取任何核心观点")
@@ -595,6 +601,52 @@ class BilibiliSummarizer:
             logger.error(f"摘要生成失败: {e}")
             return None
 
+    def _extract_key_points(self, chunk: str, video_info: Dict, index: int, total: int) -> List[str]:
+        """提取单段字幕的核心要点（失败时指数退避重试，最终失败返回空列表）"""
+        prompt = f"""请从以下B站视频字幕中提取核心内容，要求详细、易懂：
+
+视频：{video_info['title']}
+作者：{video_info['author']}
+
+字幕内容：
+{chunk}
+
+请按以下要求提取：
+1. 如果是教程类视频（how-to），请提取具体步骤，每步都要详细
+2. 如果有观点，请完整描述观点的背景、论据和结论
+3. 如果有技术术语，请用中学生能理解的语言解释
+4. 每个要点要独立完整，包含必要的上下文
+
+请只输出要点列表，每项一行，不要编号，不要其他内容。"""
+
+        retries = self.config["ai"].get("map_retries", DEFAULT_MAP_RETRIES)
+        for attempt in range(retries + 1):
+            try:
+                with self._map_slots:
+                    logger.info(f"处理字幕段 {index+1}/{total}...")
+                    response = self.ai_client.chat.completions.create(
+                        model=self.config["ai"]["model"],
+                        messages=[
+                            {"role": "system", "content": "你是专业的视频内容分析助手，擅长提取核心观点。"},
+                            {"role": "user", "content": prompt}
+                        ],
+                        max_tokens=1000,
+                        temperature=self.config["ai"].get("temperature", 0.7)
+                    )
+
+                content = response.choices[0].message.content.strip()
+                points = [p.strip() for p in content.split('\n') if p.strip() and len(p.strip()) > 2]
+                logger.info(f"  字幕段 {index+1}/{total} 提取到 {len(points)} 个观点")
+                return points
+
+            except Exception as e:
+                if attempt >= retries:
+                    logger.error(f"  字幕段 {index+1}/{total} AI 调用失败（已重试 {retries} 次）: {e}")
+                    return []
+                delay = MAP_RETRY_BACKOFF * (2 ** attempt) + random.uniform(0, 1)
+                logger.warning(f"  字幕段 {index+1}/{total} AI 调用失败，{delay:.1f}s 后重试: {e}")
+                time.sleep(delay)
+
     def _split_text(self, text: str, max_length: int) -> List[str]:
         """智能分段（避免在句子中间分割）"""
         if len(text) <= max_length:
@@ -693,14 +745,14 @@ class BilibiliSummarizer:
         url = f"https://open.feishu.cn/open-apis/bitable/v1/apps/{app_token}/tables/{table_id}/records"
 
         headers = {
-            "Authorization": f"Bearer {token}",
             "Content-Type": "application/json; charset=utf-8"
         }
 
         payload = {"fields": fields}
 
         try:
-            response = requests.post(url, headers=headers, json=payload, timeout=10)
+            # 共享连接池 + 多维表格限流，触发频控时自动退避
+            response = self._feishu_client().post(url, token=token, headers=headers, json=payload, timeout=10)
 
             if response.status_code == 200:
                 data = response.json()
@@ -719,91 +771,33 @@ class BilibiliSummarizer:
             return self._backup_to_local(video_info, summary, fields)
 
     def _get_tenant_access_token(self) -> Optional[str]:
-        """获取 tenant_access_token（应用身份）"""
-        if self.tenant_access_token:
-            return self.tenant_access_token
-
+        """获取 tenant_access_token（应用身份，共享缓存，过期前自动刷新）"""
         app_id = os.getenv("FEISHU_APP_ID") or os.getenv("LARK_APP_ID")
         app_secret = os.getenv("FEISHU_APP_SECRET") or os.getenv("LARK_APP_SECRET")
         if not app_id or not app_secret:
             logger.error("缺少 FEISHU_APP_ID / FEISHU_APP_SECRET")
             return None
 
-        url = "https://open.feishu.cn/open-apis/auth/v3/app_access_token/internal"
-        payload = {"app_id": app_id, "app_secret": app_secret}
         try:
-            resp = requests.post(url, json=payload, timeout=10)
-            data = resp.json()
-            if data.get("code") != 0:
-                logger.error(f"获取 tenant_access_token 失败: {data.get('msg')}")
-                return None
-            self.tenant_access_token = data.get("app_access_token")
-            return self.tenant_access_token
-        except Exception as e:
-            logger.error(f"获取 tenant_access_token 异常: {e}")
+            return get_token_provider(app_id, app_secret).get_app_token()
+        except FeishuTokenError as e:
+            logger.error(f"获取 tenant_access_token 失败: {e}")
             return None
 
-    def _get_valid_user_token(self) -> Optional[str]:
-        """获取有效的 user_access_token（自动刷新）"""
-        import time
+    def _feishu_client(self):
+        """获取共享的飞书客户端（连接池 + 限流；请求时显式传入 token）"""
+        feishu_config = self.feishu_config or {}
+        app_id = os.getenv("FEISHU_APP_ID") or os.getenv("LARK_APP_ID") or feishu_config.get("app_id")
+        app_secret = os.getenv("FEISHU_APP_SECRET") or os.getenv("LARK_APP_SECRET") or feishu_config.get("app_secret")
+        return get_feishu_client(app_id, app_secret)
 
-        config = self.feishu_config
-        if not config:
+    def _get_valid_user_token(self) -> Optional[str]:
+        """获取有效的 user_access_token（自动刷新，多进程共享同一份 refresh_token）"""
+        if not self.feishu_config:
             logger.error("飞书用户配置不存在")
             return None
 
-        current_time = int(time.time())
-        expires_at = config.get('expires_at', 0)
-
-        # 如果 token 还有 30 分钟以上有效期，直接返回
-        if expires_at - current_time > 1800:
-            return config['user_access_token']
-
-        # 需要刷新 token
-        logger.info('Token 即将过期，正在刷新...')
-
-        app_id = config.get('app_id')
-        app_secret = config.get('app_secret')
-        refresh_token = config.get('refresh_token')
-
-        if not all([app_id, app_secret, refresh_token]):
-            logger.error("飞书配置不完整，无法刷新 token")
-            return None
-
-        # 刷新 user_access_token
-        url = 'https://open.feishu.cn/open-apis/authen/v1/refresh_access_token'
-        headers = {'Content-Type': 'application/json; charset=utf-8'}
-        data = {
-            'grant_type': 'refresh_token',
-            'refresh_token': refresh_token,
-            'app_id': app_id,
-            'app_secret': app_secret
-        }
-
-        try:
-            response = requests.post(url, headers=headers, json=data, timeout=10)
-            result = response.json()
-
-            if result.get('code') != 0:
-                logger.error(f'刷新 Token 失败: {result.get("msg")}')
-                return None
-
-            # 更新配置
-            config['user_access_token'] = result['data']['access_token']
-            config['refresh_token'] = result['data']['refresh_token']
-            config['expires_at'] = current_time + result['data']['expires_in']
-
-            # 保存配置
-            config_path = os.path.expanduser("~/.feishu_user_config.json")
-            with open(config_path, 'w') as f:
-                json.dump(config, f, indent=2)
-
-            logger.info('✅ Token 刷新成功')
-            return config['user_access_token']
-
-        except Exception as e:
-            logger.error(f'Token 刷新异常: {e}')
-            return None
+        return get_user_token(fallback_config=self.feishu_config)
 
     def send_notification(self, success_count: int, total_count: int, videos: list):
         """发送飞书通知消息"""
@@ -951,11 +945,10 @@ class BilibiliSummarizer:
                     }
 
             headers = {
-                "Authorization": f"Bearer {token}",
                 "Content-Type": "application/json; charset=utf-8"
             }
 
-            response = requests.post(url, headers=headers, json=payload, timeout=10)
+            response = self._feishu_client().post(url, token=token, headers=headers, json=payload, timeout=10)
             result = response.json()
 
             if result.get("code") == 0:
@@ -1006,10 +999,152 @@ class BilibiliSummarizer:
 
     def mark_processed(self, bvid: str):
         """标记视频已处理"""
-        self.processed_videos.add(bvid)
-        self._save_processed_videos()
+        with self._state_lock:
+            self.processed_videos.add(bvid)
+            self._save_processed_videos()
         logger.info(f"已标记处理: {bvid}")
 
+    def _load_checkpoint(self) -> Dict:
+        """加载流水线检查点"""
+        if self.checkpoint_path.exists():
+            try:
+                with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                logger.warning(f"检查点文件损坏，忽略: {e}")
+        return {}
+
+    def _save_checkpoint(self, checkpoint: Dict):
+        """原子写入流水线检查点（调用方持有 _state_lock）"""
+        tmp = self.checkpoint_path.with_name(self.checkpoint_path.name + ".tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.checkpoint_path)
+
+    def _update_checkpoint(self, checkpoint: Dict, bvid: str, **entry):
+        """记录视频完成的阶段（entry 为 None 时删除该视频的检查点）"""
+        with self._state_lock:
+            if entry:
+                checkpoint[bvid] = {**checkpoint.get(bvid, {}), **entry,
+                                    "updated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+            else:
+                checkpoint.pop(bvid, None)
+            self._save_checkpoint(checkpoint)
+
+    def run_pipeline(self, videos: List[Dict], checkpoint: Dict = None) -> List[Dict]:
+        """流水线处理多个视频
+
+        字幕提取 → AI 摘要 → 写入飞书，三个阶段各有独立线程数，阶段之间通过有界队列衔接。
+        每完成一个阶段写入检查点：已提取字幕的视频直接读取字幕文件，已生成摘要的视频直接写入飞书；
+        写入飞书后标记已处理并删除检查点。某个视频在任一阶段失败时直接结束，不影响其他视频。
+
+        Args:
+            videos: 待处理视频列表
+            checkpoint: 已加载的检查点（None 时从文件读取）
+
+        Returns:
+            List[Dict]: 成功处理的视频（与输入顺序一致）
+        """
+        if checkpoint is None:
+            checkpoint = self._load_checkpoint()
+        workers = dict(PIPELINE_CONCURRENCY)
+        workers.update(self.config.get("pipeline", {}).get("concurrency", {}))
+        succeeded = [None] * len(videos)
+
+        def subtitle_stage(item):
+            video = item["video"]
+            state = checkpoint.get(video["bvid"], {})
+            subtitle_file = state.get("subtitle_file")
+            if subtitle_file and Path(subtitle_file).exists():
+                logger.info(f"从检查点恢复字幕: {video['bvid']}")
+                with open(subtitle_file, 'r', encoding='utf-8') as f:
+                    item["transcript"] = f.read()
+                return True
+
+            item["transcript"] = self.extract_subtitle(video["bvid"])
+            if not item["transcript"]:
+                logger.warning(f"跳过无字幕视频: {video['title']}")
+                return False
+            subtitle_file = Path(self.config["paths"]["subtitles_dir"]) / f"{video['bvid']}.srt"
+            self._update_checkpoint(checkpoint, video["bvid"], stage="subtitle", video=video,
+                                    subtitle_file=str(subtitle_file))
+            return True
+
+        def summary_stage(item):
+            video = item["video"]
+            item["summary"] = checkpoint.get(video["bvid"], {}).get("summary")
+            if item["summary"]:
+                logger.info(f"从检查点恢复摘要: {video['bvid']}")
+                return True
+
+            item["summary"] = self.generate_summary(item["transcript"], video)
+            if not item["summary"]:
+                logger.warning(f"摘要生成失败，跳过写入飞书: {video['title']}")
+                return False
+            self._update_checkpoint(checkpoint, video["bvid"], stage="summary", video=video,
+                                    summary=item["summary"])
+            return True
+
+        def save_stage(item):
+            video = item["video"]
+            self.save_to_feishu(item["summary"], video, item["transcript"])
+            self.mark_processed(video["bvid"])
+            self._update_checkpoint(checkpoint, video["bvid"])
+            succeeded[item["index"]] = video
+            return True
+
+        stages = [
+            ("subtitle", subtitle_stage),
+            ("summary", summary_stage),
+            ("save", save_stage)
+        ]
+        queues = [queue.Queue(maxsize=PIPELINE_QUEUE_SIZE) for _ in stages]
+        threads = []
+
+        for position, (name, fn) in enumerate(stages):
+            count = max(1, workers.get(name, 1))
+            next_queue = queues[position + 1] if position + 1 < len(stages) else None
+            next_count = max(1, workers.get(stages[position + 1][0], 1)) if next_queue else 0
+            remaining = [count]
+            remaining_lock = threading.Lock()
+
+            def run(fn=fn, name=name, inbox=queues[position], outbox=next_queue,
+                    outbox_workers=next_count, remaining=remaining, remaining_lock=remaining_lock):
+                while True:
+                    item = inbox.get()
+                    if item is _STOP:
+                        break
+                    try:
+                        proceed = fn(item)
+                    except Exception as e:
+                        logger.error(f"处理失败 {item['video']['bvid']}（{name}）: {e}")
+                        proceed = False
+                    if proceed and outbox is not None:
+                        outbox.put(item)
+
+                # 本阶段最后一个线程退出时，通知下一阶段结束
+                with remaining_lock:
+                    remaining[0] -= 1
+                    last = remaining[0] == 0
+                if last and outbox is not None:
+                    for _ in range(outbox_workers):
+                        outbox.put(_STOP)
+
+            for i in range(count):
+                thread = threading.Thread(target=run, name=f"bili-{name}-{i}", daemon=True)
+                thread.start()
+                threads.append(thread)
+
+        for index, video in enumerate(videos):
+            queues[0].put({"index": index, "video": video})
+        for _ in range(max(1, workers.get(stages[0][0], 1))):
+            queues[0].put(_STOP)
+
+        for thread in threads:
+            thread.join()
+
+        return [video for video in succeeded if video is not None]
+
     def process_video(self, video: Dict) -> bool:
         """处理单个视频"""
         bvid = video["bvid"]
@@ -1039,8 +1174,12 @@ class BilibiliSummarizer:
             logger.error(f"处理失败 {bvid}: {e}")
             return False
 
-    def run(self):
-        """执行主流程"""
+    def run(self, serial: bool = False):
+        """执行主流程
+
+        Args:
+            serial: 逐个处理视频（默认使用流水线）
+        """
         logger.info("=" * 50)
         logger.info("B站视频自动总结 - 开始执行")
         logger.info("=" * 50)
@@ -1054,24 +1193,46 @@ class BilibiliSummarizer:
         # 筛选新视频
         new_videos = self.filter_new_videos(videos)
 
+        # 上次中断的视频（可能已不满足筛选条件，如收藏时间早于今天）继续处理
+        checkpoint = {} if serial else self._load_checkpoint()
+
+        # 已写入飞书但未来得及删除检查点（标记已处理后中断）的视频不再重复写入
+        stale = [bvid for bvid in checkpoint if bvid in self.processed_videos]
+        if stale:
+            logger.info(f"清理 {len(stale)} 个已处理视频的残留检查点")
+            with self._state_lock:
+                for bvid in stale:
+                    checkpoint.pop(bvid)
+                self._save_checkpoint(checkpoint)
+
+        pending_bvids = {video["bvid"] for video in new_videos}
+        resumed = [state["video"] for bvid, state in checkpoint.items()
+                   if bvid not in pending_bvids and state.get("video")]
+        if resumed:
+            logger.info(f"从检查点恢复 {len(resumed)} 个未完成的视频")
+            new_videos = resumed + new_videos
+
         if not new_videos:
             logger.info("没有新视频需要处理")
             return
 
-        # 处理每个视频
-        success_count = 0
-        processed_videos_info = []  # 收集处理的视频信息
-
-        for video in new_videos:
-            logger.info(f"\n处理: {video['title']}")
-            if self.process_video(video):
-                success_count += 1
-                # 收集视频信息用于通知
-                processed_videos_info.append({
-                    "title": video.get("title", ""),
-                    "url": video.get("url", ""),
-                    "bvid": video.get("bvid", "")
-                })
+        if serial:
+            succeeded = []
+            for video in new_videos:
+                logger.info(f"\n处理: {video['title']}")
+                if self.process_video(video):
+                    succeeded.append(video)
+        else:
+            logger.info(f"流水线处理 {len(new_videos)} 个视频")
+            succeeded = self.run_pipeline(new_videos, checkpoint)
+
+        success_count = len(succeeded)
+        # 收集视频信息用于通知
+        processed_videos_info = [{
+            "title": video.get("title", ""),
+            "url": video.get("url", ""),
+            "bvid": video.get("bvid", "")
+        } for video in succeeded]
 
         logger.info("=" * 50)
         logger.info(f"处理完成: {success_count}/{len(new_videos)} 成功")
@@ -1088,6 +1249,7 @@ def main():
     parser.add_argument("--fetch", action="store_true", help="获取视频列表")
     parser.add_argument("--list-new", action="store_true", help="列出新视频")
     parser.add_argument("--run", action="store_true", help="执行完整流程")
+    parser.add_argument("--serial", action="store_true", help="逐个处理视频（不使用流水线）")
     parser.add_argument("--video", help="处理指定视频")
     parser.add_argument("--config", default="scripts/config.json", help="配置文件路径")
 
@@ -1109,7 +1271,7 @@ def main():
             # 处理指定视频
             pass
         elif args.run:
-            summarizer.run()
+            summarizer.run(serial=args.serial)
         else:
             parser.print_help()
 
@@ -12,6 +12,10 @@ import asyncio
 from datetime import datetime
 from pathlib import Path
 
+# 与 feishu-bot 共用 JSON 流式读取
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / 'feishu-bot' / 'scripts'))
+from json_stream import iter_json_items
+
 # MediaCrawler 路径
 MEDIACRAWLER_HOME = os.path.expanduser("~/MediaCrawler")
 MEDIACRAWLER_VENV = os.path.join(MEDIACRAWLER_HOME, ".venv")
@@ -193,36 +197,26 @@ class XHSCollector:
         print(f"📂 读取笔记文件: {latest_notes_file}")
 
         try:
-            with open(latest_notes_file, 'r', encoding='utf-8') as f:
-                notes_data = json.load(f)
+            # 逐条读取并标准化笔记（不保留原始数据）
+            notes = []
+            notes_by_id = {}
+            for item in iter_json_items(latest_notes_file):
+                note = self._normalize_note(item)
+                note['comments'] = []
+                notes.append(note)
+                if note.get('note_id'):
+                    notes_by_id.setdefault(note['note_id'], []).append(note)
 
-            # 读取评论数据（如果存在）
-            comments_data = {}
+            # 逐条读取评论数据（如果存在），直接附加到对应笔记上
             if comments_files:
                 latest_comments_file = max(comments_files, key=os.path.getmtime)
                 print(f"📂 读取评论文件: {latest_comments_file}")
-                with open(latest_comments_file, 'r', encoding='utf-8') as f:
-                    comments = json.load(f)
-                    # 按 note_id 索引评论
-                    for comment in comments:
-                        note_id = comment.get('note_id')
-                        if note_id:
-                            if note_id not in comments_data:
-                                comments_data[note_id] = []
-                            comments_data[note_id].append(comment)
-                print(f"✓ 加载了 {len(comments)} 条评论")
-
-            # 标准化笔记格式
-            notes = []
-            for item in notes_data:
-                note = self._normalize_note(item)
-                # 将评论附加到笔记上
-                note_id = note.get('note_id')
-                if note_id in comments_data:
-                    note['comments'] = comments_data[note_id]
-                else:
-                    note['comments'] = []
-                notes.append(note)
+                comment_count = 0
+                for comment in iter_json_items(latest_comments_file):
+                    comment_count += 1
+                    for note in notes_by_id.get(comment.get('note_id'), ()):
+                        note['comments'].append(comment)
+                print(f"✓ 加载了 {comment_count} 条评论")
 
             return notes
 
@@ -12,6 +12,9 @@
 - 从文件读取链接
 - 从混合文本中提取链接
 
+解析结果写入与 feishu-bot 共用的短链接缓存（short_link_cache），
+已解析过的短链接直接读取缓存，不再发请求
+
 作者：大秘书系统
 版本：v1.0
 创建时间：2026-02-11
@@ -19,17 +22,33 @@
 
 import requests
 import re
+import sys
 import json
 import argparse
 from datetime import datetime
 from urllib.parse import urlparse, parse_qs, unquote
 from pathlib import Path
 
+# 与 feishu-bot 共用短链接缓存
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / 'feishu-bot' / 'scripts'))
+from short_link_cache import get_short_link_cache
+
 
 class ShortLinkParser:
     """小红书短链接解析器"""
 
-    def __init__(self):
+    def __init__(self, use_cache=True):
+        """
+        Args:
+            use_cache: 是否使用短链接缓存
+        """
+        self.cache = None
+        if use_cache:
+            try:
+                self.cache = get_short_link_cache()
+            except Exception as e:
+                print(f"⚠️  短链接缓存不可用，跳过缓存: {e}")
+
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (iPhone; CPU iPhone OS 16_6 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.6 Mobile/15E148 Safari/604.1',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
@@ -55,6 +74,17 @@ class ShortLinkParser:
             'error': None
         }
 
+        cached = self.cache.get(url) if self.cache else None
+        if cached:
+            if cached['ok'] and self._is_valid_xhs_url(cached['full_url']):
+                result['long_url'] = cached['full_url']
+                result['note_id'] = cached['note_id'] or self._extract_note_id(cached['full_url'])
+                result['status'] = 'success'
+            else:
+                result['status'] = 'error'
+                result['error'] = cached['error'] or 'Redirected to error page'
+            return result
+
         try:
             # 方法1: 不跟随重定向，获取 Location 头
             # 注意：xhslink.com 必须使用 GET 请求，HEAD 返回 404
@@ -69,10 +99,21 @@ class ShortLinkParser:
                     result['long_url'] = long_url
                     result['note_id'] = self._extract_note_id(long_url)
                     result['status'] = 'success'
+                    # 只缓存拿到笔记ID的结果
+                    if self.cache and result['note_id']:
+                        self.cache.put(url, long_url, result['note_id'])
                 else:
                     # 可能是错误页面
                     result['status'] = 'error'
                     result['error'] = 'Redirected to error page'
+                    if self.cache:
+                        # 登录跳转等仍带笔记ID的地址照常缓存（飞书机器人可以使用），
+                        # 否则按失效链接的有效期缓存
+                        note_id = self._extract_note_id(long_url) if long_url else None
+                        if note_id:
+                            self.cache.put(url, long_url, note_id)
+                        else:
+                            self.cache.put_failure(url, result['error'])
             elif response.status_code == 200:
                 # 没有重定向，直接使用当前 URL
                 long_url = response.url
@@ -82,6 +123,8 @@ class ShortLinkParser:
             else:
                 result['status'] = 'error'
                 result['error'] = f'HTTP {response.status_code}'
+                if self.cache and 400 <= response.status_code < 500 and response.status_code != 429:
+                    self.cache.put_failure(url, result['error'])
 
         except requests.Timeout:
             result['status'] = 'error'
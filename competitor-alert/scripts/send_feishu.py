@@ -5,11 +5,17 @@
 """
 
 import os
+import sys
 import json
 import requests
 from datetime import datetime
 from pathlib import Path
 
+# 引入 feishu-universal 的共享 token 提供者
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / 'feishu-universal' / 'scripts'))
+from feishu_token_provider import get_token_provider, FeishuTokenError
+from feishu_http import get_feishu_client
+
 
 class FeishuNotifier:
     """飞书通知器"""
@@ -40,10 +46,6 @@ class FeishuNotifier:
         if not self.app_id or not self.app_secret:
             self._load_config(config_path)
 
-        self.app_access_token = None
-        self.access_token = None
-        self.token_expire_time = 0
-
     def _load_config(self, config_path):
         """从配置文件加载飞书凭据"""
         if config_path is None:
@@ -79,27 +81,26 @@ class FeishuNotifier:
                     self.webhook_url = config.get('webhook_url', '')
                     self.user_open_id = config.get('user_open_id', None)
 
-    def _get_app_token(self):
-        """获取 app_access_token"""
-        url = f"{self.base_url}/auth/v3/app_access_token/internal"
+    @property
+    def token_provider(self):
+        """共享的 token 提供者（按 app_id 复用）"""
+        return get_token_provider(self.app_id, self.app_secret)
 
-        payload = {
-            "app_id": self.app_id,
-            "app_secret": self.app_secret
-        }
+    def _get_app_token(self):
+        """获取 app_access_token（共享缓存，过期前自动刷新）"""
+        if not self.app_id or not self.app_secret:
+            return None
 
         try:
-            response = requests.post(url, json=payload)
-            if response.status_code == 200:
-                data = response.json()
-                if data.get("code") == 0:
-                    self.app_access_token = data.get("app_access_token")
-                else:
-                    print(f"获取 token 失败: {data.get('msg')}")
-            else:
-                print(f"请求失败: {response.status_code}")
-        except Exception as e:
-            print(f"请求 token 出错: {e}")
+            return self.token_provider.get_app_token()
+        except FeishuTokenError as e:
+            print(f"获取 token 失败: {e}")
+            return None
+
+    @property
+    def app_access_token(self):
+        """当前有效的 app_access_token"""
+        return self._get_app_token()
 
     def get_access_token(self):
         """
@@ -112,31 +113,10 @@ class FeishuNotifier:
         if self.webhook_url:
             return None  # Webhook 不需要 token
 
-        # 检查 token 是否过期
-        if self.access_token and datetime.now().timestamp() < self.token_expire_time:
-            return self.access_token
-
-        # 获取新的 token
-        url = "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal"
-        payload = {
-            "app_id": self.app_id,
-            "app_secret": self.app_secret
-        }
-
         try:
-            response = requests.post(url, json=payload)
-            data = response.json()
-
-            if data.get('code') == 0:
-                self.access_token = data['tenant_access_token']
-                # token 有效期 2 小时，提前 5 分钟刷新
-                self.token_expire_time = datetime.now().timestamp() + 7200 - 300
-                return self.access_token
-            else:
-                print(f"获取 token 失败: {data}")
-                return None
-        except Exception as e:
-            print(f"请求 token 出错: {e}")
+            return self.token_provider.get_tenant_token()
+        except FeishuTokenError as e:
+            print(f"获取 token 失败: {e}")
             return None
 
     def send_alert(self, scan_result):
@@ -186,7 +166,6 @@ class FeishuNotifier:
 
         url = f"{self.base_url}/im/v1/messages?receive_id_type=open_id"
         headers = {
-            "Authorization": f"Bearer {self.app_access_token}",
             "Content-Type": "application/json"
         }
         payload = {
@@ -196,7 +175,8 @@ class FeishuNotifier:
         }
 
         try:
-            response = requests.post(url, headers=headers, json=payload)
+            client = get_feishu_client(self.app_id, self.app_secret)
+            response = client.post(url, headers=headers, json=payload)
             if response.status_code == 200:
                 data = response.json()
                 if data.get("code") == 0:
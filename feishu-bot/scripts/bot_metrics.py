@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Prometheus 指标
+
+功能：
+1. 轻量的 Counter / Histogram 实现，输出 Prometheus 文本格式（无需 prometheus_client）
+2. 采集时回调（collector），用于队列深度、token 刷新次数等现成状态
+3. 预定义机器人用到的指标：webhook 请求、飞书 API 调用、子进程耗时
+
+作者：大秘书系统
+版本：v1.0
+创建时间：2026-03-21
+"""
+
+import time
+import logging
+import subprocess
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# 默认直方图分桶（秒），覆盖 webhook 毫秒级响应到采集子进程的分钟级耗时
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """单调递增计数器"""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(n, '')) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """累积分桶直方图"""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        # key -> [各桶计数, 总和, 总数]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(n, '')) for n in self.labelnames)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """计时上下文：with histogram.time(name='x'): ..."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    labels = _format_labels(self.labelnames, key, ('le', _format_value(bound)))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics = []
+        # fn() -> [(name, type, help, [(labels dict, value)])]
+        self._collectors = []
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, fn):
+        """注册采集时回调（返回现成状态，如队列深度）"""
+        self._collectors.append(fn)
+
+    def render(self):
+        """输出 Prometheus 文本格式"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+
+        for collector in self._collectors:
+            try:
+                families = collector()
+            except Exception as e:
+                logger.warning(f"指标采集失败 ({getattr(collector, '__name__', collector)}): {e}")
+                continue
+            for name, metric_type, documentation, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in samples:
+                    names = tuple(labels)
+                    lines.append(f"{name}{_format_labels(names, tuple(labels[n] for n in names))} {_format_value(value)}")
+
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+http_requests = registry.counter(
+    'feishu_bot_http_requests_total', 'HTTP 请求数', ['method', 'route', 'status'])
+http_latency = registry.histogram(
+    'feishu_bot_http_request_duration_seconds', 'HTTP 请求耗时', ['route'])
+feishu_api_latency = registry.histogram(
+    'feishu_bot_feishu_api_duration_seconds', '飞书开放平台调用耗时（每次尝试）', ['endpoint'])
+feishu_api_responses = registry.counter(
+    'feishu_bot_feishu_api_responses_total', '飞书开放平台响应数（按 HTTP 状态和业务错误码）',
+    ['endpoint', 'status', 'code'])
+subprocess_latency = registry.histogram(
+    'feishu_bot_subprocess_duration_seconds', '外部子进程（MediaCrawler、研报爬虫等）耗时', ['name', 'outcome'])
+
+
+def observe_feishu_response(api_path, status_code, code, seconds):
+    """feishu_http 响应监听器：记录飞书调用耗时和错误码"""
+    # 只保留前三段路径（如 /im/v1/messages），避免 app_token/table_id 造成标签爆炸
+    endpoint = '/'.join(api_path.split('?', 1)[0].split('/')[:4])
+    feishu_api_latency.observe(seconds, endpoint=endpoint)
+    feishu_api_responses.inc(endpoint=endpoint, status=status_code, code=code if code is not None else '')
+
+
+@contextmanager
+def time_subprocess(name):
+    """记录子进程耗时：with time_subprocess('mediacrawler'): subprocess.run(...)"""
+    start = time.perf_counter()
+    outcome = 'completed'
+    try:
+        yield
+    except subprocess.TimeoutExpired:
+        outcome = 'timeout'
+        raise
+    except Exception:
+        outcome = 'error'
+        raise
+    finally:
+        subprocess_latency.observe(time.perf_counter() - start, name=name, outcome=outcome)
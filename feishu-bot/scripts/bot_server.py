@@ -15,19 +15,32 @@ import json
 import re
 import yaml
 import logging
+import time
+import argparse
 import subprocess
-import requests
+import importlib.util
 from datetime import datetime
 from pathlib import Path
 from short_link_resolver import ShortLinkResolver
 from content_router import ContentRouter
-from material_organizer import MaterialOrganizer
+from material_organizer import MaterialOrganizer, CATEGORY_NAMES
 from media_crawler_importer import MediaCrawlerImporter
+from message_dispatcher import MessageDispatcher
+from event_deduplicator import EventDeduplicator
+from state_store import create_state_store
+from job_queue import JobQueue, JobWorkerPool, JobFailed
+from log_sink import LogSink
+from command_router import CommandRouter
+import bot_metrics
 # 引入 baogaomiao skill 的组件
 sys.path.insert(0, str(Path(__file__).parent.parent.parent / "baogaomiao" / "scripts"))
 from pdf_extractor import PDFExtractor
 from feishu_sender import FeishuSender, format_xhs_note
-from flask import Flask, request, jsonify
+# 引入 feishu-universal 的共享 token 提供者
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "feishu-universal" / "scripts"))
+from feishu_token_provider import get_token_provider, FeishuTokenError
+from feishu_http import get_feishu_client, add_response_listener
+from flask import Flask, request, jsonify, g
 
 # 设置日志
 logging.basicConfig(
@@ -54,12 +67,40 @@ def load_config():
         },
         'server': {
             'host': '0.0.0.0',
-            'port': 5001
+            'port': 5001,
+            'workers': 1
         },
         'data': {
             'collection_dir': SKILL_DIR / 'data' / 'collections',
             'log_dir': SKILL_DIR / 'logs'
         },
+        'dispatcher': {
+            'max_workers': 4,
+            'max_pending': 100
+        },
+        'async_server': {
+            'max_pending': 1000,
+            'blocking_workers': 16
+        },
+        'dedup': {
+            'ttl_seconds': 3600,
+            'max_size': 10000,
+            'persist': True,
+            'persist_file': SKILL_DIR / 'data' / 'seen_events.jsonl',
+            'purge_every': 1000
+        },
+        'state': {
+            'backend': 'memory',
+            'path': SKILL_DIR / 'data' / 'state.db'
+        },
+        'jobs': {
+            'db_path': SKILL_DIR / 'data' / 'jobs.db',
+            'concurrency': 2,
+            'max_running': 2,
+            'lease_seconds': 900,
+            'max_attempts': 3,
+            'type_limits': {'collect': 1, 'eastmoney_crawl': 1}
+        },
         # 对标参考文件夹路径
         'material_base': Path.home() / "Desktop" / "DaMiShuSystem-main-backup" / "工作空间" / "对标参考"
     }
@@ -79,10 +120,19 @@ else:
 Path(config['data']['collection_dir']).mkdir(parents=True, exist_ok=True)
 Path(config['data']['log_dir']).mkdir(parents=True, exist_ok=True)
 
+# 消息日志和访问日志由后台线程批量写入，请求线程不做磁盘 I/O
+log_sink = LogSink(config['data']['log_dir'])
+
+# ============================================
+# 跨请求状态存储（多 worker 部署时需使用 sqlite 后端）
+# ============================================
+state_store = create_state_store(config.get('state'))
+
 # ============================================
 # 东方财富研报选择存储
 # ============================================
-eastmoney_selection = {
+EASTMONEY_SELECTION_KEY = 'eastmoney_selection'
+EASTMONEY_SELECTION_IDLE = {
     'status': 'idle',  # idle, waiting, ready, timeout, cancelled
     'total_count': 0,
     'infocodes': [],
@@ -90,6 +140,74 @@ eastmoney_selection = {
     'timestamp': None
 }
 
+
+def get_eastmoney_selection():
+    """读取当前研报选择状态"""
+    return state_store.get(EASTMONEY_SELECTION_KEY, EASTMONEY_SELECTION_IDLE)
+
+
+def apply_eastmoney_reply(text):
+    """
+    把用户回复应用到等待中的研报选择（原子读-改-写，多 worker 下不会互相覆盖）
+
+    Args:
+        text: 用户消息文本
+
+    Returns:
+        tuple: (回复内容, 响应 msg)，不是选择回复或当前未在等待时返回 None
+    """
+    result = {}
+
+    def _apply(selection):
+        if selection['status'] != 'waiting':
+            return selection
+
+        # 检测数字选择（如 "1,3,5" 或 "1 3 5"）
+        if re.match(r'^[\d\s,，]+$', text):
+            parts = re.split(r'[\s,，]+', text.strip())
+            indices = []
+            for part in parts:
+                if part.isdigit():
+                    idx = int(part) - 1  # 转换为0索引
+                    if 0 <= idx < selection['total_count']:
+                        indices.append(idx)
+
+            selected_infocodes = [selection['infocodes'][i] for i in indices]
+            selection['selection'] = selected_infocodes
+            selection['status'] = 'ready'
+            logger.info(f"[Eastmoney] User selected {len(selected_infocodes)} reports: {selected_infocodes}")
+            result['reply'] = (f"✅ 已收到您的选择，共 {len(selected_infocodes)} 份报告。正在处理...",
+                               'eastmoney selection recorded')
+
+        # 检测特殊命令
+        elif text in ['全部保留', 'all', 'All', 'ALL']:
+            selection['selection'] = selection['infocodes']
+            selection['status'] = 'ready'
+            logger.info(f"[Eastmoney] User selected: keep all ({len(selection['infocodes'])} reports)")
+            result['reply'] = (f"✅ 已保留全部 {len(selection['infocodes'])} 份报告。正在处理...",
+                               'eastmoney keep all')
+
+        elif text in ['全部删除', 'delete all', 'Delete All', 'DELETE ALL']:
+            selection['selection'] = []
+            selection['status'] = 'ready'
+            logger.info("[Eastmoney] User selected: delete all")
+            result['reply'] = ("✅ 已删除全部报告。", 'eastmoney delete all')
+
+        elif text in ['取消', 'cancel', 'Cancel', 'CANCEL']:
+            selection['selection'] = None
+            selection['status'] = 'cancelled'
+            logger.info("[Eastmoney] User cancelled")
+            result['reply'] = ("❌ 已取消操作。", 'eastmoney cancelled')
+
+        else:
+            return selection
+
+        selection['timestamp'] = datetime.now().isoformat()
+        return selection
+
+    state_store.update(EASTMONEY_SELECTION_KEY, _apply, default=EASTMONEY_SELECTION_IDLE)
+    return result.get('reply')
+
 # 初始化内容路由器、材料组织器和MediaCrawler导入器
 content_router = ContentRouter(config.get('material_base'))
 material_organizer = MaterialOrganizer(config.get('material_base'))
@@ -106,26 +224,23 @@ class FeishuAPI:
         self.app_id = config['feishu']['app_id']
         self.app_secret = config['feishu']['app_secret']
         self.base_url = "https://open.feishu.cn/open-apis"
-        self.app_access_token = None
+        self.token_provider = get_token_provider(self.app_id, self.app_secret)
+        # 共享连接池 + 限流（触发频控时自动退避）
+        self.client = get_feishu_client(self.app_id, self.app_secret)
         self._get_app_token()
 
     def _get_app_token(self):
-        """获取 app_access_token"""
-        url = f"{self.base_url}/auth/v3/app_access_token/internal"
-        payload = {
-            "app_id": self.app_id,
-            "app_secret": self.app_secret
-        }
-        response = requests.post(url, json=payload)
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("code") == 0:
-                self.app_access_token = data.get("app_access_token")
-                logger.info("✓ 获取 app_access_token 成功")
-            else:
-                logger.error(f"获取 token 失败: {data.get('msg')}")
-        else:
-            logger.error(f"请求失败: {response.status_code}")
+        """获取 app_access_token（共享缓存，过期前自动刷新）"""
+        try:
+            return self.token_provider.get_app_token()
+        except FeishuTokenError as e:
+            logger.error(f"获取 token 失败: {e}")
+            return None
+
+    @property
+    def app_access_token(self):
+        """当前有效的 app_access_token"""
+        return self._get_app_token()
 
     def send_message(self, open_id, text, receive_id_type="open_id"):
         """发送文本消息到飞书
@@ -138,12 +253,8 @@ class FeishuAPI:
         Returns:
             bool: 是否发送成功
         """
-        if not self.app_access_token:
-            self._get_app_token()
-
         url = f"{self.base_url}/im/v1/messages?receive_id_type={receive_id_type}"
         headers = {
-            "Authorization": f"Bearer {self.app_access_token}",
             "Content-Type": "application/json"
         }
         payload = {
@@ -153,7 +264,7 @@ class FeishuAPI:
         }
 
         try:
-            response = requests.post(url, headers=headers, json=payload, timeout=10)
+            response = self.client.post(url, headers=headers, json=payload, timeout=10)
             if response.status_code == 200:
                 data = response.json()
                 if data.get("code") == 0:
@@ -222,12 +333,13 @@ class MediaCrawlerClient:
             logger.info(f"执行命令: {' '.join(cmd)}")
 
             # 执行采集（后台运行）
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=600  # 10分钟超时
-            )
+            with bot_metrics.time_subprocess('mediacrawler'):
+                result = subprocess.run(
+                    cmd,
+                    capture_output=True,
+                    text=True,
+                    timeout=600  # 10分钟超时
+                )
 
             if result.returncode == 0:
                 logger.info("✓ MediaCrawler 执行成功")
@@ -431,20 +543,57 @@ universal_crawler_client = UniversalCrawlerClient()
 # 消息处理逻辑
 # ============================================
 
+# 支持采集的链接
+URL_PATTERN = re.compile(r'https?://(xhs\.com|xhslink\.com|xiaohongshu\.com|mp\.weixin\.qq\.com|v\.douyin\.com)')
+# 从消息中提取完整链接（到空白或中文标点为止）
+URL_EXTRACT_PATTERN = re.compile(r'https?://[^\s，。、；！？」》）]+')
+# 批量链接每处理多少个发送一次进度
+BATCH_PROGRESS_EVERY = 10
+
+
 class MessageHandler:
     """消息处理器"""
 
     def __init__(self):
-        self.handlers = {
-            'url': self.handle_url,
-            'collect': self.handle_collect,
-            'upload': self.handle_upload,
-            'status': self.handle_status,
-            'help': self.handle_help,
-            'ping': self.handle_ping,
-            'choice': self.handle_eastmoney_choice,  # 东方财富爬虫选择
-            'eastmoney': self.handle_eastmoney_crawl  # 东方财富爬虫触发
-        }
+        self.router = self._build_router()
+
+    def _build_router(self):
+        """构建命令路由表（正则只编译一次；精确匹配优先，其余按注册顺序匹配）"""
+        router = CommandRouter(fallback=lambda m, text, uid: self.handle_unknown(text, uid))
+
+        # 东方财富爬虫选择消息（JSON格式或纯数字）
+        router.pattern('eastmoney_choice', r'^\d+$',
+                       lambda m, text, uid: self._handle_eastmoney_selection(text, uid))
+        router.pattern('eastmoney_choice', r'^\{.*"(?:choice|index)"\s*:.*\}$',
+                       lambda m, text, uid: self._handle_eastmoney_selection(text, uid), flags=re.DOTALL)
+
+        # 链接
+        router.pattern('url', URL_PATTERN.pattern, lambda m, text, uid: self.handle_url(text, uid), search=True)
+
+        # 查询后台任务（状态 <任务ID>，不带 ID 时列出最近任务）
+        router.pattern('job_status', r'^状态\s*[:：]?\s*(?P<job_id>[0-9a-f]{8})?$',
+                       lambda m, text, uid: self.handle_job_status(m.group('job_id'), uid))
+
+        # 耗时命令进入任务队列，由后台 worker 执行
+        router.prefix('collect', ['采集：', '采集:'], self._route_collect)
+        router.prefix('import', ['导入'], self._route_import)
+
+        # 检索对标材料库
+        router.prefix('search', ['搜索：', '搜索:'], lambda m, text, uid: self.handle_search(m.group('rest').strip(), uid))
+
+        router.exact('upload', ['upload'], lambda m, text, uid: self.handle_upload(uid))
+        router.prefix('upload', ['上传'], lambda m, text, uid: self.handle_upload(uid))
+        router.exact('status', ['查看状态', 'status', '最近采集', '统计'],
+                     lambda m, text, uid: self.handle_status(uid))
+
+        # 东方财富爬虫命令
+        router.pattern('eastmoney_crawl', r'爬.*东方财富|爬.*研报|eastmoney', self._route_eastmoney_crawl,
+                       flags=re.IGNORECASE, search=True)
+
+        router.exact('help', ['help', '帮助', '?'], lambda m, text, uid: self.handle_help(uid))
+        router.exact('ping', ['ping'], lambda m, text, uid: self.handle_ping(uid))
+
+        return router
 
     def process(self, message_text, user_open_id):
         """处理消息
@@ -456,53 +605,22 @@ class MessageHandler:
         Returns:
             str: 回复文本
         """
-        message_text = message_text.strip()
-
-        # 检测东方财富爬虫选择消息（JSON格式或纯数字）
-        try:
-            data = json.loads(message_text)
-            if 'choice' in data or 'index' in data:
-                return self._handle_eastmoney_selection(message_text, user_open_id)
-        except json.JSONDecodeError:
-            if message_text.isdigit():
-                return self._handle_eastmoney_selection(message_text, user_open_id)
-
-        # 检测链接
-        if self.is_url(message_text):
-            return self.handle_url(message_text, user_open_id)
-
-        # 检测命令
-        if message_text.startswith('采集：') or message_text.startswith('采集:'):
-            keyword = message_text.split(':', 1)[1].strip()
-            return self.handle_collect(keyword, user_open_id)
-
-        if message_text.startswith('导入') or message_text.startswith('导入:'):
-            import_params = message_text.split(':', 1)[1].strip()
-            return self.handle_import(import_params, user_open_id)
-
-        if message_text.startswith('上传') or message_text == 'upload':
-            return self.handle_upload(user_open_id)
-
-        if message_text in ['查看状态', 'status', '最近采集', '统计']:
-            return self.handle_status(user_open_id)
-
-        # 检测东方财富爬虫命令
-        if re.search(r'爬.*东方财富|爬.*研报|eastmoney', message_text, re.IGNORECASE):
-            return self.handle_eastmoney_crawl(message_text, user_open_id)
+        return self.router.dispatch(message_text.strip(), user_open_id)
 
-        if message_text in ['help', '帮助', '?']:
-            return self.handle_help()
+    def _route_collect(self, match, message_text, user_open_id):
+        keyword = match.group('rest').strip()
+        return self.enqueue_job('collect', {'params': keyword}, user_open_id, f"关键词采集 {keyword}")
 
-        if message_text == 'ping':
-            return self.handle_ping(user_open_id)
+    def _route_import(self, match, message_text, user_open_id):
+        import_params = match.group('rest').lstrip(':：').strip()
+        return self.enqueue_job('import', {'params': import_params}, user_open_id, f"导入 {import_params}")
 
-        # 无法识别
-        return self.handle_unknown(message_text, user_open_id)
+    def _route_eastmoney_crawl(self, match, message_text, user_open_id):
+        return self.enqueue_job('eastmoney_crawl', {'message_text': message_text}, user_open_id, "东方财富研报采集")
 
     def is_url(self, text):
         """检测是否为URL"""
-        url_pattern = r'https?://(xhs\.com|xhslink\.com|xiaohongshu\.com|mp\.weixin\.qq\.com|v\.douyin\.com)'
-        return bool(re.search(url_pattern, text))
+        return bool(URL_PATTERN.search(text))
 
     def _handle_eastmoney_selection(self, message_text, user_open_id):
         """处理东方财富爬虫的PDF选择
@@ -553,7 +671,11 @@ class MessageHandler:
             return msg
 
     def handle_url(self, url, user_open_id):
-        """处理链接采集 - 使用智能内容路由"""
+        """处理链接采集 - 使用智能内容路由（消息中有多个链接时批量处理）"""
+        links = [link for link in URL_EXTRACT_PATTERN.findall(url) if URL_PATTERN.match(link)]
+        if len(links) > 1:
+            return self.handle_url_batch(list(dict.fromkeys(links)), user_open_id)
+
         logger.info(f"处理链接: {url}")
 
         # 使用智能路由器检测和路由内容
@@ -583,6 +705,60 @@ class MessageHandler:
 
         return route_result.get('message', '✅ 收到链接')
 
+    def handle_url_batch(self, urls, user_open_id):
+        """批量处理多个链接 - 解析/检测/抓取/整理流水线并发执行
+
+        Args:
+            urls: 链接列表（已去重）
+            user_open_id: 用户 open_id
+
+        Returns:
+            str: 汇总回复文本
+        """
+        total = len(urls)
+        logger.info(f"批量处理 {total} 个链接")
+        feishu_api.send_message(user_open_id, f"✅ 收到 {total} 个链接，正在并行处理...")
+
+        def fetch(link, route_result):
+            if route_result.get('action') == 'mediate':
+                return self.process_xhs_content(link, route_result.get('result', {}))
+            if route_result.get('action') == 'process_wechat':
+                return self.process_wechat_content(link, route_result.get('result', {}))
+            return None
+
+        def on_progress(done, total, result):
+            if done < total and done % BATCH_PROGRESS_EVERY == 0:
+                feishu_api.send_message(user_open_id, f"⏳ 链接处理进度：{done}/{total}")
+
+        results = content_router.batch_route(
+            urls, user_open_id, feishu_api,
+            fetch=fetch,
+            on_progress=on_progress
+        )
+
+        succeeded = [r for r in results if r.get('success')]
+        # 整批完成后统一重建一次索引（逐条重建会重复改写 index.md，且多个线程同时写入）
+        if succeeded:
+            material_organizer.update_index()
+        failed = [(link, r) for link, r in zip(urls, results) if not r.get('success')]
+
+        lines = [f"📦 批量链接处理完成：成功 {len(succeeded)}/{total}"]
+        counts = {}
+        for r in succeeded:
+            counts[r['type']] = counts.get(r['type'], 0) + 1
+        lines += [f"• {content_type}: {count}" for content_type, count in counts.items()]
+        if failed:
+            lines.append("\n❌ 失败的链接：")
+            for link, r in failed[:10]:
+                reason = r.get('error') or r.get('result', {}).get('error') or r.get('type')
+                lines.append(f"• {link[:60]} ({reason})")
+            if len(failed) > 10:
+                lines.append(f"... 另有 {len(failed) - 10} 个")
+
+        msg = "\n".join(lines)
+        feishu_api.send_message(user_open_id, msg)
+        return msg
+
     def process_xhs_content(self, url, route_info):
         """处理小红书内容（视频/图文）- 调用MediaCrawler和媒体处理
 
@@ -679,6 +855,7 @@ class MessageHandler:
 3. 查看采集日志
 """
             feishu_api.send_message(user_open_id, error_msg)
+            raise JobFailed(result.get('error', '未知错误'))
 
         return start_msg
 
@@ -729,13 +906,15 @@ class MessageHandler:
         """处理 MediaCrawler 采集结果导入
 
         Args:
-            import_params: 导入参数（"最新"|"天数"|全部"）
+            import_params: 导入参数（"最新"|"天数"|全部"，附加"完整"时忽略导入记录全量导入）
             user_open_id: 飞书用户ID
         """
         logger.info(f"处理导入请求: {import_params}")
 
         # 解析参数
         parts = import_params.split()
+        full = '完整' in parts or '--full' in parts
+        parts = [p for p in parts if p not in ('完整', '--full')]
         import_type = parts[0] if parts else '最新'
 
         days = 7
@@ -755,14 +934,14 @@ class MessageHandler:
 
         # 执行导入
         try:
-            stats = mediacrawler_importer.import_collections(days=days, limit=limit)
+            stats = mediacrawler_importer.import_collections(days=days, limit=limit, full=full)
 
             # 构建结果消息
             msg = f"""✅ 导入完成！
 
 📊 导入统计：
-• 处理文件：{stats['files']}
-• 导入成功：{stats['imported']}/{stats['total']}
+• 处理文件：{stats['files']}（未变化 {stats['unchanged_files']}）
+• 导入成功：{stats['imported']}/{stats['total']}（已导入过 {stats['skipped']}）
 • 视频笔记：{stats['video']}
 • 图文笔记：{stats['image']}
 • 导入失败：{stats['failed']}
@@ -785,8 +964,7 @@ class MessageHandler:
 2. 确认 MediaCrawler 已完成采集
 3. 查看 importer 日志获取详细错误信息"""
             feishu_api.send_message(user_open_id, error_msg)
-
-            return error_msg
+            raise JobFailed(str(e))
 
     def handle_status(self, user_open_id):
         """处理状态查询"""
@@ -813,6 +991,44 @@ class MessageHandler:
 
         return msg
 
+    def handle_search(self, query, user_open_id):
+        """检索对标材料库
+
+        Args:
+            query: 关键词（空格分隔多个词）
+            user_open_id: 用户 open_id
+
+        Returns:
+            str: 回复文本
+        """
+        if not query:
+            msg = "⚠️ 请提供关键词，例：搜索：睡眠 面膜"
+            feishu_api.send_message(user_open_id, msg)
+            return msg
+
+        try:
+            results = material_organizer.search(query, limit=10)
+        except Exception as e:
+            logger.error(f"检索材料库失败: {e}")
+            msg = f"❌ 检索失败: {str(e)}"
+            feishu_api.send_message(user_open_id, msg)
+            return msg
+
+        if not results:
+            msg = f"🔍 没有找到与「{query}」相关的材料"
+        else:
+            lines = [f"🔍 「{query}」相关材料（{len(results)} 条）\n"]
+            for i, item in enumerate(results, 1):
+                lines.append(f"{i}. [{item['date']}] {item['title']}")
+                likes = f" · 👍 {item['likes']}" if item['category'] != 'wechat' else ''
+                lines.append(f"   {CATEGORY_NAMES[item['category']]}{likes} · {item['folder']}")
+                if item['snippet']:
+                    lines.append(f"   {item['snippet']}")
+            msg = "\n".join(lines)
+
+        feishu_api.send_message(user_open_id, msg)
+        return msg
+
     def handle_eastmoney_crawl(self, message_text, user_open_id):
         """处理东方财富研报爬虫命令
 
@@ -845,13 +1061,14 @@ class MessageHandler:
         wrapper_script = Path.home() / "Desktop" / "DMS" / "bin" / "eastmoney_wrapper.py"
 
         try:
-            result = subprocess.run(
-                ["python3", str(wrapper_script), "crawl", "--json"],
-                capture_output=True,
-                text=True,
-                timeout=600,  # 10分钟超时
-                cwd=Path.home() / "Desktop" / "DMS"
-            )
+            with bot_metrics.time_subprocess('eastmoney_crawler'):
+                result = subprocess.run(
+                    ["python3", str(wrapper_script), "crawl", "--json"],
+                    capture_output=True,
+                    text=True,
+                    timeout=600,  # 10分钟超时
+                    cwd=Path.home() / "Desktop" / "DMS"
+                )
 
             if result.returncode == 0:
                 try:
@@ -872,7 +1089,7 @@ class MessageHandler:
 错误：{result_data.get('message', '未知错误')}
 """
                         feishu_api.send_message(user_open_id, error_msg)
-                        return error_msg
+                        raise JobFailed(result_data.get('message', '未知错误'))
                 except json.JSONDecodeError:
                     # 如果不是JSON格式，直接返回输出
                     success_msg = f"""✅ 东方财富研报采集完成！
@@ -895,7 +1112,7 @@ class MessageHandler:
 3. 查看爬虫日志
 """
                 feishu_api.send_message(user_open_id, error_msg)
-                return error_msg
+                raise JobFailed(f"退出码 {result.returncode}")
 
         except subprocess.TimeoutExpired:
             timeout_msg = """❌ 采集超时（10分钟）
@@ -906,14 +1123,61 @@ class MessageHandler:
 3. 稍后重试
 """
             feishu_api.send_message(user_open_id, timeout_msg)
-            return timeout_msg
+            raise JobFailed("采集超时（10分钟）")
+        except JobFailed:
+            raise
         except Exception as e:
             error_msg = f"""❌ 采集异常
 
 错误：{str(e)}
 """
             feishu_api.send_message(user_open_id, error_msg)
-            return error_msg
+            raise JobFailed(str(e))
+
+    def enqueue_job(self, job_type, payload, user_open_id, label):
+        """提交耗时任务到任务队列
+
+        Args:
+            job_type: 任务类型（见 JOB_HANDLERS）
+            payload: 任务参数
+            user_open_id: 用户 open_id
+            label: 任务描述（用于回复）
+
+        Returns:
+            str: 回复文本
+        """
+        job_id = job_queue.enqueue(job_type, payload, user_open_id)
+        job_pool.notify()
+
+        msg = f"""📝 已加入任务队列：{label}
+
+任务ID：{job_id}
+💡 发送"状态 {job_id}"查看进度"""
+        feishu_api.send_message(user_open_id, msg)
+        return msg
+
+    def handle_job_status(self, job_id, user_open_id):
+        """查询任务进度
+
+        Args:
+            job_id: 任务ID（None 时列出该用户最近的任务）
+            user_open_id: 用户 open_id
+
+        Returns:
+            str: 回复文本
+        """
+        if job_id:
+            job = job_queue.get(job_id)
+            msg = format_job(job) if job else f"❌ 未找到任务：{job_id}"
+        else:
+            jobs = job_queue.recent(user_open_id)
+            if jobs:
+                msg = "📋 最近任务\n\n" + "\n\n".join(format_job(job) for job in jobs)
+            else:
+                msg = "📋 暂无任务"
+
+        feishu_api.send_message(user_open_id, msg)
+        return msg
 
     def handle_help(self, user_open_id=None):
         """处理帮助"""
@@ -938,6 +1202,11 @@ class MessageHandler:
 导入：最新 [导入最近7天采集数据]
 导入：7 [导入7天内采集数据]
 导入：全部 [导入所有采集数据]
+（默认跳过已导入的文件和笔记，末尾加"完整"强制全量：导入：全部 完整）
+
+📌 材料检索
+搜索：关键词 [多个词用空格分隔]
+例：搜索：睡眠 面膜
 
 📌 数据上传
 上传到飞书
@@ -945,6 +1214,9 @@ class MessageHandler:
 📌 状态查询
 查看状态 | 最近采集 | 统计
 
+📌 任务进度
+状态 <任务ID> [不带ID时列出最近任务]
+
 💡 提示：发送"ping"测试连接"""
 
         if user_open_id:
@@ -993,6 +1265,115 @@ class MessageHandler:
 # 初始化消息处理器
 handler = MessageHandler()
 
+# 初始化后台消息分发器（webhook 立即确认，消息在后台按用户串行处理）
+_dispatcher_config = config.get('dispatcher', {})
+dispatcher = MessageDispatcher(
+    max_workers=_dispatcher_config.get('max_workers', 4),
+    max_pending=_dispatcher_config.get('max_pending', 100)
+)
+
+# ============================================
+# 后台任务队列（耗时命令持久化排队，重启后继续执行）
+# ============================================
+JOB_STATUS_LABELS = {
+    'queued': '⏳ 排队中',
+    'running': '🔄 执行中',
+    'succeeded': '✅ 已完成',
+    'failed': '❌ 失败'
+}
+
+
+def format_job(job):
+    """格式化任务状态（用于飞书回复）"""
+    lines = [
+        f"任务ID：{job['id']}（{job['job_type']}）",
+        f"状态：{JOB_STATUS_LABELS.get(job['status'], job['status'])}",
+        f"排队：{job['queued_seconds']} 秒"
+    ]
+    if job['run_seconds'] is not None:
+        lines.append(f"执行：{job['run_seconds']} 秒（第 {job['attempts']} 次）")
+    if job['progress']:
+        lines.append(f"进度：{job['progress']}")
+    if job['error']:
+        lines.append(f"错误：{job['error']}")
+    return "\n".join(lines)
+
+
+def _run_collect_job(job, progress):
+    progress('MediaCrawler 采集中')
+    return handler.handle_collect(job['payload']['params'], job['user_open_id'])
+
+
+def _run_import_job(job, progress):
+    progress('导入 MediaCrawler 采集结果')
+    return handler.handle_import(job['payload']['params'], job['user_open_id'])
+
+
+def _run_eastmoney_crawl_job(job, progress):
+    progress('东方财富研报采集中')
+    return handler.handle_eastmoney_crawl(job['payload']['message_text'], job['user_open_id'])
+
+
+JOB_HANDLERS = {
+    'collect': _run_collect_job,
+    'import': _run_import_job,
+    'eastmoney_crawl': _run_eastmoney_crawl_job
+}
+
+_jobs_config = config.get('jobs', {})
+job_queue = JobQueue(
+    _jobs_config.get('db_path', SKILL_DIR / 'data' / 'jobs.db'),
+    lease_seconds=_jobs_config.get('lease_seconds', 900),
+    max_attempts=_jobs_config.get('max_attempts', 3),
+    max_running=_jobs_config.get('max_running', 2),
+    type_limits=_jobs_config.get('type_limits', {'collect': 1, 'eastmoney_crawl': 1})
+)
+job_pool = JobWorkerPool(job_queue, JOB_HANDLERS, concurrency=_jobs_config.get('concurrency', 2))
+
+# 被 gunicorn worker / ASGI 服务导入时直接启动执行线程；作为脚本运行时由 main() 确定运行模式后再启动，
+# 避免 --workers N 的启动进程在 execv 前领取任务
+if __name__ != '__main__':
+    job_pool.start()
+
+# 初始化事件去重器（飞书超时重推的同一事件只处理一次）
+_dedup_config = config.get('dedup', {})
+event_deduplicator = EventDeduplicator(
+    ttl_seconds=_dedup_config.get('ttl_seconds', 3600),
+    max_size=_dedup_config.get('max_size', 10000),
+    persist_file=(_dedup_config.get('persist_file', SKILL_DIR / 'data' / 'seen_events.jsonl')
+                  if _dedup_config.get('persist', True) else None),
+    # 共享存储时跨 worker 去重
+    store=state_store if config.get('state', {}).get('backend', 'memory') != 'memory' else None,
+    purge_every=_dedup_config.get('purge_every', 1000)
+)
+
+# ============================================
+# 访问日志
+# ============================================
+@app.before_request
+def _start_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def _access_log(response):
+    start = getattr(g, 'request_start', None)
+    elapsed = time.perf_counter() - start if start else None
+    log_sink.write('access', {
+        'method': request.method,
+        'path': request.path,
+        'status': response.status_code,
+        'duration_ms': round(elapsed * 1000, 2) if elapsed is not None else None,
+        'remote': request.remote_addr
+    })
+
+    # 用路由模板作为标签（/api/jobs/<job_id>），避免按具体 ID 产生大量序列
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    bot_metrics.http_requests.inc(method=request.method, route=route, status=response.status_code)
+    if elapsed is not None:
+        bot_metrics.http_latency.observe(elapsed, route=route)
+    return response
+
 # ============================================
 # Flask 路由
 # ============================================
@@ -1017,12 +1398,13 @@ def api_send_message():
             return jsonify({'success': False, 'msg': '通知脚本不存在'})
 
         try:
-            result = subprocess.run(
-                ['/opt/homebrew/bin/python3', str(notifier_script), '--message', message],
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
+            with bot_metrics.time_subprocess('feishu_notifier'):
+                result = subprocess.run(
+                    ['/opt/homebrew/bin/python3', str(notifier_script), '--message', message],
+                    capture_output=True,
+                    text=True,
+                    timeout=30
+                )
 
             if result.returncode == 0:
                 logger.info("✓ 消息已通过 feishu_bot_notifier.py 发送到飞书")
@@ -1039,13 +1421,109 @@ def api_send_message():
         logger.error(f"处理消息失败: {e}", exc_info=True)
         return jsonify({'success': False, 'msg': str(e)})
 
+# ============================================
+# 指标与健康检查
+# ============================================
+def _collect_runtime_metrics():
+    """采集时读取的运行状态（队列深度、token 刷新、命令路由统计等）"""
+    token_provider = get_token_provider(config['feishu']['app_id'], config['feishu']['app_secret'])
+    feishu_stats = get_feishu_client(config['feishu']['app_id'], config['feishu']['app_secret']).stats
+    routes = handler.router.metrics()
+
+    return [
+        ('feishu_bot_dispatcher_pending', 'gauge', '消息分发器积压数（含执行中）',
+         [({}, dispatcher.pending)]),
+        ('feishu_bot_dispatcher_capacity', 'gauge', '消息分发器积压上限',
+         [({}, dispatcher.max_pending)]),
+        ('feishu_bot_jobs', 'gauge', '任务队列中各状态的任务数',
+         [({'status': status}, count) for status, count in job_queue.counts().items()]),
+        ('feishu_bot_log_sink_pending', 'gauge', '日志写入队列积压数',
+         [({}, log_sink.pending)]),
+        ('feishu_bot_log_sink_dropped_total', 'counter', '日志队列满时丢弃的记录数',
+         [({}, log_sink.stats['dropped'])]),
+        ('feishu_bot_token_refresh_total', 'counter', '本进程刷新飞书 token 的次数',
+         [({}, token_provider.refresh_count)]),
+        ('feishu_bot_feishu_api_throttled_total', 'counter', '触发飞书频控后退避重试的次数',
+         [({}, feishu_stats['throttled'])]),
+        ('feishu_bot_feishu_api_token_retries_total', 'counter', 'token 失效后刷新重试的次数',
+         [({}, feishu_stats['token_retries'])]),
+        ('feishu_bot_command_total', 'counter', '各命令路由的调用次数',
+         [({'route': name}, m['count']) for name, m in routes.items()]),
+        ('feishu_bot_command_errors_total', 'counter', '各命令路由的异常次数',
+         [({'route': name}, m['errors']) for name, m in routes.items()]),
+        ('feishu_bot_command_latency_seconds', 'gauge', '各命令路由最近样本的耗时分位数',
+         [({'route': name, 'quantile': q}, m[f'p{int(float(q) * 100)}_ms'] / 1000)
+          for name, m in routes.items() for q in ('0.5', '0.95')]),
+    ]
+
+
+bot_metrics.registry.register_collector(_collect_runtime_metrics)
+add_response_listener(bot_metrics.observe_feishu_response)
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus 指标（?format=json 返回命令路由统计）"""
+    if request.args.get('format') == 'json':
+        return jsonify({
+            'routes': handler.router.metrics(),
+            'timestamp': datetime.now().isoformat()
+        })
+    return bot_metrics.registry.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+
+def readiness_checks():
+    """就绪检查：token 是否可用、后台线程是否存活、分发器是否饱和
+
+    Returns:
+        dict: 检查项 -> {'ok': bool, ...}
+    """
+    checks = {}
+
+    try:
+        get_token_provider(config['feishu']['app_id'], config['feishu']['app_secret']).get_app_token()
+        checks['feishu_token'] = {'ok': True}
+    except FeishuTokenError as e:
+        checks['feishu_token'] = {'ok': False, 'error': str(e)}
+
+    checks['dispatcher'] = {
+        'ok': dispatcher.is_alive() and dispatcher.pending < dispatcher.max_pending,
+        'pending': dispatcher.pending,
+        'max_pending': dispatcher.max_pending
+    }
+    checks['job_workers'] = {'ok': job_pool.is_alive()}
+    checks['log_sink'] = {'ok': log_sink.is_alive(), 'pending': log_sink.pending}
+    return checks
+
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    """就绪检查（全部通过返回 200，否则 503）"""
+    checks = readiness_checks()
+    ready = all(check['ok'] for check in checks.values())
+    return jsonify({
+        'status': 'ok' if ready else 'unavailable',
+        'checks': checks,
+        'timestamp': datetime.now().isoformat()
+    }), 200 if ready else 503
+
+# ============================================
+# 任务查询 API
+# ============================================
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def api_get_job(job_id):
+    """查询任务状态、进度和耗时"""
+    job = job_queue.get(job_id)
+    if not job:
+        return jsonify({'success': False, 'msg': 'Job not found'}), 404
+    return jsonify({'success': True, 'data': job})
+
 # ============================================
 # 东方财富研报选择 API
 # ============================================
 @app.route('/api/eastmoney/save_selection', methods=['POST'])
 def api_eastmoney_save_selection():
     """保存待选择的研报列表"""
-    global eastmoney_selection
     try:
         data = request.get_json()
         total_count = data.get('total_count', 0)
@@ -1058,6 +1536,7 @@ def api_eastmoney_save_selection():
             'selection': None,
             'timestamp': datetime.now().isoformat()
         }
+        state_store.set(EASTMONEY_SELECTION_KEY, eastmoney_selection)
 
         logger.info(f"[Eastmoney] Saved selection data: {total_count} reports, waiting for user input")
         return jsonify({'success': True, 'msg': 'Selection data saved', 'data': eastmoney_selection})
@@ -1070,11 +1549,10 @@ def api_eastmoney_save_selection():
 @app.route('/api/eastmoney/get_selection', methods=['GET'])
 def api_eastmoney_get_selection():
     """获取用户选择"""
-    global eastmoney_selection
     try:
         return jsonify({
             'success': True,
-            'data': eastmoney_selection
+            'data': get_eastmoney_selection()
         })
     except Exception as e:
         logger.error(f"[Eastmoney] Failed to get selection: {e}", exc_info=True)
@@ -1084,15 +1562,18 @@ def api_eastmoney_get_selection():
 @app.route('/api/eastmoney/update_selection', methods=['POST'])
 def api_eastmoney_update_selection():
     """更新用户选择（由 webhook 调用）"""
-    global eastmoney_selection
     try:
         data = request.get_json()
         selection = data.get('selection', [])
         status = data.get('status', 'ready')
 
-        eastmoney_selection['selection'] = selection
-        eastmoney_selection['status'] = status
-        eastmoney_selection['timestamp'] = datetime.now().isoformat()
+        def _update(eastmoney_selection):
+            eastmoney_selection['selection'] = selection
+            eastmoney_selection['status'] = status
+            eastmoney_selection['timestamp'] = datetime.now().isoformat()
+            return eastmoney_selection
+
+        state_store.update(EASTMONEY_SELECTION_KEY, _update, default=EASTMONEY_SELECTION_IDLE)
 
         logger.info(f"[Eastmoney] Selection updated: status={status}, selection={selection}")
         return jsonify({'success': True, 'msg': 'Selection updated'})
@@ -1105,15 +1586,8 @@ def api_eastmoney_update_selection():
 @app.route('/api/eastmoney/clear_selection', methods=['DELETE', 'POST'])
 def api_eastmoney_clear_selection():
     """清除选择数据"""
-    global eastmoney_selection
     try:
-        eastmoney_selection = {
-            'status': 'idle',
-            'total_count': 0,
-            'infocodes': [],
-            'selection': None,
-            'timestamp': None
-        }
+        state_store.set(EASTMONEY_SELECTION_KEY, EASTMONEY_SELECTION_IDLE)
         logger.info("[Eastmoney] Selection cleared")
         return jsonify({'success': True, 'msg': 'Selection cleared'})
     except Exception as e:
@@ -1129,115 +1603,78 @@ def index():
         'timestamp': datetime.now().isoformat()
     })
 
+def accept_event(data, submit):
+    """
+    处理飞书事件回调（Flask 和 ASGI 入口共用）
+
+    Args:
+        data: 事件 JSON
+        submit: fn(user_open_id, text) -> bool，把文本消息交给后台处理，积压已满时返回 False
+
+    Returns:
+        dict: 返回给飞书的响应
+    """
+    # 只记录摘要字段，避免为截断日志序列化整个事件
+    logger.info(f"收到消息: type={data.get('type') or data.get('header', {}).get('event_type')}, "
+                f"event_id={data.get('header', {}).get('event_id')}")
+
+    # URL 验证
+    if data.get('type') == 'url_verification':
+        return {'challenge': data.get('challenge')}
+
+    # 丢弃重复投递的事件（飞书未及时收到响应会重推）
+    event = data.get('event', {})
+    event_id = data.get('header', {}).get('event_id')
+    message_id = event.get('message', {}).get('message_id')
+    if event_deduplicator.is_duplicate(event_id, message_id):
+        logger.info(f"忽略重复事件: event_id={event_id}, message_id={message_id}")
+        return {'code': 0, 'msg': 'duplicate event'}
+
+    # 提取事件和消息
+    sender = event.get('sender', {})
+    sender_id = sender.get('sender_id', {})
+    user_open_id = sender_id.get('open_id', '')
+
+    # 检查消息类型
+    message = event.get('message', {})
+    msg_type = message.get('msg_type')
+
+    if msg_type != 'text':
+        return {'code': 0, 'msg': 'not text message'}
+
+    content = json.loads(message.get('content', '{}'))
+    text = content.get('text', '').strip()
+
+    logger.info(f"用户 {user_open_id} 发送: {text}")
+
+    # 检查是否是东方财富研报选择消息
+    if get_eastmoney_selection()['status'] == 'waiting':
+        eastmoney_reply = apply_eastmoney_reply(text)
+        if eastmoney_reply:
+            reply_text, reply_msg = eastmoney_reply
+            feishu_api.send_message(eastmoney_config.get('chat_id', ''), reply_text, receive_id_type='chat_id')
+            return {'code': 0, 'msg': reply_msg}
+
+    # 交给后台处理（会自动发送回复），webhook 立即返回避免飞书超时重推
+    if not submit(user_open_id, text):
+        feishu_api.send_message(user_open_id, "⚠️ 机器人当前任务较多，请稍后再试")
+        return {'code': 0, 'msg': 'busy'}
+
+    # 记录到日志（异步写入 messages_YYYYMMDD.log）
+    log_sink.write('messages', f"{datetime.now().isoformat()} - {user_open_id} - {text}")
+
+    return {'code': 0, 'msg': 'success'}
+
+
 @app.route('/webhook', methods=['POST'])
 def webhook():
     """接收飞书消息"""
     try:
         data = request.get_json()
-        logger.info(f"收到消息: {json.dumps(data, ensure_ascii=False)[:200]}")
-
-        # URL 验证
-        if data.get('type') == 'url_verification':
-            return jsonify({'challenge': data.get('challenge')})
-
-        # 提取事件和消息
-        event = data.get('event', {})
-        sender = event.get('sender', {})
-        sender_id = sender.get('sender_id', {})
-        user_open_id = sender_id.get('open_id', '')
-
-        # 检查消息类型
-        message = event.get('message', {})
-        msg_type = message.get('msg_type')
-
-        if msg_type == 'text':
-            content = json.loads(message.get('content', '{}'))
-            text = content.get('text', '').strip()
-
-            logger.info(f"用户 {user_open_id} 发送: {text}")
-
-            # 检查是否是东方财富研报选择消息
-            if eastmoney_selection['status'] == 'waiting':
-                import re
-                # 检测数字选择（如 "1,3,5" 或 "1 3 5"）
-                if re.match(r'^[\d\s,，]+$', text):
-                    # 解析数字选择
-                    parts = text.replace('，', ',').split(',')
-                    indices = []
-                    for part in parts:
-                        part = part.strip()
-                        if part.isdigit():
-                            idx = int(part) - 1  # 转换为0索引
-                            if 0 <= idx < eastmoney_selection['total_count']:
-                                indices.append(idx)
-
-                    selected_infocodes = [eastmoney_selection['infocodes'][i] for i in indices]
-
-                    eastmoney_selection['selection'] = selected_infocodes
-                    eastmoney_selection['status'] = 'ready'
-                    eastmoney_selection['timestamp'] = datetime.now().isoformat()
-
-                    logger.info(f"[Eastmoney] User selected {len(selected_infocodes)} reports: {selected_infocodes}")
-
-                    # 发送确认回复
-                    feishu_api.send_message(
-                        receive_id=eastmoney_config.get('chat_id', ''),
-                        content=f"✅ 已收到您的选择，共 {len(selected_infocodes)} 份报告。正在处理...",
-                        msg_type="text"
-                    )
-                    return jsonify({'code': 0, 'msg': 'eastmoney selection recorded'})
-
-                # 检测特殊命令
-                elif text in ['全部保留', 'all', 'All', 'ALL']:
-                    eastmoney_selection['selection'] = eastmoney_selection['infocodes']
-                    eastmoney_selection['status'] = 'ready'
-                    eastmoney_selection['timestamp'] = datetime.now().isoformat()
-                    logger.info(f"[Eastmoney] User selected: keep all ({len(eastmoney_selection['infocodes'])} reports)")
-
-                    feishu_api.send_message(
-                        receive_id=eastmoney_config.get('chat_id', ''),
-                        content=f"✅ 已保留全部 {len(eastmoney_selection['infocodes'])} 份报告。正在处理...",
-                        msg_type="text"
-                    )
-                    return jsonify({'code': 0, 'msg': 'eastmoney keep all'})
-
-                elif text in ['全部删除', 'delete all', 'Delete All', 'DELETE ALL']:
-                    eastmoney_selection['selection'] = []
-                    eastmoney_selection['status'] = 'ready'
-                    eastmoney_selection['timestamp'] = datetime.now().isoformat()
-                    logger.info("[Eastmoney] User selected: delete all")
-
-                    feishu_api.send_message(
-                        receive_id=eastmoney_config.get('chat_id', ''),
-                        content="✅ 已删除全部报告。",
-                        msg_type="text"
-                    )
-                    return jsonify({'code': 0, 'msg': 'eastmoney delete all'})
-
-                elif text in ['取消', 'cancel', 'Cancel', 'CANCEL']:
-                    eastmoney_selection['selection'] = None
-                    eastmoney_selection['status'] = 'cancelled'
-                    eastmoney_selection['timestamp'] = datetime.now().isoformat()
-                    logger.info("[Eastmoney] User cancelled")
-
-                    feishu_api.send_message(
-                        receive_id=eastmoney_config.get('chat_id', ''),
-                        content="❌ 已取消操作。",
-                        msg_type="text"
-                    )
-                    return jsonify({'code': 0, 'msg': 'eastmoney cancelled'})
-
-            # 处理消息（会自动发送回复）
-            handler.process(text, user_open_id)
-
-            # 记录到日志
-            log_file = Path(config['data']['log_dir']) / f"messages_{datetime.now().strftime('%Y%m%d')}.log"
-            with open(log_file, 'a', encoding='utf-8') as f:
-                f.write(f"{datetime.now().isoformat()} - {user_open_id} - {text}\n")
-
-            return jsonify({'code': 0, 'msg': 'success'})
-
-        return jsonify({'code': 0, 'msg': 'not text message'})
+        return jsonify(accept_event(
+            data,
+            lambda user_open_id, text: dispatcher.submit(user_open_id, handler.process, text, user_open_id)
+        ))
 
     except Exception as e:
         logger.error(f"处理消息失败: {e}", exc_info=True)
@@ -1247,10 +1684,54 @@ def webhook():
 # 主函数
 # ============================================
 
+def run_workers(host, port, workers):
+    """
+    以 gunicorn 多 worker 方式启动（生产环境）
+
+    每个 worker 独立导入本模块，跨请求状态通过共享状态存储（sqlite）同步。
+
+    Args:
+        host: 监听地址
+        port: 监听端口
+        workers: worker 进程数
+    """
+    if importlib.util.find_spec('gunicorn') is None:
+        logger.error("多 worker 模式需要 gunicorn，请先安装: pip install gunicorn")
+        sys.exit(1)
+
+    if config.get('state', {}).get('backend', 'memory') == 'memory':
+        logger.warning("状态存储为 memory，多个 worker 之间不共享研报选择和事件去重记录，建议改为 sqlite")
+
+    cmd = [
+        sys.executable, '-m', 'gunicorn',
+        '--workers', str(workers),
+        '--bind', f'{host}:{port}',
+        '--chdir', str(Path(__file__).resolve().parent),
+        '--timeout', str(config['server'].get('timeout', 30)),
+        '--graceful-timeout', '30',
+        'bot_server:app'
+    ]
+    logger.info(f"启动 {workers} 个 worker: {' '.join(cmd)}")
+    os.execv(sys.executable, cmd)
+
+
 def main():
     """启动服务器"""
-    host = config['server'].get('host', '0.0.0.0')
-    port = config['server'].get('port', 5001)
+    parser = argparse.ArgumentParser(description='飞书交互机器人服务器')
+    parser.add_argument('--host', help='监听地址（默认读取配置）')
+    parser.add_argument('--port', type=int, help='监听端口（默认读取配置）')
+    parser.add_argument('--workers', type=int, help='worker 进程数，大于 1 时使用 gunicorn 启动')
+    args = parser.parse_args()
+
+    host = args.host or config['server'].get('host', '0.0.0.0')
+    port = args.port or config['server'].get('port', 5001)
+    workers = args.workers or config['server'].get('workers', 1)
+
+    if workers > 1:
+        run_workers(host, port, workers)
+        return
+
+    job_pool.start()
 
     logger.info(f"启动飞书机器人服务器: {host}:{port}")
     logger.info("Webhook URL: http://{}:{}/webhook".format(host, port))
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+飞书交互机器人服务器（ASGI 异步版）
+
+与 bot_server.py 共用事件处理、命令路由、任务队列和状态存储，区别在于：
+1. /webhook 运行在事件循环上，不占用线程
+2. 飞书回复通过 httpx 异步发送（同一接收者按顺序），不阻塞处理逻辑
+3. 只回复固定文本的命令（帮助、ping 等）直接在事件循环中执行；
+   任务入队/状态查询（SQLite）、链接处理、目录扫描、搜索、子进程等阻塞操作放到有界线程池
+4. 事件去重、状态存储等 SQLite/文件操作在线程中执行，不阻塞事件循环
+5. 其余 HTTP 接口（研报选择、任务查询、指标）挂载原 Flask 应用
+
+依赖：pip install starlette uvicorn httpx
+
+使用：
+    python bot_server_async.py [--workers N]
+    或 uvicorn bot_server_async:app --host 0.0.0.0 --port 5001
+
+作者：大秘书系统
+版本：v1.0
+创建时间：2026-03-21
+"""
+
+import json
+import time
+import asyncio
+import argparse
+import logging
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+from starlette.applications import Starlette
+from starlette.middleware.wsgi import WSGIMiddleware
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
+
+import bot_server
+import bot_metrics
+from bot_server import config, handler, accept_event, log_sink
+from feishu_http import AsyncFeishuClient
+
+logger = logging.getLogger(__name__)
+
+# 只直接回复、不访问 SQLite 和文件的路由，直接在事件循环中执行
+# （任务入队和状态查询会等待 jobs.db 写锁，与搜索、文件读写一样放到线程池）
+INLINE_ROUTES = {'help', 'ping', 'unknown'}
+
+
+class AsyncReplySender:
+    """非阻塞飞书回复发送器（替换 bot_server.feishu_api）
+
+    send_message 可以在事件循环或线程池中调用，立即返回；
+    实际请求在事件循环中完成，同一接收者的消息按调用顺序发送。
+    """
+
+    def __init__(self, app_id, app_secret):
+        self.client = AsyncFeishuClient(app_id, app_secret)
+        self.loop = None
+        # receive_id -> [asyncio.Lock, 等待中的消息数]
+        self._locks = {}
+        self._tasks = set()
+
+    def bind(self, loop):
+        """绑定事件循环（启动时调用）"""
+        self.loop = loop
+
+    def send_message(self, open_id, text, receive_id_type="open_id"):
+        """提交文本消息（签名与 FeishuAPI.send_message 相同）
+
+        注意：返回时消息尚未发出，返回值恒为真值，不能据此判断是否发送成功；
+        需要结果时在事件循环中 await 返回的 Task，或在线程中调用 Future.result()。
+
+        Returns:
+            asyncio.Task | concurrent.futures.Future: 已调度的发送任务，结果为是否发送成功
+        """
+        coro = self._send(open_id, text, receive_id_type)
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+
+        if running_loop is self.loop:
+            task = self.loop.create_task(coro)
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            return task
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    async def _send(self, open_id, text, receive_id_type):
+        entry = self._locks.setdefault(open_id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                payload = {
+                    "receive_id": open_id,
+                    "msg_type": "text",
+                    "content": json.dumps({"text": text})
+                }
+                response = await self.client.post(
+                    "/im/v1/messages",
+                    params={"receive_id_type": receive_id_type},
+                    headers={"Content-Type": "application/json"},
+                    json=payload
+                )
+                data = response.json()
+                if data.get("code") == 0:
+                    logger.info(f"✓ 消息已发送到 {open_id} (type={receive_id_type})")
+                    return True
+                logger.error(f"发送失败 code={data.get('code')}: {data.get('msg')}")
+                return False
+        except Exception as e:
+            logger.error(f"发送消息异常: {e}")
+            return False
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                self._locks.pop(open_id, None)
+
+    async def aclose(self):
+        """等待未完成的发送并关闭连接池"""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.client.aclose()
+
+
+class AsyncMessageProcessor:
+    """异步消息处理 - 不同用户并发，同一用户串行"""
+
+    def __init__(self, max_pending=1000, blocking_workers=16):
+        """
+        Args:
+            max_pending: 最大积压消息数，超过后提示繁忙
+            blocking_workers: 执行阻塞路由的线程数
+        """
+        self.max_pending = max_pending
+        self.executor = ThreadPoolExecutor(max_workers=blocking_workers, thread_name_prefix='feishu-async')
+        self.pending = 0
+        # user_open_id -> [asyncio.Lock, 等待中的消息数]
+        self._user_locks = {}
+        self._tasks = set()
+
+    def submit(self, user_open_id, text):
+        """提交消息（在事件循环中调用），积压已满时返回 False"""
+        if self.pending >= self.max_pending:
+            logger.warning(f"异步处理积压已满 ({self.pending}/{self.max_pending})，拒绝消息: {user_open_id}")
+            return False
+
+        self.pending += 1
+        task = asyncio.get_running_loop().create_task(self._process(user_open_id, text))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def _process(self, user_open_id, text):
+        entry = self._user_locks.setdefault(user_open_id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                resolved = handler.router.resolve(text)
+                if resolved is None:
+                    return
+                if resolved[0] in INLINE_ROUTES:
+                    handler.router.call(resolved, text, user_open_id)
+                else:
+                    await asyncio.get_running_loop().run_in_executor(
+                        self.executor, handler.router.call, resolved, text, user_open_id
+                    )
+        except Exception as e:
+            logger.error(f"后台处理消息失败 ({user_open_id}): {e}", exc_info=True)
+        finally:
+            self.pending -= 1
+            entry[1] -= 1
+            if entry[1] == 0:
+                self._user_locks.pop(user_open_id, None)
+
+    def submit_threadsafe(self, loop, user_open_id, text):
+        """从线程中提交消息（等待事件循环处理），积压已满时返回 False"""
+        async def _submit():
+            return self.submit(user_open_id, text)
+        return asyncio.run_coroutine_threadsafe(_submit(), loop).result()
+
+    async def drain(self):
+        """等待所有消息处理完成"""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self.executor.shutdown(wait=True)
+
+
+_async_config = config.get('async_server', {})
+reply_sender = AsyncReplySender(config['feishu']['app_id'], config['feishu']['app_secret'])
+processor = AsyncMessageProcessor(
+    max_pending=_async_config.get('max_pending', 1000),
+    blocking_workers=_async_config.get('blocking_workers', 16)
+)
+
+bot_metrics.registry.register_collector(lambda: [
+    ('feishu_bot_async_pending', 'gauge', '异步模式下积压的消息数（含执行中）', [({}, processor.pending)]),
+    ('feishu_bot_async_capacity', 'gauge', '异步模式的积压上限', [({}, processor.max_pending)]),
+])
+
+
+async def webhook(request):
+    """接收飞书消息"""
+    start = time.perf_counter()
+    status = 200
+    try:
+        data = await request.json()
+        # 去重、状态存储等 SQLite/文件操作放到线程中执行，消息仍在事件循环中提交
+        loop = asyncio.get_running_loop()
+        body = await asyncio.to_thread(
+            accept_event, data,
+            lambda user_open_id, text: processor.submit_threadsafe(loop, user_open_id, text)
+        )
+    except Exception as e:
+        logger.error(f"处理消息失败: {e}", exc_info=True)
+        status = 500
+        body = {'code': 500, 'msg': str(e)}
+
+    elapsed = time.perf_counter() - start
+    log_sink.write('access', {
+        'method': request.method,
+        'path': request.url.path,
+        'status': status,
+        'duration_ms': round(elapsed * 1000, 2),
+        'remote': request.client.host if request.client else None
+    })
+    bot_metrics.http_requests.inc(method=request.method, route='/webhook', status=status)
+    bot_metrics.http_latency.observe(elapsed, route='/webhook')
+    return JSONResponse(body, status_code=status)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    reply_sender.bind(asyncio.get_running_loop())
+    # 所有模块（消息处理、任务队列、Flask 接口）统一改用异步发送
+    bot_server.feishu_api = reply_sender
+    logger.info("ASGI 服务已启动，飞书回复改为异步发送")
+    yield
+    await processor.drain()
+    await reply_sender.aclose()
+
+
+app = Starlette(
+    routes=[
+        Route('/webhook', webhook, methods=['POST']),
+        # 其余接口沿用 Flask 应用
+        Mount('/', app=WSGIMiddleware(bot_server.app)),
+    ],
+    lifespan=lifespan
+)
+
+
+def main():
+    """启动 ASGI 服务器"""
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description='飞书交互机器人服务器（ASGI）')
+    parser.add_argument('--host', help='监听地址（默认读取配置）')
+    parser.add_argument('--port', type=int, help='监听端口（默认读取配置）')
+    parser.add_argument('--workers', type=int, default=1, help='worker 进程数（多 worker 需 state.backend 为 sqlite）')
+    args = parser.parse_args()
+
+    host = args.host or config['server'].get('host', '0.0.0.0')
+    port = args.port or config['server'].get('port', 5001)
+
+    logger.info(f"启动飞书机器人 ASGI 服务器: {host}:{port}, workers={args.workers}")
+    if args.workers > 1:
+        uvicorn.run('bot_server_async:app', host=host, port=port, workers=args.workers)
+    else:
+        uvicorn.run(app, host=host, port=port)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+命令路由器
+
+功能：
+1. 声明式路由表：精确匹配 / 前缀 / 正则，正则在注册时编译一次
+2. 精确匹配走字典查找，其余路由按注册顺序单次遍历，先匹配先处理
+3. 每条路由记录调用次数、错误数和耗时（p50/p95），供 /metrics 查询
+
+作者：大秘书系统
+版本：v1.0
+创建时间：2026-03-21
+"""
+
+import re
+import time
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class RouteMetrics:
+    """单条路由的调用统计（耗时保留最近 N 个样本计算分位数）"""
+
+    def __init__(self, window=1024):
+        self.count = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self._samples = deque(maxlen=window)
+
+    def record(self, seconds, error=False):
+        self.count += 1
+        self.total_seconds += seconds
+        self._samples.append(seconds)
+        if error:
+            self.errors += 1
+
+    def snapshot(self):
+        samples = sorted(self._samples)
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'error_rate': round(self.errors / self.count, 4) if self.count else 0.0,
+            'p50_ms': round(_percentile(samples, 0.50) * 1000, 2),
+            'p95_ms': round(_percentile(samples, 0.95) * 1000, 2),
+            'total_seconds': round(self.total_seconds, 3)
+        }
+
+
+def _percentile(sorted_samples, q):
+    if not sorted_samples:
+        return 0.0
+    index = min(int(q * len(sorted_samples)), len(sorted_samples) - 1)
+    return sorted_samples[index]
+
+
+class CommandRouter:
+    """消息命令路由表"""
+
+    def __init__(self, fallback=None):
+        """
+        初始化路由器
+
+        Args:
+            fallback: 没有路由匹配时的处理函数 fn(match, text, *args)，match 为 None
+        """
+        self._exact = {}
+        # [(name, 编译后的正则, handler)]
+        self._routes = []
+        self._fallback = fallback
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def exact(self, name, texts, handler):
+        """
+        注册精确匹配路由（优先于其他路由，字典查找）
+
+        Args:
+            name: 路由名（用于统计）
+            texts: 匹配的文本列表
+            handler: 处理函数 fn(match, text, *args)，match 为 None
+        """
+        for text in texts:
+            self._exact[text] = (name, handler)
+        self._metrics.setdefault(name, RouteMetrics())
+
+    def prefix(self, name, prefixes, handler):
+        """注册前缀路由（match.group('rest') 为去掉前缀后的内容）"""
+        alternatives = '|'.join(re.escape(p) for p in sorted(prefixes, key=len, reverse=True))
+        self.pattern(name, rf'^(?:{alternatives})(?P<rest>.*)$', handler, flags=re.DOTALL)
+
+    def pattern(self, name, pattern, handler, flags=0, search=False):
+        """
+        注册正则路由
+
+        Args:
+            name: 路由名
+            pattern: 正则表达式（注册时编译）
+            handler: 处理函数 fn(match, text, *args)
+            flags: re 标志
+            search: True 使用 search（任意位置），默认 match（从开头）
+        """
+        compiled = re.compile(pattern, flags)
+        matcher = compiled.search if search else compiled.match
+        self._routes.append((name, matcher, handler))
+        self._metrics.setdefault(name, RouteMetrics())
+
+    def resolve(self, text):
+        """
+        查找匹配的路由（不执行）
+
+        Args:
+            text: 消息文本（已去除首尾空白）
+
+        Returns:
+            tuple: (路由名, 处理函数, match)，没有匹配且无 fallback 时返回 None
+        """
+        route = self._exact.get(text)
+        if route:
+            name, handler = route
+            return name, handler, None
+
+        for name, matcher, handler in self._routes:
+            match = matcher(text)
+            if match:
+                return name, handler, match
+
+        if self._fallback:
+            return 'unknown', self._fallback, None
+        return None
+
+    def dispatch(self, text, *args):
+        """
+        分发消息
+
+        Args:
+            text: 消息文本（已去除首尾空白）
+            *args: 透传给处理函数的参数
+
+        Returns:
+            处理函数的返回值
+        """
+        resolved = self.resolve(text)
+        if resolved is None:
+            return None
+        return self.call(resolved, text, *args)
+
+    def call(self, resolved, text, *args):
+        """执行 resolve() 找到的路由并记录耗时"""
+        name, handler, match = resolved
+        start = time.perf_counter()
+        error = False
+        try:
+            return handler(match, text, *args)
+        except Exception:
+            error = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._metrics.setdefault(name, RouteMetrics()).record(elapsed, error)
+
+    def metrics(self):
+        """
+        各路由的调用统计
+
+        Returns:
+            dict: 路由名 -> {count, errors, error_rate, p50_ms, p95_ms, total_seconds}
+        """
+        with self._lock:
+            return {name: m.snapshot() for name, m in self._metrics.items()}
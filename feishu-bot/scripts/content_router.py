@@ -7,6 +7,8 @@
 2. 解析短链接（使用ShortLinkResolver）
 3. 路由到对应处理器
 4. 返回统一格式的处理结果
+5. 批量路由：解析 → 类型检测 → 抓取 → 整理 四段流水线，
+   各阶段独立并发、阶段间有界队列，整批耗时接近最慢的单个链接
 
 作者：大秘书系统
 版本：v1.0
@@ -14,7 +16,9 @@
 """
 
 import re
+import queue
 import logging
+import threading
 from pathlib import Path
 from datetime import datetime
 from urllib.parse import urlparse
@@ -26,6 +30,14 @@ from short_link_resolver import ShortLinkResolver
 
 logger = logging.getLogger(__name__)
 
+# 批量路由各阶段的默认并发数（整理阶段写索引，保持串行）
+PIPELINE_CONCURRENCY = {'resolve': 8, 'detect': 2, 'fetch': 4, 'organize': 1}
+# 阶段间队列长度
+PIPELINE_QUEUE_SIZE = 32
+
+# 队列结束标记
+_STOP = object()
+
 
 class ContentRouter:
     """智能内容路由器 - 检测URL类型并路由到对应处理器"""
@@ -157,14 +169,7 @@ class ContentRouter:
             resolve_result = self.resolve_short_link(url)
 
             if not resolve_result.get('success'):
-                error_msg = f"❌ 短链接解析失败\n\nURL: {url}\n错误: {resolve_result.get('error', '未知错误')}"
-                return {
-                    'success': False,
-                    'type': 'resolve_failed',
-                    'action': 'resolve_short_link',
-                    'result': resolve_result,
-                    'message': error_msg
-                }
+                return self._resolve_failed(url, resolve_result)
 
             # 解析成功，更新为完整URL继续处理
             url = resolve_result.get('full_url', url)
@@ -172,6 +177,21 @@ class ContentRouter:
             logger.info(f"Short link resolved to: {url}")
 
         # 3. 根据类型路由
+        return self._route_detected(url, detection)
+
+    def _resolve_failed(self, url, resolve_result):
+        """短链接解析失败时的路由结果"""
+        error_msg = f"❌ 短链接解析失败\n\nURL: {url}\n错误: {resolve_result.get('error', '未知错误')}"
+        return {
+            'success': False,
+            'type': 'resolve_failed',
+            'action': 'resolve_short_link',
+            'result': resolve_result,
+            'message': error_msg
+        }
+
+    def _route_detected(self, url, detection):
+        """根据检测结果生成路由结果（url 已是完整链接）"""
         if detection['platform'] == 'xhs':
             return {
                 'success': True,
@@ -218,22 +238,136 @@ class ContentRouter:
 - 查看帮助文档了解支持的平台"""
             }
 
-    def batch_route(self, urls, user_open_id=None, feishu_api=None):
+    def batch_route(self, urls, user_open_id=None, feishu_api=None,
+                    fetch=None, organize=None, on_progress=None, concurrency=None):
         """
-        批量路由多个链接
+        批量路由多个链接（流水线）
+
+        四个阶段各有独立线程数，阶段之间通过有界队列衔接：
+        解析短链接 → 类型检测 → 抓取（fetch）→ 整理/写入（organize）。
+        某个链接在任一阶段失败时直接结束，不影响其他链接。
 
         Args:
             urls: URL列表
             user_open_id: 飞书用户ID
             feishu_api: 飞书API实例
+            fetch: 抓取函数 fn(url, route_result) -> 任意结果，只对路由成功的链接调用
+            organize: 整理函数 fn(url, route_result)，在抓取成功后调用
+            on_progress: 每个链接处理完成时的回调 fn(完成数, 总数, route_result)
+            concurrency: 覆盖各阶段并发数，如 {'fetch': 8}
 
         Returns:
-            list: 处理结果列表
+            list: 处理结果列表（与输入顺序一致）；调用了 fetch 时结果中带
+                  'fetch_result'，抓取或整理异常时 success 为 False 并带 'error'
         """
-        results = []
-        for url in urls:
-            result = self.route_content(url, user_open_id, feishu_api)
-            results.append(result)
+        total = len(urls)
+        results = [None] * total
+        if not total:
+            return results
+
+        workers = dict(PIPELINE_CONCURRENCY)
+        workers.update(concurrency or {})
+        finished = [0]
+        finish_lock = threading.Lock()
+
+        def finish(item):
+            result = results[item['index']] = item['route']
+            with finish_lock:
+                finished[0] += 1
+                done = finished[0]
+            if on_progress:
+                try:
+                    on_progress(done, total, result)
+                except Exception as e:
+                    logger.warning(f"进度回调失败: {e}")
+
+        def resolve_stage(item):
+            detection = self.detect_content_type(item['url'])
+            if detection['is_short_link']:
+                resolve_result = self.resolve_short_link(item['url'])
+                if not resolve_result.get('success'):
+                    item['route'] = self._resolve_failed(item['url'], resolve_result)
+                    return False
+                item['url'] = resolve_result.get('full_url', item['url'])
+            return True
+
+        def detect_stage(item):
+            item['route'] = self._route_detected(item['url'], self.detect_content_type(item['url']))
+            return item['route']['success'] and fetch is not None
+
+        def fetch_stage(item):
+            try:
+                item['route']['fetch_result'] = fetch(item['url'], item['route'])
+            except Exception as e:
+                logger.error(f"抓取失败 {item['url']}: {e}")
+                item['route'].update(success=False, error=str(e))
+                return False
+            return organize is not None
+
+        def organize_stage(item):
+            try:
+                organize(item['url'], item['route'])
+            except Exception as e:
+                logger.error(f"整理失败 {item['url']}: {e}")
+                item['route'].update(success=False, error=str(e))
+            return False
+
+        stages = [
+            ('resolve', resolve_stage),
+            ('detect', detect_stage),
+            ('fetch', fetch_stage),
+            ('organize', organize_stage)
+        ]
+        queues = [queue.Queue(maxsize=PIPELINE_QUEUE_SIZE) for _ in stages]
+        threads = []
+
+        for position, (name, fn) in enumerate(stages):
+            count = max(1, workers.get(name, 1))
+            next_queue = queues[position + 1] if position + 1 < len(stages) else None
+            next_count = max(1, workers.get(stages[position + 1][0], 1)) if next_queue else 0
+            remaining = [count]
+            remaining_lock = threading.Lock()
+
+            def run(fn=fn, name=name, inbox=queues[position], outbox=next_queue,
+                    outbox_workers=next_count, remaining=remaining, remaining_lock=remaining_lock):
+                while True:
+                    item = inbox.get()
+                    if item is _STOP:
+                        break
+                    try:
+                        proceed = fn(item)
+                    except Exception as e:
+                        logger.error(f"批量路由阶段 {name} 异常 {item['url']}: {e}")
+                        item['route'] = item.get('route') or {
+                            'success': False, 'type': 'error', 'action': name,
+                            'result': {}, 'message': f"❌ 处理失败: {e}"
+                        }
+                        proceed = False
+                    if proceed and outbox is not None:
+                        outbox.put(item)
+                    else:
+                        finish(item)
+
+                # 本阶段最后一个线程退出时，通知下一阶段结束
+                with remaining_lock:
+                    remaining[0] -= 1
+                    last = remaining[0] == 0
+                if last and outbox is not None:
+                    for _ in range(outbox_workers):
+                        outbox.put(_STOP)
+
+            for i in range(count):
+                thread = threading.Thread(target=run, name=f"route-{name}-{i}", daemon=True)
+                thread.start()
+                threads.append(thread)
+
+        for index, url in enumerate(urls):
+            queues[0].put({'index': index, 'url': url, 'route': None})
+        for _ in range(max(1, workers.get('resolve', 1))):
+            queues[0].put(_STOP)
+
+        for thread in threads:
+            thread.join()
         return results
 
     def get_output_dir(self, content_type):
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+飞书事件去重器
+
+功能：
+1. 记录已处理的 event_id / message_id，丢弃飞书重推的重复事件
+2. TTL + 容量上限的 LRU，查询和记录均为 O(1)
+3. 可选落盘（追加写 JSONL），服务重启后仍能识别重复事件
+4. 可选共享状态存储（多 worker 部署时跨进程去重），定期清理其中的过期记录
+
+作者：大秘书系统
+版本：v1.0
+创建时间：2026-03-21
+"""
+
+import json
+import time
+import logging
+import threading
+from pathlib import Path
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class EventDeduplicator:
+    """事件去重器 - TTL 有界 LRU，可选磁盘持久化"""
+
+    def __init__(self, ttl_seconds=3600, max_size=10000, persist_file=None, store=None, purge_every=1000):
+        """
+        初始化去重器
+
+        Args:
+            ttl_seconds: 记录保留时间（秒），飞书重推通常在数分钟内
+            max_size: 内存中最多保留的记录数
+            persist_file: 持久化文件路径（None 表示仅内存）
+            store: 共享状态存储（StateStore），提供时忽略本地 LRU 和 persist_file
+            purge_every: 使用共享存储时，每记录多少个事件清理一次过期记录
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self.store = store
+        self.persist_file = Path(persist_file).expanduser() if persist_file and store is None else None
+
+        self._lock = threading.Lock()
+        # key -> 首次出现时间，按插入顺序排列（最旧的在前）
+        self._seen = OrderedDict()
+        self._persisted_lines = 0
+        self.purge_every = purge_every
+        self._store_writes = 0
+
+        if self.persist_file:
+            self.persist_file.parent.mkdir(parents=True, exist_ok=True)
+            self._load()
+
+        logger.info(f"EventDeduplicator initialized: ttl={ttl_seconds}s, max_size={max_size}, "
+                    f"persist={self.persist_file}, store={type(store).__name__ if store else None}")
+
+    def is_duplicate(self, *keys):
+        """
+        检查事件是否重复；未见过的 key 会被记录
+
+        Args:
+            *keys: 事件标识（event_id、message_id 等），None/空值会被忽略
+
+        Returns:
+            bool: 任一 key 已在有效期内出现过则返回 True
+        """
+        keys = [k for k in keys if k]
+        if not keys:
+            return False
+
+        if self.store is not None:
+            # 原子写入，多个 worker 同时收到同一事件时只有一个成功
+            added = [self.store.add(f"event:{k}", 1, ttl=self.ttl_seconds) for k in keys]
+            self._maybe_purge(len(keys))
+            return not all(added)
+
+        now = time.time()
+        with self._lock:
+            self._evict(now)
+
+            if any(k in self._seen for k in keys):
+                return True
+
+            for k in keys:
+                self._seen[k] = now
+            while len(self._seen) > self.max_size:
+                self._seen.popitem(last=False)
+
+            if self.persist_file:
+                self._append(keys, now)
+
+        return False
+
+    def _maybe_purge(self, writes):
+        """共享存储中的记录只在读取时过滤过期，需要定期删除，避免无限增长"""
+        with self._lock:
+            self._store_writes += writes
+            if self._store_writes < self.purge_every:
+                return
+            self._store_writes = 0
+
+        try:
+            removed = self.store.purge_expired()
+            if removed:
+                logger.info(f"已清理 {removed} 条过期去重记录")
+        except Exception as e:
+            logger.warning(f"清理过期去重记录失败: {e}")
+
+    def __len__(self):
+        return len(self._seen)
+
+    def _evict(self, now):
+        """淘汰过期记录（最旧的在前，遇到未过期即停止）"""
+        cutoff = now - self.ttl_seconds
+        while self._seen:
+            key, ts = next(iter(self._seen.items()))
+            if ts >= cutoff:
+                break
+            self._seen.popitem(last=False)
+
+    def _load(self):
+        """从持久化文件恢复未过期记录"""
+        if not self.persist_file.exists():
+            return
+
+        cutoff = time.time() - self.ttl_seconds
+        try:
+            with open(self.persist_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    self._persisted_lines += 1
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if entry.get('ts', 0) >= cutoff:
+                        self._seen[entry['key']] = entry['ts']
+                        self._seen.move_to_end(entry['key'])
+        except Exception as e:
+            logger.warning(f"读取去重记录失败: {e}")
+            return
+
+        while len(self._seen) > self.max_size:
+            self._seen.popitem(last=False)
+
+        logger.info(f"已恢复 {len(self._seen)} 条去重记录")
+
+    def _append(self, keys, now):
+        """追加写入新记录，文件过大时压缩"""
+        try:
+            with open(self.persist_file, 'a', encoding='utf-8') as f:
+                for k in keys:
+                    f.write(json.dumps({'key': k, 'ts': now}) + '\n')
+            self._persisted_lines += len(keys)
+
+            if self._persisted_lines > self.max_size * 2:
+                self._compact()
+        except Exception as e:
+            logger.warning(f"写入去重记录失败: {e}")
+
+    def _compact(self):
+        """用内存中的有效记录重写持久化文件"""
+        tmp_file = self.persist_file.with_suffix('.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            for k, ts in self._seen.items():
+                f.write(json.dumps({'key': k, 'ts': ts}) + '\n')
+        tmp_file.replace(self.persist_file)
+        self._persisted_lines = len(self._seen)
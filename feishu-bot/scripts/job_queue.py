@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+持久化任务队列
+
+功能：
+1. 任务表保存在 SQLite（WAL），服务重启后未完成的任务继续执行
+2. worker 以租约方式领取任务，进程崩溃后租约过期，任务自动重新入队
+3. 全局并发限制（总数 + 按任务类型），多个 worker 进程共享同一限制
+4. 记录进度和耗时，供 /api/jobs/<id> 和"状态 <id>"查询
+
+作者：大秘书系统
+版本：v1.0
+创建时间：2026-03-21
+"""
+
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# 任务状态
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_SUCCEEDED = 'succeeded'
+STATUS_FAILED = 'failed'
+
+# 任务成功后写入完成状态的重试次数（数据库被锁时），避免把已成功的任务当作失败重新执行
+COMPLETE_RETRIES = 3
+
+
+class JobFailed(Exception):
+    """任务确定失败（不重试，通常已通知用户）"""
+
+
+class JobQueue:
+    """SQLite 持久化任务队列"""
+
+    def __init__(self, db_path, lease_seconds=900, max_attempts=3, max_running=None, type_limits=None):
+        """
+        初始化任务队列
+
+        Args:
+            db_path: 数据库文件路径
+            lease_seconds: 租约时长（秒），worker 需在到期前续约
+            max_attempts: 最大执行次数（含崩溃后的重试）
+            max_running: 全局同时运行的任务上限（None 表示不限）
+            type_limits: 按任务类型的并发上限 {job_type: n}
+        """
+        self.db_path = Path(db_path).expanduser()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.max_running = max_running
+        self.type_limits = type_limits or {}
+        self._local = threading.local()
+
+        conn = self._conn()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            ' id TEXT PRIMARY KEY,'
+            ' job_type TEXT NOT NULL,'
+            ' payload TEXT NOT NULL,'
+            ' user_open_id TEXT,'
+            ' status TEXT NOT NULL,'
+            ' attempts INTEGER NOT NULL DEFAULT 0,'
+            ' progress TEXT,'
+            ' result TEXT,'
+            ' error TEXT,'
+            ' worker_id TEXT,'
+            ' lease_expires_at REAL,'
+            ' created_at REAL NOT NULL,'
+            ' started_at REAL,'
+            ' finished_at REAL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_user ON jobs (user_open_id, created_at)')
+
+        logger.info(f"JobQueue initialized: {self.db_path}, lease={lease_seconds}s, "
+                    f"max_running={max_running}, type_limits={self.type_limits}")
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=10, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, job_type, payload=None, user_open_id=None):
+        """
+        提交任务
+
+        Args:
+            job_type: 任务类型
+            payload: 任务参数（可 JSON 序列化）
+            user_open_id: 提交任务的用户
+
+        Returns:
+            str: 任务 ID
+        """
+        job_id = uuid.uuid4().hex[:8]
+        self._conn().execute(
+            'INSERT INTO jobs (id, job_type, payload, user_open_id, status, created_at) VALUES (?, ?, ?, ?, ?, ?)',
+            (job_id, job_type, json.dumps(payload or {}, ensure_ascii=False), user_open_id, STATUS_QUEUED, time.time())
+        )
+        logger.info(f"任务已入队: {job_id} ({job_type})")
+        return job_id
+
+    def lease(self, worker_id, job_types=None):
+        """
+        领取一个可执行的任务（排队中或租约已过期），遵守并发限制
+
+        Args:
+            worker_id: worker 标识
+            job_types: 只领取这些类型（None 表示全部）
+
+        Returns:
+            dict: 任务，没有可执行任务时返回 None
+        """
+        while True:
+            job_id, exhausted = self._lease_one(worker_id, job_types)
+            if not exhausted:
+                return self.get(job_id) if job_id else None
+
+    def _lease_one(self, worker_id, job_types):
+        """
+        在一个写事务内领取任务
+
+        Returns:
+            tuple: (任务 ID 或 None, 是否因超过最大次数被标记为失败)
+        """
+        conn = self._conn()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # 统计仍持有有效租约的任务
+            running = dict(conn.execute(
+                'SELECT job_type, COUNT(*) FROM jobs WHERE status = ? AND lease_expires_at > ? GROUP BY job_type',
+                (STATUS_RUNNING, now)
+            ).fetchall())
+            if self.max_running is not None and sum(running.values()) >= self.max_running:
+                conn.execute('COMMIT')
+                return None, False
+
+            blocked = [t for t, limit in self.type_limits.items() if running.get(t, 0) >= limit]
+            sql = 'SELECT * FROM jobs WHERE (status = ? OR (status = ? AND lease_expires_at <= ?))'
+            params = [STATUS_QUEUED, STATUS_RUNNING, now]
+            if blocked:
+                sql += f" AND job_type NOT IN ({','.join('?' * len(blocked))})"
+                params.extend(blocked)
+            if job_types:
+                sql += f" AND job_type IN ({','.join('?' * len(job_types))})"
+                params.extend(job_types)
+            sql += ' ORDER BY created_at LIMIT 1'
+
+            row = conn.execute(sql, params).fetchone()
+            if row is None:
+                conn.execute('COMMIT')
+                return None, False
+
+            if row['status'] == STATUS_RUNNING:
+                logger.warning(f"任务 {row['id']} 租约过期（worker={row['worker_id']}），重新领取")
+
+            if row['attempts'] >= self.max_attempts:
+                conn.execute(
+                    'UPDATE jobs SET status = ?, error = ?, finished_at = ?, lease_expires_at = NULL WHERE id = ?',
+                    (STATUS_FAILED, f"超过最大执行次数 ({self.max_attempts})", now, row['id'])
+                )
+                conn.execute('COMMIT')
+                return row['id'], True
+
+            conn.execute(
+                'UPDATE jobs SET status = ?, attempts = attempts + 1, worker_id = ?, lease_expires_at = ?,'
+                ' started_at = COALESCE(started_at, ?) WHERE id = ?',
+                (STATUS_RUNNING, worker_id, now + self.lease_seconds, now, row['id'])
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        return row['id'], False
+
+    def heartbeat(self, job_id, worker_id, progress=None):
+        """
+        续约（并可更新进度）
+
+        Returns:
+            bool: 是否仍持有租约
+        """
+        sql = 'UPDATE jobs SET lease_expires_at = ?'
+        params = [time.time() + self.lease_seconds]
+        if progress is not None:
+            sql += ', progress = ?'
+            params.append(progress)
+        sql += ' WHERE id = ? AND worker_id = ? AND status = ?'
+        params.extend([job_id, worker_id, STATUS_RUNNING])
+        return self._conn().execute(sql, params).rowcount == 1
+
+    def complete(self, job_id, worker_id, result=None):
+        """标记任务成功"""
+        self._finish(job_id, worker_id, STATUS_SUCCEEDED, result=result)
+
+    def fail(self, job_id, worker_id, error, retry=True):
+        """
+        标记任务失败
+
+        Args:
+            retry: 未达最大次数时是否重新入队
+        """
+        job = self.get(job_id)
+        if retry and job and job['attempts'] < self.max_attempts:
+            self._conn().execute(
+                'UPDATE jobs SET status = ?, error = ?, worker_id = NULL, lease_expires_at = NULL'
+                ' WHERE id = ? AND worker_id = ?',
+                (STATUS_QUEUED, error, job_id, worker_id)
+            )
+            logger.warning(f"任务 {job_id} 失败，重新入队（第 {job['attempts']} 次）: {error}")
+            return
+        self._finish(job_id, worker_id, STATUS_FAILED, error=error)
+
+    def _finish(self, job_id, worker_id, status, result=None, error=None):
+        self._conn().execute(
+            'UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, lease_expires_at = NULL'
+            ' WHERE id = ? AND worker_id = ?',
+            (status, json.dumps(result, ensure_ascii=False) if result is not None else None,
+             error, time.time(), job_id, worker_id)
+        )
+        logger.info(f"任务 {job_id} 结束: {status}")
+
+    def get(self, job_id):
+        """
+        查询任务
+
+        Returns:
+            dict: 任务详情（含 queued_seconds / run_seconds），不存在返回 None
+        """
+        row = self._conn().execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return _row_to_job(row) if row else None
+
+    def recent(self, user_open_id=None, limit=5):
+        """查询最近的任务（可按用户过滤）"""
+        if user_open_id:
+            rows = self._conn().execute(
+                'SELECT * FROM jobs WHERE user_open_id = ? ORDER BY created_at DESC LIMIT ?', (user_open_id, limit)
+            ).fetchall()
+        else:
+            rows = self._conn().execute('SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?', (limit,)).fetchall()
+        return [_row_to_job(row) for row in rows]
+
+    def counts(self):
+        """各状态的任务数"""
+        return dict(self._conn().execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall())
+
+
+def _row_to_job(row):
+    job = dict(row)
+    job['payload'] = json.loads(job['payload']) if job['payload'] else {}
+    job['result'] = json.loads(job['result']) if job['result'] else None
+
+    now = time.time()
+    started_at = job['started_at']
+    job['queued_seconds'] = round((started_at or now) - job['created_at'], 1)
+    job['run_seconds'] = round((job['finished_at'] or now) - started_at, 1) if started_at else None
+    return job
+
+
+class JobWorkerPool:
+    """任务执行线程池 - 轮询领取任务，执行期间自动续约"""
+
+    def __init__(self, queue, handlers, concurrency=2, poll_interval=2.0, worker_prefix='worker'):
+        """
+        初始化线程池
+
+        Args:
+            queue: JobQueue
+            handlers: {job_type: fn(job, progress)}，progress(text) 用于上报进度；
+                      抛出 JobFailed 表示确定失败（不重试），其他异常按 max_attempts 重试
+            concurrency: 本进程的执行线程数
+            poll_interval: 无任务时的轮询间隔（秒）
+            worker_prefix: worker 标识前缀
+        """
+        self.queue = queue
+        self.handlers = handlers
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.worker_prefix = f"{worker_prefix}-{uuid.uuid4().hex[:6]}"
+
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._threads = []
+        # job_id -> worker_id，续约线程使用
+        self._active = {}
+        self._active_lock = threading.Lock()
+
+    def start(self):
+        """启动执行线程和续约线程（已启动时不重复启动）"""
+        if self._threads:
+            return
+        for i in range(self.concurrency):
+            thread = threading.Thread(target=self._loop, args=(f"{self.worker_prefix}-{i}",),
+                                      name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+        renewer = threading.Thread(target=self._renew_loop, name='job-lease-renewer', daemon=True)
+        renewer.start()
+        self._threads.append(renewer)
+
+        logger.info(f"JobWorkerPool started: {self.worker_prefix}, concurrency={self.concurrency}")
+
+    def is_alive(self):
+        """执行线程和续约线程是否都在运行"""
+        return bool(self._threads) and all(thread.is_alive() for thread in self._threads)
+
+    def notify(self):
+        """有新任务入队，唤醒空闲线程"""
+        self._wakeup.set()
+
+    def stop(self, timeout=None):
+        """停止领取新任务并等待线程退出"""
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _loop(self, worker_id):
+        job_types = list(self.handlers)
+        while not self._stop.is_set():
+            try:
+                job = self.queue.lease(worker_id, job_types)
+            except sqlite3.Error as e:
+                logger.error(f"领取任务失败: {e}")
+                job = None
+
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            self._run(worker_id, job)
+
+    def _run(self, worker_id, job):
+        job_id = job['id']
+        with self._active_lock:
+            self._active[job_id] = worker_id
+
+        def progress(text):
+            self.queue.heartbeat(job_id, worker_id, progress=text)
+
+        try:
+            try:
+                result = self.handlers[job['job_type']](job, progress)
+            except JobFailed as e:
+                self._fail(job_id, worker_id, str(e), retry=False)
+            except Exception as e:
+                logger.error(f"任务 {job_id} ({job['job_type']}) 异常: {e}", exc_info=True)
+                self._fail(job_id, worker_id, str(e))
+            else:
+                self._complete(job_id, worker_id, result)
+        finally:
+            with self._active_lock:
+                self._active.pop(job_id, None)
+
+    def _complete(self, job_id, worker_id, result):
+        """记录任务成功；写入失败时重试，不会把已成功的任务重新入队"""
+        for attempt in range(COMPLETE_RETRIES):
+            try:
+                self.queue.complete(job_id, worker_id, result)
+                return
+            except sqlite3.Error as e:
+                logger.warning(f"记录任务 {job_id} 完成失败（第 {attempt + 1} 次）: {e}")
+                if self._stop.wait(2 ** attempt):
+                    break
+        # 仍失败时保持 running，租约到期后按进程崩溃的任务处理
+        logger.error(f"任务 {job_id} 已执行成功但无法写入完成状态")
+
+    def _fail(self, job_id, worker_id, error, retry=True):
+        """记录任务失败；数据库异常不会中断执行线程"""
+        try:
+            self.queue.fail(job_id, worker_id, error, retry=retry)
+        except sqlite3.Error as e:
+            logger.error(f"记录任务 {job_id} 失败状态失败: {e}")
+
+    def _renew_loop(self):
+        # 每 1/3 租约时长续约一次
+        interval = max(self.queue.lease_seconds / 3, 1)
+        while not self._stop.wait(interval):
+            with self._active_lock:
+                active = list(self._active.items())
+            for job_id, worker_id in active:
+                try:
+                    if not self.queue.heartbeat(job_id, worker_id):
+                        logger.warning(f"任务 {job_id} 的租约已失效（可能已被其他 worker 接管）")
+                except sqlite3.Error as e:
+                    logger.error(f"续约失败 {job_id}: {e}")
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+JSON 数组流式读取
+
+功能：
+1. 逐条读取 JSON 数组元素，内存占用只与单条记录大小有关
+2. 支持顶层数组 [...] 和 {"data": [...]} 两种 MediaCrawler 导出格式
+3. 只依赖标准库（json.JSONDecoder.raw_decode），无需 ijson
+
+用法：
+    for note in iter_json_items(path):
+        ...
+
+作者：大秘书系统
+版本：v1.0
+创建时间：2026-03-21
+"""
+
+import json
+import re
+
+# 每次从文件读取的字符数
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+_WHITESPACE = re.compile(r'[ \t\n\r\ufeff]*')
+# 合法 JSON 中值后面可能出现的字符
+_VALUE_END = frozenset(' \t\n\r,]}:')
+_decoder = json.JSONDecoder()
+
+
+class _Reader:
+    """带缓冲的 JSON 词法读取器"""
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size=None):
+        """追加读取数据，返回是否读到了新内容"""
+        if self.eof:
+            return False
+        chunk = self.f.read(size or self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        # 丢弃已消费的部分，保持缓冲区大小稳定
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """跳过空白，返回下一个字符（文件结束时返回空串）"""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, chars):
+        """读取下一个字符，必须属于 chars"""
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(f"JSON 格式错误：期望 {chars!r}，实际为 {char or 'EOF'!r}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        """解析下一个完整的 JSON 值"""
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+                # 数字在缓冲区边界处可能只解析出前缀（如 "2." 只解析出 2），
+                # 后面紧跟分隔符才说明值已读完整
+                if self.eof or (end < len(self.buf) and self.buf[end] in _VALUE_END):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # 数据不完整：继续读取（单条记录很大时逐步加大读取量）
+            if not self._fill(size):
+                continue
+            size *= 2
+
+
+def iter_json_items(path, key='data', chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    逐条读取 JSON 文件中的数组元素
+
+    Args:
+        path: JSON 文件路径
+        key: 顶层为对象时，数组所在的字段名
+        chunk_size: 每次读取的字符数
+
+    Yields:
+        数组中的每个元素；顶层对象中没有 key 字段（或不是数组）时不产生任何元素
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        reader = _Reader(f, chunk_size)
+        first = reader.peek()
+
+        if first == '{':
+            reader.pos += 1
+            if not _seek_member(reader, key):
+                return
+        elif first != '[':
+            return
+
+        reader.expect('[')
+        if reader.peek() == ']':
+            return
+        while True:
+            yield reader.value()
+            if reader.expect(',]') == ']':
+                return
+
+
+def _seek_member(reader, key):
+    """在顶层对象中定位到字段 key 的值之前；字段不存在或不是数组时返回 False"""
+    if reader.peek() == '}':
+        return False
+    while True:
+        name = reader.value()
+        reader.expect(':')
+        if name == key and reader.peek() == '[':
+            return True
+        # 跳过其他字段的值
+        reader.value()
+        if reader.expect(',}') == '}':
+            return False
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+异步日志写入器
+
+功能：
+1. 请求线程只把记录放入有界内存队列，磁盘 I/O 由后台线程完成
+2. 后台线程批量写入，按条数或时间间隔刷盘
+3. 按天滚动（<stream>_YYYYMMDD.log），文件句柄跨批次复用
+4. 队列满时丢弃新记录并计数，不阻塞请求线程
+
+作者：大秘书系统
+版本：v1.0
+创建时间：2026-03-21
+"""
+
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+from pathlib import Path
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# 关闭时放入队列的哨兵
+_STOP = object()
+
+
+class LogSink:
+    """后台批量写入的日志汇"""
+
+    def __init__(self, log_dir, max_queue=10000, batch_size=500, flush_interval=1.0):
+        """
+        初始化日志汇
+
+        Args:
+            log_dir: 日志目录
+            max_queue: 内存队列上限（超过后丢弃新记录）
+            batch_size: 单批最多写入条数
+            flush_interval: 最长刷盘间隔（秒）
+        """
+        self.log_dir = Path(log_dir).expanduser()
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        # stream -> (日期, 文件句柄)
+        self._files = {}
+        self.stats = {'written': 0, 'dropped': 0, 'batches': 0}
+
+        self._thread = threading.Thread(target=self._loop, name='log-sink', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+        logger.info(f"LogSink initialized: {self.log_dir}, max_queue={max_queue}")
+
+    def write(self, stream, record):
+        """
+        写入一条记录（非阻塞）
+
+        Args:
+            stream: 日志流名称（决定文件名前缀，如 messages / access）
+            record: 文本行，或 dict（在后台线程序列化为 JSON 行）
+
+        Returns:
+            bool: 是否已入队（队列满时返回 False）
+        """
+        try:
+            self._queue.put_nowait((stream, time.time(), record))
+            return True
+        except queue.Full:
+            self.stats['dropped'] += 1
+            return False
+
+    def is_alive(self):
+        """后台写入线程是否在运行"""
+        return self._thread.is_alive()
+
+    @property
+    def pending(self):
+        """队列中待写入的记录数"""
+        return self._queue.qsize()
+
+    def flush(self, timeout=5.0):
+        """等待队列中已有的记录写入磁盘（用于测试或关闭前）"""
+        done = threading.Event()
+        try:
+            self._queue.put(('', 0, done), timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self):
+        """写完剩余记录并关闭文件"""
+        if not self._thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout=5)
+
+    def _loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            # 攒批：直到达到批量上限或超过刷盘间隔
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            stop = self._write_batch(batch)
+            if stop:
+                self._close_files()
+                return
+
+    def _write_batch(self, batch):
+        """写入一批记录，返回是否收到关闭信号"""
+        stop = False
+        events = []
+        touched = set()
+
+        for item in batch:
+            if item is _STOP:
+                stop = True
+                continue
+            stream, ts, record = item
+            if isinstance(record, threading.Event):
+                events.append(record)
+                continue
+
+            try:
+                if isinstance(record, dict):
+                    line = json.dumps({'ts': datetime.fromtimestamp(ts).isoformat(), **record}, ensure_ascii=False)
+                else:
+                    line = str(record)
+                f = self._file_for(stream, ts)
+                f.write(line.rstrip('\n') + '\n')
+                touched.add(f)
+                self.stats['written'] += 1
+            except Exception as e:
+                logger.warning(f"写入日志失败 ({stream}): {e}")
+
+        for f in touched:
+            try:
+                f.flush()
+            except Exception as e:
+                logger.warning(f"刷新日志失败: {e}")
+        self.stats['batches'] += 1
+
+        for event in events:
+            event.set()
+        return stop
+
+    def _file_for(self, stream, ts):
+        """获取 stream 当天的文件句柄（跨天时切换到新文件）"""
+        day = datetime.fromtimestamp(ts).strftime('%Y%m%d')
+        current = self._files.get(stream)
+        if current and current[0] == day:
+            return current[1]
+
+        if current:
+            current[1].close()
+        f = open(self.log_dir / f"{stream}_{day}.log", 'a', encoding='utf-8')
+        self._files[stream] = (day, f)
+        return f
+
+    def _close_files(self):
+        for _, f in self._files.values():
+            try:
+                f.close()
+            except Exception:
+                pass
+        self._files.clear()
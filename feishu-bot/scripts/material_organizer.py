@@ -7,6 +7,12 @@
 2. 生成元数据JSON文件
 3. 自动生成可搜索的index.md索引
 4. 管理文件命名规范
+5. 材料清单（.manifest.db）：组织材料时增量写入，index.md 由清单生成，
+   无需每次扫描全部目录；目录被手工改动后可用 --repair 全量重建
+6. 全文检索：清单附带 FTS5 索引（标题、作者、标签、正文、转录文字），
+   按相关度、点赞数和发布时间排序（--search 关键词）
+7. 封面、视频、图片存入内容寻址存储（media_store），文件夹中为硬链接，
+   相同文件只占一份磁盘空间
 
 作者：大秘书系统
 版本：v1.0
@@ -16,14 +22,53 @@
 import os
 import re
 import json
+import math
 import shutil
+import sqlite3
 import logging
+import threading
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Optional
 
+from media_store import get_media_store
+
 logger = logging.getLogger(__name__)
 
+# 清单分类 -> (index.md 中的名称, 单位)
+INDEX_SECTIONS = {
+    'xhs_video': ('小红书视频', '视频笔记'),
+    'xhs_image': ('小红书图文', '图文笔记'),
+    'wechat': ('微信文章', '文章')
+}
+# index.md 每个分类显示的条数
+INDEX_SECTION_LIMIT = 20
+
+# 分类 -> 中文名称（搜索结果展示用）
+CATEGORY_NAMES = {category: name for category, (name, _) in INDEX_SECTIONS.items()}
+# 搜索排序：相关度 + 点赞（对数）+ 新近程度（按半衰期衰减）
+SEARCH_LIKES_WEIGHT = 1.0
+SEARCH_RECENCY_WEIGHT = 2.0
+SEARCH_RECENCY_HALF_LIFE_DAYS = 90
+# trigram 分词：少于 3 个字的关键词无法走索引，改用 LIKE 匹配
+FTS_MIN_TERM_LENGTH = 3
+
+
+def parse_count(value):
+    """把点赞数等计数转换为整数（支持 "1.2万"、"3k" 等写法）"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    text = str(value or '').strip().lower().replace(',', '')
+    multiplier = 1
+    if text.endswith('万') or text.endswith('w'):
+        multiplier, text = 10000, text[:-1]
+    elif text.endswith('k'):
+        multiplier, text = 1000, text[:-1]
+    try:
+        return int(float(text) * multiplier)
+    except ValueError:
+        return 0
+
 
 class MaterialOrganizer:
     """材料组织器 - 将采集的内容按类型组织到对标参考文件夹"""
@@ -31,12 +76,13 @@ class MaterialOrganizer:
     # 文件名最大长度（避免过长）
     MAX_FILENAME_LENGTH = 100
 
-    def __init__(self, material_base_path=None):
+    def __init__(self, material_base_path=None, media_store=None):
         """
         初始化材料组织器
 
         Args:
             material_base_path: 材料存储基础路径
+            media_store: 媒体存储（默认使用共享存储，传 False 时直接复制文件）
         """
         if material_base_path is None:
             material_base_path = Path.home() / "Desktop" / "DaMiShuSystem-main-backup" / "工作空间" / "对标参考"
@@ -57,8 +103,159 @@ class MaterialOrganizer:
         # 索引文件
         self.index_file = self.material_base / "index.md"
 
+        if media_store is None:
+            try:
+                media_store = get_media_store()
+            except Exception as e:
+                logger.warning(f"媒体存储不可用，改为直接复制文件: {e}")
+                media_store = False
+        self.media_store = media_store or None
+
+        # 材料清单
+        self.manifest_file = self.material_base / ".manifest.db"
+        self._local = threading.local()
+        self._init_manifest()
+
         logger.info(f"MaterialOrganizer initialized: {self.material_base}")
 
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.manifest_file), timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_manifest(self):
+        """创建清单表和全文索引；首次创建时从现有目录全量导入"""
+        conn = self._conn()
+        existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS materials (
+                category TEXT NOT NULL,
+                folder TEXT NOT NULL,
+                title TEXT,
+                date TEXT,
+                likes INTEGER,
+                metadata TEXT,
+                updated_at REAL,
+                PRIMARY KEY (category, folder)
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_materials_date ON materials (category, date DESC, folder DESC)")
+        # rowid 与 materials 表一致；trigram 分词支持中文子串检索
+        conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS materials_fts USING fts5(
+                title, author, tags, body, transcript,
+                tokenize = 'trigram'
+            )
+        """)
+        conn.commit()
+
+        if 'materials' not in existing or 'materials_fts' not in existing:
+            result = self.rebuild_manifest()
+            logger.info(f"材料清单已初始化: {result['stats']['total']} 条")
+
+    def _manifest_row(self, category, folder_name, metadata):
+        return (
+            category,
+            folder_name,
+            metadata.get('title', ''),
+            folder_name[:10],  # YYYY-MM-DD
+            metadata.get('likes', 0) if category != 'wechat' else None,
+            json.dumps(metadata, ensure_ascii=False, default=str),
+            datetime.now().timestamp()
+        )
+
+    def _search_fields(self, folder_path, metadata):
+        """读取材料文件夹中的检索字段：(标题, 作者, 标签, 正文, 转录文字)"""
+        def read(name):
+            path = folder_path / name
+            if not path.exists():
+                return ''
+            try:
+                return path.read_text(encoding='utf-8')
+            except Exception as e:
+                logger.warning(f"读取 {path} 失败: {e}")
+                return ''
+
+        tags = metadata.get('tags') or ''
+        if isinstance(tags, (list, tuple)):
+            tags = ' '.join(str(tag) for tag in tags)
+
+        body = read('article.md') or read('content.md') or metadata.get('desc', '')
+        return (metadata.get('title', ''), metadata.get('author', ''), tags, body, read('transcript.txt'))
+
+    def _upsert(self, conn, category, folder_path, metadata):
+        row = self._manifest_row(category, folder_path.name, metadata)
+        conn.execute(
+            "INSERT INTO materials (category, folder, title, date, likes, metadata, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (category, folder) DO UPDATE SET "
+            "title = excluded.title, date = excluded.date, likes = excluded.likes, "
+            "metadata = excluded.metadata, updated_at = excluded.updated_at",
+            row
+        )
+        rowid = conn.execute(
+            "SELECT rowid FROM materials WHERE category = ? AND folder = ?", (category, folder_path.name)
+        ).fetchone()[0]
+        conn.execute(
+            "INSERT OR REPLACE INTO materials_fts (rowid, title, author, tags, body, transcript) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (rowid,) + self._search_fields(folder_path, metadata)
+        )
+
+    def _record(self, category, folder_path, metadata):
+        """组织材料后写入清单和全文索引（单条 upsert）"""
+        conn = self._conn()
+        with conn:
+            self._upsert(conn, category, folder_path, metadata)
+
+    def rebuild_manifest(self):
+        """
+        全量扫描材料目录重建清单和全文索引（用于修复手工增删文件夹造成的偏差）
+
+        Returns:
+            dict: {success, stats: {xhs_video, xhs_image, wechat, total}}
+        """
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM materials")
+            conn.execute("DELETE FROM materials_fts")
+            for category, dir_path in self.dirs.items():
+                for folder in dir_path.glob('*_*'):
+                    metadata_file = folder / "metadata.json"
+                    if not folder.is_dir() or not metadata_file.exists():
+                        continue
+                    try:
+                        with open(metadata_file, 'r', encoding='utf-8') as f:
+                            metadata = json.load(f)
+                    except Exception as e:
+                        logger.warning(f"跳过无法解析的元数据 {metadata_file}: {e}")
+                        continue
+                    self._upsert(conn, category, folder, metadata)
+
+        stats = self._manifest_stats()
+        logger.info(f"材料清单已重建: {stats}")
+        return {'success': True, 'stats': stats}
+
+    def _manifest_stats(self):
+        counts = dict(self._conn().execute("SELECT category, COUNT(*) FROM materials GROUP BY category").fetchall())
+        stats = {category: counts.get(category, 0) for category in self.dirs}
+        stats['total'] = sum(stats.values())
+        return stats
+
+    def _copy_media(self, src, dest):
+        """复制媒体文件到材料文件夹（经媒体存储去重，失败时退回普通复制）"""
+        if self.media_store:
+            try:
+                self.media_store.import_file(src, dest)
+                return
+            except Exception as e:
+                logger.warning(f"媒体存储写入失败，改为直接复制 {src}: {e}")
+        shutil.copy2(src, dest)
+
     def sanitize_filename(self, filename):
         """
         清理文件名，移除非法字符
@@ -122,6 +319,24 @@ class MaterialOrganizer:
 
         return f"{date_str}_{seq_num:04d}_{title_clean}"
 
+    def _create_folder(self, dir_key, metadata):
+        """
+        生成并创建材料文件夹（序号被占用时顺延，多进程同时导入也不会写入同一文件夹）
+
+        Returns:
+            tuple: (文件夹名, 文件夹路径)
+        """
+        date_str, seq, title = self.generate_folder_name(metadata).split('_', 2)
+        seq_num = int(seq)
+        while True:
+            folder_name = f"{date_str}_{seq_num:04d}_{title}"
+            folder_path = self.dirs[dir_key] / folder_name
+            try:
+                folder_path.mkdir(parents=True)
+                return folder_name, folder_path
+            except FileExistsError:
+                seq_num += 1
+
     def organize_xhs_video(self, note_data, media_files=None):
         """
         组织小红书视频笔记材料
@@ -154,14 +369,13 @@ class MaterialOrganizer:
             'likes': note_data.get('liked_count', note_data.get('likes', 0)),
             'collects': note_data.get('collected_count', note_data.get('collects', 0)),
             'comments': note_data.get('comment_count', note_data.get('comments', 0)),
+            'tags': note_data.get('tags', note_data.get('tag_list', '')),
             'url': note_data.get('url', ''),
             'original_url': note_data.get('original_url', '')
         }
 
         # 生成文件夹名
-        folder_name = self.generate_folder_name(metadata)
-        folder_path = self.dirs['xhs_video'] / folder_name
-        folder_path.mkdir(parents=True, exist_ok=True)
+        folder_name, folder_path = self._create_folder('xhs_video', metadata)
 
         logger.info(f"Organizing XHS video: {folder_name}")
 
@@ -176,12 +390,12 @@ class MaterialOrganizer:
         if media_files:
             if media_files.get('cover'):
                 cover_dest = folder_path / "cover.jpg"
-                shutil.copy2(media_files['cover'], cover_dest)
+                self._copy_media(media_files['cover'], cover_dest)
                 saved_files['cover'] = str(cover_dest)
 
             if media_files.get('video'):
                 video_dest = folder_path / "video.mp4"
-                shutil.copy2(media_files['video'], video_dest)
+                self._copy_media(media_files['video'], video_dest)
                 saved_files['video'] = str(video_dest)
 
             if media_files.get('transcript'):
@@ -197,6 +411,8 @@ class MaterialOrganizer:
                 f.write(metadata['desc'])
             saved_files['content'] = str(desc_file)
 
+        self._record('xhs_video', folder_path, metadata)
+
         logger.info(f"XHS video organized: {folder_path}")
         return {
             'success': True,
@@ -234,14 +450,13 @@ class MaterialOrganizer:
             'likes': note_data.get('liked_count', note_data.get('likes', 0)),
             'collects': note_data.get('collected_count', note_data.get('collects', 0)),
             'comments': note_data.get('comment_count', note_data.get('comments', 0)),
+            'tags': note_data.get('tags', note_data.get('tag_list', '')),
             'url': note_data.get('url', ''),
             'original_url': note_data.get('original_url', '')
         }
 
         # 生成文件夹名
-        folder_name = self.generate_folder_name(metadata)
-        folder_path = self.dirs['xhs_image'] / folder_name
-        folder_path.mkdir(parents=True, exist_ok=True)
+        folder_name, folder_path = self._create_folder('xhs_image', metadata)
 
         logger.info(f"Organizing XHS image: {folder_name}")
 
@@ -256,7 +471,7 @@ class MaterialOrganizer:
         if media_files:
             if media_files.get('cover'):
                 cover_dest = folder_path / "cover.jpg"
-                shutil.copy2(media_files['cover'], cover_dest)
+                self._copy_media(media_files['cover'], cover_dest)
                 saved_files['cover'] = str(cover_dest)
 
             # 多张图片
@@ -266,7 +481,7 @@ class MaterialOrganizer:
                 for i, img_path in enumerate(media_files['images'], 1):
                     img_ext = img_path.suffix
                     img_dest = images_dir / f"image_{i:03d}{img_ext}"
-                    shutil.copy2(img_path, img_dest)
+                    self._copy_media(img_path, img_dest)
                 saved_files['images'] = str(images_dir)
 
         # 保存正文
@@ -277,6 +492,8 @@ class MaterialOrganizer:
                 f.write(metadata['desc'])
             saved_files['content'] = str(desc_file)
 
+        self._record('xhs_image', folder_path, metadata)
+
         logger.info(f"XHS image organized: {folder_path}")
         return {
             'success': True,
@@ -310,9 +527,7 @@ class MaterialOrganizer:
         }
 
         # 生成文件夹名
-        folder_name = self.generate_folder_name(metadata)
-        folder_path = self.dirs['wechat'] / folder_name
-        folder_path.mkdir(parents=True, exist_ok=True)
+        folder_name, folder_path = self._create_folder('wechat', metadata)
 
         logger.info(f"Organizing WeChat article: {folder_name}")
 
@@ -330,6 +545,8 @@ class MaterialOrganizer:
                 f.write(markdown_content)
             saved_files['article'] = str(article_file)
 
+        self._record('wechat', folder_path, metadata)
+
         logger.info(f"WeChat article organized: {folder_path}")
         return {
             'success': True,
@@ -339,73 +556,102 @@ class MaterialOrganizer:
             'metadata': metadata
         }
 
+    def search(self, query, limit=10, category=None):
+        """
+        全文检索材料库
+
+        Args:
+            query: 关键词（空格分隔多个词，需全部命中）
+            limit: 返回条数
+            category: 限定分类（xhs_video/xhs_image/wechat）
+
+        Returns:
+            list: [{category, folder, path, title, author, date, likes, snippet, score}]，按综合得分降序
+        """
+        terms = [term for term in query.split() if term]
+        if not terms:
+            return []
+
+        long_terms = [term for term in terms if len(term) >= FTS_MIN_TERM_LENGTH]
+        short_terms = [term for term in terms if len(term) < FTS_MIN_TERM_LENGTH]
+
+        conditions, params = [], []
+        if long_terms:
+            conditions.append("materials_fts MATCH ?")
+            params.append(' AND '.join('"{}"'.format(term.replace('"', '""')) for term in long_terms))
+        for term in short_terms:
+            pattern = '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            conditions.append("(" + " OR ".join(
+                f"f.{column} LIKE ? ESCAPE '\\'" for column in ('title', 'author', 'tags', 'body', 'transcript')
+            ) + ")")
+            params.extend([pattern] * 5)
+        if category:
+            conditions.append("m.category = ?")
+            params.append(category)
+
+        relevance = "bm25(materials_fts, 10.0, 5.0, 5.0, 1.0, 1.0)" if long_terms else "0"
+        sql = (
+            f"SELECT m.category, m.folder, m.title, m.date, m.likes, f.author, f.body, f.transcript, {relevance} "
+            f"FROM materials_fts f JOIN materials m ON m.rowid = f.rowid "
+            f"WHERE {' AND '.join(conditions)} "
+            f"ORDER BY {relevance + ', ' if long_terms else ''}m.date DESC LIMIT ?"
+        )
+        # 先按相关度取候选，再结合点赞和新近程度重排
+        params.append(max(limit * 20, 200))
+        rows = self._conn().execute(sql, params).fetchall()
+
+        today = datetime.now()
+        results = []
+        for category_name, folder, title, date, likes, author, body, transcript, bm25 in rows:
+            try:
+                age_days = max((today - datetime.strptime(date, '%Y-%m-%d')).days, 0)
+            except (TypeError, ValueError):
+                age_days = 365 * 10
+            like_count = parse_count(likes)
+            score = (
+                -bm25
+                + SEARCH_LIKES_WEIGHT * math.log10(1 + like_count)
+                + SEARCH_RECENCY_WEIGHT * 0.5 ** (age_days / SEARCH_RECENCY_HALF_LIFE_DAYS)
+            )
+            results.append({
+                'category': category_name,
+                'folder': folder,
+                'path': str(self.dirs[category_name] / folder),
+                'title': title,
+                'author': author,
+                'date': date,
+                'likes': like_count,
+                'snippet': self._snippet(terms, body, transcript),
+                'score': round(score, 4)
+            })
+
+        results.sort(key=lambda item: item['score'], reverse=True)
+        return results[:limit]
+
+    @staticmethod
+    def _snippet(terms, *texts, width=40):
+        """截取首个命中关键词附近的文字"""
+        for text in texts:
+            if not text:
+                continue
+            lowered = text.lower()
+            for term in terms:
+                pos = lowered.find(term.lower())
+                if pos >= 0:
+                    start = max(pos - width // 2, 0)
+                    snippet = text[start:pos + len(term) + width // 2].replace('\n', ' ').strip()
+                    return ('…' if start > 0 else '') + snippet + '…'
+        return ''
+
     def update_index(self):
         """
-        更新或创建索引文件 index.md
+        根据材料清单重新生成索引文件 index.md（不扫描目录）
 
         Returns:
             dict: 索引更新结果
         """
-        # 统计各类型材料
-        index_data = {
-            'xhs_video': [],
-            'xhs_image': [],
-            'wechat': []
-        }
-
-        # 扫描小红书视频
-        for folder in self.dirs['xhs_video'].glob('*_*'):
-            if folder.is_dir():
-                metadata_file = folder / "metadata.json"
-                if metadata_file.exists():
-                    try:
-                        with open(metadata_file, 'r', encoding='utf-8') as f:
-                            metadata = json.load(f)
-                        index_data['xhs_video'].append({
-                            'folder': folder.name,
-                            'title': metadata.get('title', ''),
-                            'date': folder.name[:10],  # YYYY-MM-DD
-                            'likes': metadata.get('likes', 0)
-                        })
-                    except:
-                        pass
-
-        # 扫描小红书图文
-        for folder in self.dirs['xhs_image'].glob('*_*'):
-            if folder.is_dir():
-                metadata_file = folder / "metadata.json"
-                if metadata_file.exists():
-                    try:
-                        with open(metadata_file, 'r', encoding='utf-8') as f:
-                            metadata = json.load(f)
-                        index_data['xhs_image'].append({
-                            'folder': folder.name,
-                            'title': metadata.get('title', ''),
-                            'date': folder.name[:10],
-                            'likes': metadata.get('likes', 0)
-                        })
-                    except:
-                        pass
-
-        # 扫描微信文章
-        for folder in self.dirs['wechat'].glob('*_*'):
-            if folder.is_dir():
-                metadata_file = folder / "metadata.json"
-                if metadata_file.exists():
-                    try:
-                        with open(metadata_file, 'r', encoding='utf-8') as f:
-                            metadata = json.load(f)
-                        index_data['wechat'].append({
-                            'folder': folder.name,
-                            'title': metadata.get('title', ''),
-                            'date': folder.name[:10]
-                        })
-                    except:
-                        pass
-
-        # 按日期排序（最新的在前）
-        for key in index_data:
-            index_data[key].sort(key=lambda x: x['date'], reverse=True)
+        stats = self._manifest_stats()
+        conn = self._conn()
 
         # 生成Markdown索引
         index_content = f"""# 对标参考材料索引
@@ -418,55 +664,36 @@ class MaterialOrganizer:
 
 | 类型 | 数量 |
 |------|------|
-| 小红书视频 | {len(index_data['xhs_video'])} |
-| 小红书图文 | {len(index_data['xhs_image'])} |
-| 微信文章 | {len(index_data['wechat'])} |
-| **总计** | {len(index_data['xhs_video']) + len(index_data['xhs_image']) + len(index_data['wechat'])} |
-
----
-
-## 小红书视频 ({len(index_data['xhs_video'])}篇)
-
+| 小红书视频 | {stats['xhs_video']} |
+| 小红书图文 | {stats['xhs_image']} |
+| 微信文章 | {stats['wechat']} |
+| **总计** | {stats['total']} |
 """
 
-        if index_data['xhs_video']:
-            for item in index_data['xhs_video'][:20]:  # 只显示前20个
-                index_content += f"""
-### [{item['date']}] {item['title']}
-- **文件夹**: `{item['folder']}`
-- **点赞**: {item['likes']}
-"""
-            if len(index_data['xhs_video']) > 20:
-                index_content += f"\n... 还有 {len(index_data['xhs_video']) - 20} 篇视频笔记\n"
-        else:
-            index_content += "\n暂无视频笔记\n"
-
-        index_content += "\n---\n\n## 小红书图文 ({}篇)\n\n".format(len(index_data['xhs_image']))
+        for category, (section_name, unit) in INDEX_SECTIONS.items():
+            count = stats[category]
+            index_content += f"\n---\n\n## {section_name} ({count}篇)\n\n"
 
-        if index_data['xhs_image']:
-            for item in index_data['xhs_image'][:20]:
-                index_content += f"""
-### [{item['date']}] {item['title']}
-- **文件夹**: `{item['folder']}`
-- **点赞**: {item['likes']}
-"""
-            if len(index_data['xhs_image']) > 20:
-                index_content += f"\n... 还有 {len(index_data['xhs_image']) - 20} 篇图文笔记\n"
-        else:
-            index_content += "\n暂无图文笔记\n"
+            # 按日期排序（最新的在前），只显示前 INDEX_SECTION_LIMIT 个
+            items = conn.execute(
+                "SELECT folder, title, date, likes FROM materials WHERE category = ? "
+                "ORDER BY date DESC, folder DESC LIMIT ?",
+                (category, INDEX_SECTION_LIMIT)
+            ).fetchall()
 
-        index_content += "\n---\n\n## 微信文章 ({}篇)\n\n".format(len(index_data['wechat']))
+            if not items:
+                index_content += f"\n暂无{unit}\n"
+                continue
 
-        if index_data['wechat']:
-            for item in index_data['wechat'][:20]:
+            for folder, title, date, likes in items:
                 index_content += f"""
-### [{item['date']}] {item['title']}
-- **文件夹**: `{item['folder']}`
+### [{date}] {title}
+- **文件夹**: `{folder}`
 """
-            if len(index_data['wechat']) > 20:
-                index_content += f"\n... 还有 {len(index_data['wechat']) - 20} 篇文章\n"
-        else:
-            index_content += "\n暂无微信文章\n"
+                if category != 'wechat':
+                    index_content += f"- **点赞**: {likes}\n"
+            if count > INDEX_SECTION_LIMIT:
+                index_content += f"\n... 还有 {count - INDEX_SECTION_LIMIT} 篇{unit}\n"
 
         index_content += f"""
 ---
@@ -492,12 +719,7 @@ class MaterialOrganizer:
         return {
             'success': True,
             'index_file': str(self.index_file),
-            'stats': {
-                'xhs_video': len(index_data['xhs_video']),
-                'xhs_image': len(index_data['xhs_image']),
-                'wechat': len(index_data['wechat']),
-                'total': len(index_data['xhs_video']) + len(index_data['xhs_image']) + len(index_data['wechat'])
-            }
+            'stats': stats
         }
 
 
@@ -508,14 +730,36 @@ def create_organizer(material_base_path=None):
 
 
 if __name__ == '__main__':
-    import sys
-
-    # 测试代码
-    organizer = MaterialOrganizer()
-
-    print("Testing MaterialOrganizer")
-    print("=" * 60)
-
-    # 测试更新索引
-    result = organizer.update_index()
-    print(f"Index update result: {result}")
+    import argparse
+
+    parser = argparse.ArgumentParser(description='材料组织器')
+    parser.add_argument('--base', help='材料存储基础路径')
+    parser.add_argument('--repair', action='store_true', help='全量扫描目录重建材料清单')
+    parser.add_argument('--search', help='全文检索关键词')
+    parser.add_argument('--limit', type=int, default=10, help='检索结果条数')
+    args = parser.parse_args()
+
+    organizer = MaterialOrganizer(args.base)
+
+    if args.search:
+        import time
+        start = time.perf_counter()
+        results = organizer.search(args.search, limit=args.limit)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        print(f"搜索 \"{args.search}\"：{len(results)} 条结果（{elapsed_ms:.1f} ms）")
+        for i, item in enumerate(results, 1):
+            print(f"{i}. [{item['date']}] {item['title']}（{CATEGORY_NAMES[item['category']]}，👍 {item['likes']}）")
+            print(f"   {item['path']}")
+            if item['snippet']:
+                print(f"   {item['snippet']}")
+    else:
+        print("Testing MaterialOrganizer")
+        print("=" * 60)
+
+        if args.repair:
+            result = organizer.rebuild_manifest()
+            print(f"Manifest rebuild result: {result}")
+
+        # 测试更新索引
+        result = organizer.update_index()
+        print(f"Index update result: {result}")
@@ -6,6 +6,8 @@ MCP工具桥接器
 1. 管理需要MCP工具的任务队列
 2. 提供任务状态查询
 3. 支持手动触发任务处理
+4. 任务存储在 SQLite（WAL）中：入队和状态更新只写一行，
+   worker 通过 claim_task 原子领取任务（带租约，超时未完成的任务可被重新领取）
 
 MCP工具说明：
 - web_reader: 需要在Claude Code上下文中调用
@@ -16,14 +18,21 @@ MCP工具说明：
 创建时间：2026-02-12
 """
 
-import os
 import json
+import time
+import sqlite3
 import logging
+import threading
 from pathlib import Path
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# 默认租约时长（秒）：worker 领取任务后需在此时间内完成或续约
+DEFAULT_LEASE_SECONDS = 300
+
+_TASK_COLUMNS = "task_id, type, url, timestamp, status, metadata, result, updated_at, lease_owner, lease_expires, attempts"
+
 
 class MCPBridge:
     """MCP工具桥接器 - 管理需要MCP工具的任务队列"""
@@ -40,11 +49,107 @@ class MCPBridge:
         self.queue_dir = Path(queue_dir)
         self.queue_dir.mkdir(parents=True, exist_ok=True)
 
-        # 任务状态文件
-        self.status_file = self.queue_dir / "processing_status.json"
+        # 任务数据库
+        self.db_path = self.queue_dir / "tasks.db"
+        self._local = threading.local()
+        self._init_db()
+        self._migrate_jsonl()
 
         logger.info(f"MCPBridge initialized: {self.queue_dir}")
 
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self):
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                task_id TEXT UNIQUE,
+                type TEXT NOT NULL,
+                url TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'queued',
+                metadata TEXT,
+                result TEXT,
+                updated_at TEXT,
+                lease_owner TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status, id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_type ON tasks (type, status)")
+        conn.commit()
+
+    def _insert(self, conn, task_type, url, timestamp, status='queued', metadata=None):
+        """写入一条任务，task_id 为 日期_自增ID（单调递增，不复用）"""
+        cursor = conn.execute(
+            "INSERT INTO tasks (type, url, timestamp, status, metadata) VALUES (?, ?, ?, ?, ?)",
+            (task_type, url, timestamp, status, json.dumps(metadata or {}, ensure_ascii=False))
+        )
+        task_id = f"{timestamp[:10].replace('-', '')}_{cursor.lastrowid}"
+        conn.execute("UPDATE tasks SET task_id = ? WHERE id = ?", (task_id, cursor.lastrowid))
+        return task_id
+
+    def _migrate_jsonl(self):
+        """导入旧版 queue_*.jsonl 队列文件（导入后重命名为 .imported）"""
+        queue_files = sorted(self.queue_dir.glob('queue_*.jsonl'))
+        if not queue_files:
+            return
+
+        conn = self._conn()
+        count = 0
+        for queue_file in queue_files:
+            try:
+                with conn:
+                    with open(queue_file, 'r', encoding='utf-8') as f:
+                        for line in f:
+                            line = line.strip()
+                            if not line:
+                                continue
+                            try:
+                                task = json.loads(line)
+                            except json.JSONDecodeError:
+                                logger.warning(f"Invalid JSON: {line[:100]}")
+                                continue
+                            self._insert(conn, task.get('type', 'unknown'), task.get('url', ''),
+                                         task.get('timestamp') or datetime.now().isoformat(),
+                                         task.get('status', 'queued'), task.get('metadata'))
+                            count += 1
+                queue_file.rename(queue_file.with_name(queue_file.name + '.imported'))
+            except Exception as e:
+                logger.error(f"Error migrating queue {queue_file.name}: {e}")
+
+        logger.info(f"Migrated {count} tasks from {len(queue_files)} queue files")
+
+    @staticmethod
+    def _row_to_task(row):
+        task_id, task_type, url, timestamp, status, metadata, result, updated_at, lease_owner, lease_expires, attempts = row
+        task = {
+            'task_id': task_id,
+            'type': task_type,
+            'url': url,
+            'timestamp': timestamp,
+            'status': status,
+            'metadata': json.loads(metadata) if metadata else {},
+            'attempts': attempts
+        }
+        if result is not None:
+            task['result'] = json.loads(result)
+        if updated_at:
+            task['updated_at'] = updated_at
+        if lease_owner:
+            task['lease_owner'] = lease_owner
+            task['lease_expires'] = lease_expires
+        return task
+
     def add_task(self, task_type, url, metadata=None):
         """
         添加任务到队列
@@ -57,28 +162,16 @@ class MCPBridge:
         Returns:
             dict: 添加结果
         """
-        timestamp = datetime.now().isoformat()
-        task = {
-            'type': task_type,
-            'url': url,
-            'timestamp': timestamp,
-            'status': 'queued',
-            'metadata': metadata or {}
-        }
-
-        # 按日期组织队列文件
-        date_str = datetime.now().strftime('%Y%m%d')
-        queue_file = self.queue_dir / f"queue_{date_str}.jsonl"
-
-        with open(queue_file, 'a', encoding='utf-8') as f:
-            f.write(json.dumps(task, ensure_ascii=False) + '\n')
+        conn = self._conn()
+        with conn:
+            task_id = self._insert(conn, task_type, url, datetime.now().isoformat(), metadata=metadata)
 
         logger.info(f"Task added to queue: {task_type} - {url[:80]}")
 
         return {
             'success': True,
-            'task_id': f"{date_str}_{len(list(self.get_tasks()))}",
-            'queue_file': str(queue_file)
+            'task_id': task_id,
+            'queue_file': str(self.db_path)
         }
 
     def get_tasks(self, task_type=None, status=None):
@@ -90,41 +183,99 @@ class MCPBridge:
             status: 筛选状态（None表示全部）
 
         Returns:
-            list: 任务列表
+            list: 任务列表（最新的在前）
         """
-        tasks = self._load_all_tasks()
-
-        # 筛选
+        conditions = []
+        params = []
         if task_type:
-            tasks = [t for t in tasks if t.get('type') == task_type]
+            conditions.append("type = ?")
+            params.append(task_type)
         if status:
-            tasks = [t for t in tasks if t.get('status') == status]
+            conditions.append("status = ?")
+            params.append(status)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
 
-        return tasks
+        rows = self._conn().execute(
+            f"SELECT {_TASK_COLUMNS} FROM tasks {where} ORDER BY id DESC", params
+        ).fetchall()
+        return [self._row_to_task(row) for row in rows]
 
-    def _load_all_tasks(self):
+    def get_task(self, task_id):
         """
-        从所有队列文件加载任务
+        获取单个任务
+
+        Args:
+            task_id: 任务ID
 
         Returns:
-            list: 所有任务
+            dict: 任务，不存在时返回 None
         """
-        tasks = []
-        for queue_file in sorted(self.queue_dir.glob('queue_*.jsonl'), reverse=True):
-            try:
-                with open(queue_file, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        line = line.strip()
-                        if line:
-                            try:
-                                task = json.loads(line)
-                                tasks.append(task)
-                            except json.JSONDecodeError:
-                                logger.warning(f"Invalid JSON: {line[:100]}")
-            except Exception as e:
-                logger.error(f"Error reading queue {queue_file.name}: {e}")
+        row = self._conn().execute(
+            f"SELECT {_TASK_COLUMNS} FROM tasks WHERE task_id = ?", (task_id,)
+        ).fetchone()
+        return self._row_to_task(row) if row else None
+
+    def claim_task(self, worker_id, task_type=None, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """
+        原子领取最早的待处理任务（状态改为 processing 并加租约）
 
-        return tasks
+        租约过期仍未完成的 processing 任务视为 worker 已退出，可被重新领取。
+
+        Args:
+            worker_id: worker 标识
+            task_type: 只领取该类型的任务（None表示全部）
+            lease_seconds: 租约时长（秒）
+
+        Returns:
+            dict: 领取到的任务，队列为空时返回 None
+        """
+        now = time.time()
+        type_filter = "AND type = ?" if task_type else ""
+        params = [now] + ([task_type] if task_type else [])
+
+        conn = self._conn()
+        # 立即获取写锁，避免多个 worker 领取到同一任务
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                f"SELECT id FROM tasks WHERE (status = 'queued' OR (status = 'processing' AND lease_expires < ?)) "
+                f"{type_filter} ORDER BY id LIMIT 1",
+                params
+            ).fetchone()
+            if row is None:
+                conn.commit()
+                return None
+
+            conn.execute(
+                "UPDATE tasks SET status = 'processing', lease_owner = ?, lease_expires = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (worker_id, now + lease_seconds, datetime.now().isoformat(), row[0])
+            )
+            task = self._row_to_task(conn.execute(
+                f"SELECT {_TASK_COLUMNS} FROM tasks WHERE id = ?", (row[0],)
+            ).fetchone())
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        logger.info(f"Task claimed by {worker_id}: {task['task_id']}")
+        return task
+
+    def extend_lease(self, task_id, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """
+        续约（长任务处理期间定期调用）
+
+        Returns:
+            bool: 是否续约成功（租约已被其他 worker 接管时返回 False）
+        """
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET lease_expires = ? WHERE task_id = ? AND status = 'processing' AND lease_owner = ?",
+                (time.time() + lease_seconds, task_id, worker_id)
+            )
+        return cursor.rowcount == 1
 
     def update_task_status(self, task_id, status, result=None):
         """
@@ -138,33 +289,43 @@ class MCPBridge:
         Returns:
             dict: 更新结果
         """
-        # 加载所有任务
-        tasks = self._load_all_tasks()
-
-        # 查找并更新任务
-        updated = False
-        for task in tasks:
-            if task.get('task_id') == task_id or task.get('id') == task_id:
-                task['status'] = status
-                task['updated_at'] = datetime.now().isoformat()
-                if result is not None:
-                    task['result'] = result
-                updated = True
-                break
-
-        if updated:
-            # 保存更新后的状态
-            self._save_status(tasks)
+        assignments = ["status = ?", "updated_at = ?"]
+        params = [status, datetime.now().isoformat()]
+        if result is not None:
+            assignments.append("result = ?")
+            params.append(json.dumps(result, ensure_ascii=False))
+        if status != 'processing':
+            # 任务结束或退回队列时释放租约
+            assignments.append("lease_owner = NULL, lease_expires = NULL")
+
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute(
+                f"UPDATE tasks SET {', '.join(assignments)} WHERE task_id = ?", params + [task_id]
+            )
+
+        if cursor.rowcount:
             return {'success': True, 'task_id': task_id, 'status': status}
         else:
             return {'success': False, 'error': 'Task not found'}
 
-    def _save_status(self, tasks):
+    def delete_tasks(self, status=None):
         """
-        保存任务状态到文件
+        删除任务
+
+        Args:
+            status: 只删除该状态的任务（None表示全部）
+
+        Returns:
+            int: 删除的任务数
         """
-        with open(self.status_file, 'w', encoding='utf-8') as f:
-            json.dump(tasks, f, ensure_ascii=False, indent=2)
+        conn = self._conn()
+        with conn:
+            if status:
+                cursor = conn.execute("DELETE FROM tasks WHERE status = ?", (status,))
+            else:
+                cursor = conn.execute("DELETE FROM tasks")
+        return cursor.rowcount
 
     def clear_completed(self):
         """
@@ -173,37 +334,15 @@ class MCPBridge:
         Returns:
             dict: 清除结果
         """
-        tasks = self.get_tasks()
-        before_count = len(tasks)
-
-        # 保留未完成的任务
-        incomplete_tasks = [t for t in tasks if t.get('status') != 'completed']
-
-        # 更新队列文件（只保留未完成的）
-        date_str = datetime.now().strftime('%Y%m%d')
-        queue_file = self.queue_dir / f"queue_{date_str}.jsonl"
+        cleared = self.delete_tasks('completed')
+        remaining = self._conn().execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
 
-        if incomplete_tasks:
-            with open(queue_file, 'w', encoding='utf-8') as f:
-                for task in incomplete_tasks:
-                    f.write(json.dumps(task, ensure_ascii=False) + '\n')
-
-        # 删除旧的队列文件
-        for qf in self.queue_dir.glob('queue_*.jsonl'):
-            if qf != queue_file:
-                try:
-                    qf.unlink()
-                except:
-                    pass
-
-        after_count = len(incomplete_tasks)
-
-        logger.info(f"Cleared {before_count - after_count} completed tasks")
+        logger.info(f"Cleared {cleared} completed tasks")
 
         return {
             'success': True,
-            'cleared': before_count - after_count,
-            'remaining': after_count
+            'cleared': cleared,
+            'remaining': remaining
         }
 
     def get_status_summary(self):
@@ -213,21 +352,12 @@ class MCPBridge:
         Returns:
             dict: 状态摘要
         """
-        tasks = self.get_tasks()
-
-        # 按类型和状态统计
-        by_type = {}
-        by_status = {}
-
-        for task in tasks:
-            task_type = task.get('type', 'unknown')
-            status = task.get('status', 'unknown')
-
-            by_type[task_type] = by_type.get(task_type, 0) + 1
-            by_status[status] = by_status.get(status, 0) + 1
+        conn = self._conn()
+        by_type = dict(conn.execute("SELECT type, COUNT(*) FROM tasks GROUP BY type").fetchall())
+        by_status = dict(conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall())
 
         return {
-            'total': len(tasks),
+            'total': sum(by_type.values()),
             'by_type': by_type,
             'by_status': by_status,
             'queue_dir': str(self.queue_dir)
@@ -250,6 +380,8 @@ if __name__ == '__main__':
         print("Usage:")
         print("  python mcp_bridge.py add <type> <url>      # Add task to queue")
         print("  python mcp_bridge.py list [type]            # List tasks (optional filter by type)")
+        print("  python mcp_bridge.py claim <worker> [type]   # Claim the oldest queued task")
+        print("  python mcp_bridge.py update <task_id> <status>  # Update task status")
         print("  python mcp_bridge.py status                  # Get status summary")
         print("  python mcp_bridge.py clear                  # Clear completed tasks")
         print()
@@ -275,7 +407,21 @@ if __name__ == '__main__':
         tasks = bridge.get_tasks(task_type)
         print(f"Tasks ({task_type or 'all'}): {len(tasks)}")
         for task in tasks[:20]:
-            print(f"  [{task.get('status', 'queued')}] {task.get('url', 'N/A')[:80]}")
+            print(f"  {task['task_id']} [{task.get('status', 'queued')}] {task.get('url', 'N/A')[:80]}")
+
+    elif command == 'claim':
+        if len(sys.argv) < 3:
+            print("Error: claim command requires <worker>")
+            sys.exit(1)
+        task = bridge.claim_task(sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else None)
+        print(f"Claimed: {task}" if task else "No queued tasks")
+
+    elif command == 'update':
+        if len(sys.argv) < 4:
+            print("Error: update command requires <task_id> and <status>")
+            sys.exit(1)
+        result = bridge.update_task_status(sys.argv[2], sys.argv[3])
+        print(f"Updated: {result}")
 
     elif command == 'status':
         summary = bridge.get_status_summary()
@@ -4,10 +4,14 @@ MediaCrawler 采集结果导入器
 
 功能：
 1. 扫描 MediaCrawler 采集结果目录
-2. 读取并解析 JSON 文件
+2. 流式读取 JSON 文件（逐条解析，大文件内存占用恒定，读到第一条即开始组织）
 3. 判断笔记类型（视频/图文）
 4. 调用 MaterialOrganizer 组织材料
 5. 更新索引文件
+6. 增量导入：记录已导入文件（路径、大小、修改时间、内容哈希）和笔记ID，
+   重复运行只处理新文件和新笔记（--full 强制全量）
+7. 并行导入（--workers N）：父进程流式读取并分批派发笔记，子进程组织材料，
+   导入清单和索引只由父进程写入
 
 作者：大秘书系统
 版本：v1.0
@@ -15,13 +19,25 @@ MediaCrawler 采集结果导入器
 """
 
 import os
-import json
+import time
+import sqlite3
 import logging
+import threading
+import multiprocessing
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime, timedelta
 
+from json_stream import iter_json_items
+from media_store import file_digest
+
 logger = logging.getLogger(__name__)
 
+# 并行导入时每批派发给子进程的笔记数
+IMPORT_BATCH_SIZE = 50
+# 单文件统计字段（import_file 返回值，多文件时逐项累加）
+IMPORT_STAT_KEYS = ('total', 'video', 'image', 'failed', 'imported', 'skipped')
+
 
 class MediaCrawlerImporter:
     """MediaCrawler 采集结果导入器 - 将采集结果组织到对标参考"""
@@ -57,6 +73,11 @@ class MediaCrawlerImporter:
 
         self.organizer = MaterialOrganizer(self.material_base)
 
+        # 导入清单（已导入的文件和笔记）
+        self.manifest_file = self.material_base / ".imports.db"
+        self._local = threading.local()
+        self._init_manifest()
+
         # 平台数据目录
         self.platform = platform
         self.source_dir = self.PLATFORM_DIRS.get(platform, self.PLATFORM_DIRS['xhs'])
@@ -66,6 +87,109 @@ class MediaCrawlerImporter:
 
         logger.info(f"MediaCrawlerImporter initialized: platform={platform}, source={self.source_dir}")
 
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.manifest_file), timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_manifest(self):
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS import_files (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                digest TEXT NOT NULL,
+                notes INTEGER NOT NULL,
+                imported_at REAL NOT NULL
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS imported_notes (
+                platform TEXT NOT NULL,
+                note_id TEXT NOT NULL,
+                source TEXT,
+                imported_at REAL NOT NULL,
+                PRIMARY KEY (platform, note_id)
+            )
+        """)
+        conn.commit()
+
+    def _file_unchanged(self, json_file):
+        """
+        判断文件自上次完整导入后是否未变化
+
+        大小和修改时间一致时直接认为未变化；只有修改时间变化时再比较内容哈希
+
+        Returns:
+            bool: 是否未变化
+        """
+        st = json_file.stat()
+        row = self._conn().execute(
+            "SELECT size, mtime_ns, digest FROM import_files WHERE path = ?", (str(json_file),)
+        ).fetchone()
+        if row is None or row[0] != st.st_size:
+            return False
+        if row[1] == st.st_mtime_ns:
+            return True
+
+        if file_digest(json_file) != row[2]:
+            return False
+
+        # 内容未变（如被 touch），刷新修改时间，下次无需再算哈希
+        conn = self._conn()
+        conn.execute("UPDATE import_files SET mtime_ns = ? WHERE path = ?", (st.st_mtime_ns, str(json_file)))
+        conn.commit()
+        return True
+
+    @staticmethod
+    def _file_snapshot(json_file):
+        """
+        读取文件前记录 (大小, 修改时间, 内容哈希)
+
+        MediaCrawler 采集过程中会持续改写当天的 JSON 文件，清单中只能记录读取前的状态
+        """
+        st = json_file.stat()
+        return st.st_size, st.st_mtime_ns, file_digest(json_file)
+
+    def _record_file(self, json_file, notes, snapshot):
+        """
+        记录已完整导入的文件
+
+        Args:
+            json_file: 文件路径
+            notes: 笔记数
+            snapshot: 读取前的 (大小, 修改时间, 内容哈希)
+        """
+        st = json_file.stat()
+        if (st.st_size, st.st_mtime_ns) != snapshot[:2]:
+            # 导入期间文件被改写：不记入清单，下次重新读取（已导入的笔记按笔记ID跳过）
+            logger.info(f"导入期间文件有更新，下次继续处理: {json_file.name}")
+            return
+        size, mtime_ns, digest = snapshot
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO import_files (path, size, mtime_ns, digest, notes, imported_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (str(json_file), size, mtime_ns, digest, notes, time.time())
+        )
+        conn.commit()
+
+    def _is_imported(self, note_id):
+        return self._conn().execute(
+            "SELECT 1 FROM imported_notes WHERE platform = ? AND note_id = ?", (self.platform, note_id)
+        ).fetchone() is not None
+
+    def _record_note(self, note_id, json_file):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO imported_notes (platform, note_id, source, imported_at) VALUES (?, ?, ?, ?)",
+            (self.platform, note_id, json_file.name, time.time())
+        )
+
     def scan_collections(self, days=7):
         """
         扫描最近 N 天的采集结果
@@ -178,81 +302,89 @@ class MediaCrawlerImporter:
 
         return normalized
 
-    def import_file(self, json_file):
+    def _import_note(self, note, json_file, stats):
+        """
+        组织单条笔记并累加统计
+
+        Returns:
+            bool: 是否导入成功
+        """
+        try:
+            # 标准化数据
+            normalized = self.normalize_note_data(note, json_file)
+
+            # 检测笔记类型
+            note_type = self.detect_note_type(note)
+
+            # 根据类型调用 MaterialOrganizer
+            if note_type == 'video':
+                self.organizer.organize_xhs_video(normalized)
+                stats['video'] += 1
+            else:
+                self.organizer.organize_xhs_image(normalized)
+                stats['image'] += 1
+
+            stats['imported'] += 1
+            return True
+
+        except Exception as e:
+            logger.error(f"导入笔记失败: {str(e)}")
+            stats['failed'] += 1
+            return False
+
+    def import_file(self, json_file, skip_imported=False):
         """
         导入单个 JSON 文件
 
         Args:
             json_file: JSON 文件路径
+            skip_imported: 跳过之前已导入过的笔记（按笔记ID）
 
         Returns:
-            dict: 导入结果统计
+            dict: 导入结果统计（含 complete：文件是否完整读取）
         """
         logger.info(f"导入文件: {json_file.name}")
 
-        try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-
-            # 处理不同的数据结构
-            if isinstance(data, list):
-                notes = data
-            elif isinstance(data, dict) and 'data' in data:
-                notes = data['data']
-            else:
-                notes = []
-
-            stats = {
-                'total': len(notes),
-                'video': 0,
-                'image': 0,
-                'failed': 0,
-                'imported': 0
-            }
+        stats = dict.fromkeys(IMPORT_STAT_KEYS, 0)
+        stats['complete'] = False
+        conn = self._conn()
 
-            for note in notes:
-                try:
-                    # 标准化数据
-                    normalized = self.normalize_note_data(note, json_file)
-
-                    # 检测笔记类型
-                    note_type = self.detect_note_type(note)
+        try:
+            # 支持顶层数组和 {"data": [...]} 两种结构，逐条读取
+            for note in iter_json_items(json_file):
+                stats['total'] += 1
+                note_id = str(note.get('note_id') or note.get('id') or '')
+                if skip_imported and note_id and self._is_imported(note_id):
+                    stats['skipped'] += 1
+                    continue
 
-                    # 根据类型调用 MaterialOrganizer
-                    if note_type == 'video':
-                        self.organizer.organize_xhs_video(normalized)
-                        stats['video'] += 1
-                    else:
-                        self.organizer.organize_xhs_image(normalized)
-                        stats['image'] += 1
+                if self._import_note(note, json_file, stats) and note_id:
+                    self._record_note(note_id, json_file)
 
-                    stats['imported'] += 1
+            stats['complete'] = True
 
-                except Exception as e:
-                    logger.error(f"导入笔记失败: {str(e)}")
-                    stats['failed'] += 1
+        except Exception as e:
+            # 文件损坏或被截断（可能仍在写入）：保留已导入的部分，下次重试
+            logger.error(f"读取文件失败 {json_file.name}（已处理 {stats['total']} 条）: {e}")
+            stats['failed'] += 1
 
-            logger.info(f"导入完成: {stats['imported']}/{stats['total']} 成功, {stats['failed']} 失败")
+        finally:
+            conn.commit()
 
-            return stats
+        logger.info(f"导入完成: {stats['imported']}/{stats['total']} 成功, "
+                    f"{stats['skipped']} 已导入过, {stats['failed']} 失败")
 
-        except Exception as e:
-            logger.error(f"读取文件失败 {json_file.name}: {e}")
-            return {
-                'total': 0,
-                'video': 0,
-                'image': 0,
-                'failed': 1,
-                'imported': 0
-            }
+        return stats
 
-    def import_collections(self, days=7, limit=None):
+    def import_collections(self, days=7, limit=None, full=False, workers=1):
         """
-        导入多个采集结果文件
+        导入多个采集结果文件（默认增量：跳过未变化的文件和已导入的笔记）
 
         Args:
             days: 最近 N 天的采集结果
             limit: 最多导入的文件数量
+            full: 全量导入，忽略导入清单
+            workers: 并行导入的进程数（1 表示在当前进程中逐条导入）
 
         Returns:
             dict: 总体导入统计
@@ -269,21 +401,159 @@ class MediaCrawlerImporter:
             'image': 0,
             'failed': 0,
             'imported': 0,
-            'files': len(files)
+            'skipped': 0,
+            'files': len(files),
+            'unchanged_files': 0
         }
 
+        jobs = []
         for file_info in files:
-            stats = self.import_file(file_info['path'])
-            for key in ['total', 'video', 'image', 'failed', 'imported']:
+            json_file = file_info['path']
+            if not full and self._file_unchanged(json_file):
+                total_stats['unchanged_files'] += 1
+                continue
+            jobs.append(json_file)
+
+        if workers > 1 and jobs:
+            results = self._import_files_parallel(jobs, workers, skip_imported=not full)
+        else:
+            results = self._import_files_sequential(jobs, skip_imported=not full)
+
+        for json_file, snapshot, stats in results:
+            for key in IMPORT_STAT_KEYS:
                 total_stats[key] += stats[key]
 
-        # 更新索引
-        self.organizer.update_index()
+            # 只有完整读取且没有失败笔记的文件才记入清单；截断或有失败的文件下次继续处理
+            # （已成功的笔记按笔记ID跳过）
+            if stats['complete'] and not stats['failed']:
+                self._record_file(json_file, stats['total'], snapshot)
+
+        # 有新导入时才更新索引
+        if total_stats['imported']:
+            self.organizer.update_index()
 
-        logger.info(f"批量导入完成: {total_stats['imported']} 条笔记, {total_stats['video']} 视频, {total_stats['image']} 图文")
+        logger.info(f"批量导入完成: {total_stats['imported']} 条笔记, {total_stats['video']} 视频, "
+                    f"{total_stats['image']} 图文, {total_stats['unchanged_files']} 个文件未变化, "
+                    f"{total_stats['skipped']} 条已导入过")
 
         return total_stats
 
+    def _import_files_sequential(self, jobs, skip_imported):
+        """
+        在当前进程中逐个导入文件
+
+        Yields:
+            tuple: (文件路径, 读取前的文件快照, 该文件的导入统计)
+        """
+        for json_file in jobs:
+            snapshot = self._file_snapshot(json_file)
+            yield json_file, snapshot, self.import_file(json_file, skip_imported=skip_imported)
+
+    def _import_files_parallel(self, jobs, workers, skip_imported):
+        """
+        多进程导入：父进程流式读取文件并分批派发笔记，子进程组织材料
+
+        同时在途的批次数有上限，读取速度不会超过处理速度；笔记导入记录只由父进程写入，
+        本次运行中重复出现的笔记ID只派发一次（与逐条导入时的跳过规则一致）。
+
+        Args:
+            jobs: [文件路径]
+            workers: 进程数
+            skip_imported: 跳过之前已导入过的笔记
+
+        Yields:
+            tuple: (文件路径, 读取前的文件快照, 该文件的导入统计)，按文件处理完成的顺序
+        """
+        max_in_flight = workers * 2
+        # future -> (文件状态, 批次笔记数)
+        pending = {}
+        finished = []
+        seen = set()
+        conn = self._conn()
+
+        def finish(state):
+            stats = state['stats']
+            # 读取完整且没有批次失败，才算完整导入
+            stats['complete'] = state['read_complete'] and not state['batch_failed']
+            logger.info(f"导入完成 {state['path'].name}: {stats['imported']}/{stats['total']} 成功, "
+                        f"{stats['skipped']} 已导入过, {stats['failed']} 失败")
+            finished.append((state['path'], state['snapshot'], stats))
+
+        def collect(futures):
+            for future in futures:
+                state, size = pending.pop(future)
+                try:
+                    batch_stats, imported_ids = future.result()
+                except Exception as e:
+                    logger.error(f"导入进程失败 {state['path'].name}（{size} 条）: {e}")
+                    state['stats']['failed'] += size
+                    state['batch_failed'] = True
+                else:
+                    for key, value in batch_stats.items():
+                        state['stats'][key] += value
+                    for note_id in imported_ids:
+                        self._record_note(note_id, state['path'])
+                    conn.commit()
+                state['outstanding'] -= 1
+                if state['read_done'] and state['outstanding'] == 0:
+                    finish(state)
+
+        def submit(executor, state, batch):
+            while len(pending) >= max_in_flight:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            future = executor.submit(_import_note_batch, str(self.material_base), self.platform,
+                                     str(state['path']), batch)
+            pending[future] = (state, len(batch))
+            state['outstanding'] += 1
+
+        # spawn：子进程不继承父进程的数据库连接和线程
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            for json_file in jobs:
+                logger.info(f"导入文件: {json_file.name}")
+                stats = dict.fromkeys(IMPORT_STAT_KEYS, 0)
+                stats['complete'] = False
+                state = {'path': json_file, 'snapshot': self._file_snapshot(json_file), 'stats': stats,
+                         'outstanding': 0, 'read_done': False,
+                         'read_complete': False, 'batch_failed': False}
+                batch = []
+                try:
+                    for note in iter_json_items(json_file):
+                        stats['total'] += 1
+                        note_id = str(note.get('note_id') or note.get('id') or '')
+                        if skip_imported and note_id and (note_id in seen or self._is_imported(note_id)):
+                            stats['skipped'] += 1
+                            continue
+                        if skip_imported and note_id:
+                            seen.add(note_id)
+
+                        batch.append((note_id, note))
+                        if len(batch) >= IMPORT_BATCH_SIZE:
+                            submit(executor, state, batch)
+                            batch = []
+                    state['read_complete'] = True
+
+                except Exception as e:
+                    # 文件损坏或被截断：已读到的笔记照常导入，下次重试
+                    logger.error(f"读取文件失败 {json_file.name}（已处理 {stats['total']} 条）: {e}")
+                    stats['failed'] += 1
+
+                if batch:
+                    submit(executor, state, batch)
+                state['read_done'] = True
+                if state['outstanding'] == 0:
+                    finish(state)
+
+                yield from finished
+                finished.clear()
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+                yield from finished
+                finished.clear()
+
     def get_import_summary(self, days=7):
         """
         获取导入摘要信息
@@ -315,6 +585,37 @@ class MediaCrawlerImporter:
         }
 
 
+# 子进程内复用的导入器（按材料路径和平台）
+_worker_importers = {}
+
+
+def _import_note_batch(material_base, platform, source, notes):
+    """
+    并行导入的子进程入口：组织一批笔记
+
+    Args:
+        material_base: 材料存储基础路径
+        platform: 平台类型
+        source: 来源 JSON 文件路径
+        notes: [(笔记ID, 笔记数据)]
+
+    Returns:
+        tuple: (统计, 导入成功的笔记ID列表)
+    """
+    key = (material_base, platform)
+    importer = _worker_importers.get(key)
+    if importer is None:
+        importer = _worker_importers[key] = MediaCrawlerImporter(material_base, platform)
+
+    json_file = Path(source)
+    stats = {'video': 0, 'image': 0, 'failed': 0, 'imported': 0}
+    imported_ids = []
+    for note_id, note in notes:
+        if importer._import_note(note, json_file, stats) and note_id:
+            imported_ids.append(note_id)
+    return stats, imported_ids
+
+
 def create_importer(material_base_path=None, platform='xhs'):
     """创建 MediaCrawlerImporter 实例"""
     return MediaCrawlerImporter(material_base_path, platform)
@@ -327,11 +628,13 @@ if __name__ == '__main__':
     if len(sys.argv) < 2:
         print("Usage:")
         print("  python media_crawler_importer.py scan [--days N]")
-        print("  python media_crawler_importer.py import [--days N] [--limit N]")
+        print("  python media_crawler_importer.py import [--days N] [--limit N] [--full] [--workers N]")
         print()
         print("Examples:")
         print("  python media_crawler_importer.py scan --days 7")
         print("  python media_crawler_importer.py import --days 7 --limit 5")
+        print("  python media_crawler_importer.py import --days 0 --full  # 忽略导入记录，全量重新导入")
+        print("  python media_crawler_importer.py import --days 0 --workers 8  # 8 个进程并行导入")
         sys.exit(1)
 
     command = sys.argv[1]
@@ -367,10 +670,16 @@ if __name__ == '__main__':
             if idx + 1 < len(sys.argv):
                 limit = int(sys.argv[idx + 1])
 
-        stats = importer.import_collections(days, limit)
+        workers = 1
+        if '--workers' in sys.argv:
+            idx = sys.argv.index('--workers')
+            if idx + 1 < len(sys.argv):
+                workers = int(sys.argv[idx + 1])
+
+        stats = importer.import_collections(days, limit, full='--full' in sys.argv, workers=workers)
         print(f"✅ 导入完成:")
-        print(f"  扫描文件: {stats['files']}")
-        print(f"  导入成功: {stats['imported']}/{stats['total']}")
+        print(f"  扫描文件: {stats['files']}（未变化 {stats['unchanged_files']}）")
+        print(f"  导入成功: {stats['imported']}/{stats['total']}（已导入过 {stats['skipped']}）")
         print(f"  视频笔记: {stats['video']}")
         print(f"  图文笔记: {stats['image']}")
         print(f"  导入失败: {stats['failed']}")
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+内容寻址媒体存储
+
+功能：
+1. 媒体文件按内容哈希（BLAKE2b）只存一份：objects/ab/cdef...
+2. 在可读的材料文件夹中以硬链接呈现（跨文件系统时尝试 reflink，最后才复制）
+3. 记录源文件 (路径, 大小, 修改时间) → 哈希，重复导入同一文件时无需重新计算
+4. GC：删除没有任何硬链接引用的对象（python media_store.py gc）
+
+注意：硬链接与存储对象共享数据，请勿原地修改材料文件夹中的媒体文件
+（替换文件不受影响）。
+
+默认路径：~/Desktop/DMS/media_store（可通过环境变量 DMS_MEDIA_STORE 覆盖）
+
+作者：大秘书系统
+版本：v1.0
+创建时间：2026-03-21
+"""
+
+import os
+import sys
+import time
+import ctypes
+import shutil
+import sqlite3
+import hashlib
+import logging
+import argparse
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_PATH = "~/Desktop/DMS/media_store"
+# 读取文件计算哈希的块大小
+HASH_CHUNK_SIZE = 1024 * 1024
+# GC 时跳过最近写入的对象，避免删除正在导入、尚未链接的文件
+DEFAULT_GC_GRACE_SECONDS = 3600
+
+
+def file_digest(path):
+    """计算文件的 BLAKE2b 哈希（十六进制）"""
+    h = hashlib.blake2b(digest_size=32)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _clone_file(src, dst):
+    """尝试写时复制（macOS clonefile / Linux copy_file_range），不支持时返回 False"""
+    if sys.platform == 'darwin':
+        try:
+            libc = ctypes.CDLL(None, use_errno=True)
+            return libc.clonefile(os.fsencode(src), os.fsencode(dst), 0) == 0
+        except Exception:
+            return False
+
+    if hasattr(os, 'copy_file_range'):
+        try:
+            with open(src, 'rb') as fin, open(dst, 'wb') as fout:
+                remaining = os.fstat(fin.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(fin.fileno(), fout.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+            return remaining <= 0
+        except OSError:
+            try:
+                os.unlink(dst)
+            except OSError:
+                pass
+            return False
+    return False
+
+
+class MediaStore:
+    """内容寻址媒体存储"""
+
+    def __init__(self, root=None):
+        """
+        初始化存储
+
+        Args:
+            root: 存储根目录
+        """
+        self.root = Path(root or os.environ.get('DMS_MEDIA_STORE') or DEFAULT_STORE_PATH).expanduser()
+        self.objects_dir = self.root / "objects"
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.root / "sources.db"
+        self.stats = {'stored': 0, 'deduplicated': 0, 'linked': 0, 'cloned': 0, 'copied': 0}
+        self._local = threading.local()
+
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS sources (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                digest TEXT NOT NULL
+            )
+        """)
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def object_path(self, digest):
+        """对象文件路径"""
+        return self.objects_dir / digest[:2] / digest[2:]
+
+    def digest_of(self, src):
+        """获取源文件哈希（文件未变化时读取缓存）"""
+        src = Path(src).resolve()
+        st = src.stat()
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT digest FROM sources WHERE path = ? AND size = ? AND mtime_ns = ?",
+            (str(src), st.st_size, st.st_mtime_ns)
+        ).fetchone()
+        if row and self.object_path(row[0]).exists():
+            return row[0]
+
+        digest = file_digest(src)
+        conn.execute(
+            "INSERT OR REPLACE INTO sources (path, size, mtime_ns, digest) VALUES (?, ?, ?, ?)",
+            (str(src), st.st_size, st.st_mtime_ns, digest)
+        )
+        conn.commit()
+        return digest
+
+    def put(self, src):
+        """
+        存入文件（内容已存在时不重复写入）
+
+        Args:
+            src: 源文件路径
+
+        Returns:
+            str: 内容哈希
+        """
+        digest = self.digest_of(src)
+        obj = self.object_path(digest)
+        if obj.exists():
+            self.stats['deduplicated'] += 1
+            return digest
+
+        obj.parent.mkdir(parents=True, exist_ok=True)
+        tmp = obj.with_name(f".{obj.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        if not _clone_file(src, tmp):
+            shutil.copyfile(src, tmp)
+        shutil.copystat(src, tmp)
+        os.replace(tmp, obj)
+        self.stats['stored'] += 1
+        return digest
+
+    def materialize(self, digest, dest):
+        """
+        在目标路径呈现对象（硬链接 → reflink → 复制）
+
+        Args:
+            digest: 内容哈希
+            dest: 目标文件路径
+        """
+        obj = self.object_path(digest)
+        dest = Path(dest)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+
+        if dest.exists():
+            if os.path.samefile(obj, dest):
+                return
+            dest.unlink()
+
+        try:
+            os.link(obj, dest)
+            self.stats['linked'] += 1
+            return
+        except OSError as e:
+            logger.debug(f"硬链接失败，改用复制 {dest}: {e}")
+
+        if _clone_file(obj, dest):
+            self.stats['cloned'] += 1
+        else:
+            shutil.copyfile(obj, dest)
+            self.stats['copied'] += 1
+        shutil.copystat(obj, dest)
+
+    def import_file(self, src, dest):
+        """
+        存入并呈现文件（替代 shutil.copy2(src, dest)）
+
+        Args:
+            src: 源文件路径
+            dest: 目标文件路径
+
+        Returns:
+            str: 内容哈希
+        """
+        digest = self.put(src)
+        self.materialize(digest, dest)
+        return digest
+
+    def gc(self, grace_seconds=DEFAULT_GC_GRACE_SECONDS, dry_run=False):
+        """
+        删除未被引用的对象（硬链接数为 1，且写入时间早于宽限期）
+
+        Args:
+            grace_seconds: 宽限期（秒）
+            dry_run: 只统计不删除
+
+        Returns:
+            dict: {objects, removed, freed_bytes}
+        """
+        cutoff = time.time() - grace_seconds
+        result = {'objects': 0, 'removed': 0, 'freed_bytes': 0}
+        removed_digests = []
+
+        for obj in self.objects_dir.glob('*/*'):
+            if obj.name.startswith('.'):
+                continue
+            result['objects'] += 1
+            st = obj.stat()
+            if st.st_nlink > 1 or st.st_mtime > cutoff:
+                continue
+            result['removed'] += 1
+            result['freed_bytes'] += st.st_size
+            removed_digests.append(obj.parent.name + obj.name)
+            if not dry_run:
+                obj.unlink()
+
+        if removed_digests and not dry_run:
+            conn = self._conn()
+            conn.executemany("DELETE FROM sources WHERE digest = ?", [(d,) for d in removed_digests])
+            conn.commit()
+
+        logger.info(f"媒体存储 GC{'（试运行）' if dry_run else ''}: {result}")
+        return result
+
+    def usage(self):
+        """
+        存储占用统计
+
+        Returns:
+            dict: {objects, bytes, referenced}
+        """
+        usage = {'objects': 0, 'bytes': 0, 'referenced': 0}
+        for obj in self.objects_dir.glob('*/*'):
+            if obj.name.startswith('.'):
+                continue
+            st = obj.stat()
+            usage['objects'] += 1
+            usage['bytes'] += st.st_size
+            if st.st_nlink > 1:
+                usage['referenced'] += 1
+        return usage
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_media_store(root=None):
+    """获取进程内共享的存储实例（按路径复用）"""
+    path = str(Path(root or os.environ.get('DMS_MEDIA_STORE') or DEFAULT_STORE_PATH).expanduser())
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = MediaStore(path)
+        return store
+
+
+def main():
+    """命令行入口"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description='内容寻址媒体存储')
+    parser.add_argument('--root', help='存储根目录（默认 ~/Desktop/DMS/media_store）')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    gc_parser = subparsers.add_parser('gc', help='删除未被引用的媒体对象')
+    gc_parser.add_argument('--grace', type=int, default=DEFAULT_GC_GRACE_SECONDS, help='跳过最近 N 秒内写入的对象')
+    gc_parser.add_argument('--dry-run', action='store_true', help='只统计不删除')
+
+    subparsers.add_parser('stats', help='查看存储占用')
+
+    args = parser.parse_args()
+    store = MediaStore(args.root)
+
+    if args.command == 'gc':
+        result = store.gc(grace_seconds=args.grace, dry_run=args.dry_run)
+        print(f"对象 {result['objects']} 个，{'可删除' if args.dry_run else '已删除'} {result['removed']} 个，"
+              f"释放 {result['freed_bytes'] / 1024 / 1024:.1f} MB")
+    else:
+        usage = store.usage()
+        print(f"对象 {usage['objects']} 个（被引用 {usage['referenced']} 个），"
+              f"占用 {usage['bytes'] / 1024 / 1024:.1f} MB：{store.root}")
+
+
+if __name__ == '__main__':
+    main()
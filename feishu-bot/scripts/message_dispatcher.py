@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+消息分发器
+
+功能：
+1. webhook 只负责解析和确认，消息处理交给后台线程池
+2. 线程池有界（最大并发数 + 最大积压数），突发流量时不会无限堆积
+3. 同一用户（open_id）的消息按到达顺序串行处理
+
+作者：大秘书系统
+版本：v1.0
+创建时间：2026-03-21
+"""
+
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class MessageDispatcher:
+    """有界后台分发器 - 不同 key 并行，同一 key 串行"""
+
+    def __init__(self, max_workers=4, max_pending=100):
+        """
+        初始化分发器
+
+        Args:
+            max_workers: 最大并发处理线程数
+            max_pending: 最大积压任务数（含正在执行的），超过后拒绝新任务
+        """
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix='feishu-msg'
+        )
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        # key -> 等待执行的任务队列；key 存在表示该 key 已有任务在执行
+        self._queues = {}
+        self._pending = 0
+        self._closed = False
+
+        logger.info(f"MessageDispatcher initialized: workers={max_workers}, max_pending={max_pending}")
+
+    @property
+    def pending(self):
+        """当前积压任务数（含正在执行的）"""
+        return self._pending
+
+    def is_alive(self):
+        """分发器是否仍在接收任务"""
+        return not self._closed
+
+    def submit(self, key, fn, *args, **kwargs):
+        """
+        提交任务
+
+        Args:
+            key: 串行化 key（通常为用户 open_id）
+            fn: 处理函数
+            *args, **kwargs: 处理函数参数
+
+        Returns:
+            bool: 是否已接收（积压已满时返回 False）
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                logger.warning(f"分发队列已满 ({self._pending}/{self.max_pending})，拒绝任务: {key}")
+                return False
+
+            self._pending += 1
+
+            # 同一 key 已有任务在执行，排队等待
+            if key in self._queues:
+                self._queues[key].append((fn, args, kwargs))
+                return True
+
+            self._queues[key] = deque()
+
+        self._executor.submit(self._run, key, fn, args, kwargs)
+        return True
+
+    def _run(self, key, fn, args, kwargs):
+        """执行任务，完成后调度同一 key 的下一个任务"""
+        try:
+            fn(*args, **kwargs)
+        except Exception as e:
+            logger.error(f"后台处理消息失败 ({key}): {e}", exc_info=True)
+
+        with self._lock:
+            self._pending -= 1
+            if self._pending == 0:
+                self._idle.notify_all()
+            queue = self._queues[key]
+            if not queue:
+                del self._queues[key]
+                return
+            next_fn, next_args, next_kwargs = queue.popleft()
+
+        # 重新提交而不是在当前线程循环，避免单个用户长期占用线程
+        try:
+            self._executor.submit(self._run, key, next_fn, next_args, next_kwargs)
+        except RuntimeError:
+            logger.warning(f"分发器已关闭，丢弃 {key} 的 {len(queue) + 1} 条待处理消息")
+
+    def shutdown(self, wait=True):
+        """
+        关闭分发器
+
+        Args:
+            wait: 是否等待所有积压任务处理完成
+        """
+        self._closed = True
+        if wait:
+            with self._idle:
+                self._idle.wait_for(lambda: self._pending == 0)
+        self._executor.shutdown(wait=wait)
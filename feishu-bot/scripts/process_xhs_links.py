@@ -7,6 +7,8 @@
 2. 解析短链接获取完整 URL
 3. 配置 MediaCrawler 使用 detail 模式采集
 
+短链接解析结果读写共享的短链接缓存（short_link_cache）
+
 作者：大秘书系统
 版本：v1.0.0
 """
@@ -19,6 +21,10 @@ from datetime import datetime
 from pathlib import Path
 import httpx
 
+from short_link_cache import get_short_link_cache
+
+NOTE_ID_PATTERN = re.compile(r'/(?:explore|discovery/item)/([a-f0-9]{24})')
+
 
 class XHSLinkProcessor:
     """小红书链接处理器"""
@@ -27,6 +33,11 @@ class XHSLinkProcessor:
         self.mediacrawler_dir = Path.home() / "MediaCrawler"
         self.config_file = self.mediacrawler_dir / "config" / "base_config.py"
         self.xhs_config = self.mediacrawler_dir / "config" / "xhs_config.py"
+        try:
+            self.cache = get_short_link_cache()
+        except Exception as e:
+            print(f"⚠️  短链接缓存不可用，跳过缓存: {e}")
+            self.cache = None
 
     def resolve_short_url(self, url):
         """解析短链接获取完整 URL
@@ -37,12 +48,27 @@ class XHSLinkProcessor:
         Returns:
             str: 完整 URL
         """
+        cached = self.cache.get(url) if self.cache else None
+        if cached:
+            if cached['ok']:
+                print(f"  ✓ 缓存: {url[:50]}...")
+                return cached['full_url']
+            print(f"  ⚠️  链接已失效（缓存）: {cached['error']}")
+            return url
+
         try:
             with httpx.Client(follow_redirects=True, timeout=10) as client:
                 response = client.head(url)
                 full_url = str(response.url)
                 print(f"  ✓ 解析: {url[:50]}...")
                 print(f"    → {full_url[:80]}...")
+                # 错误响应不缓存；没有笔记ID（登录页、错误页）时按失效链接的有效期缓存
+                if self.cache and full_url != url and response.status_code < 400:
+                    match = NOTE_ID_PATTERN.search(full_url)
+                    if match:
+                        self.cache.put(url, full_url, match.group(1))
+                    else:
+                        self.cache.put(url, full_url, ttl=self.cache.negative_ttl)
                 return full_url
         except Exception as e:
             print(f"  ⚠️  解析失败: {e}")
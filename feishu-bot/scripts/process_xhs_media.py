@@ -5,11 +5,15 @@
 功能：
 1. 下载封面图
 2. 下载视频文件（视频笔记）
-3. 转录视频内容（使用 Whisper）
+3. 转录视频内容（常驻 faster-whisper 服务，模型只加载一次；未安装时回退 whisper 命令行）
 4. 生成结构化输出
 
+下载阶段多条笔记并行（共享 keep-alive 会话），视频支持 HTTP Range 断点续传，
+大小/ETag 未变化的文件直接跳过；下载完成的视频立即加入转写队列，与其余下载同时进行。
+
 使用：
     python3 process_xhs_media.py --input ~/MediaCrawler/data/xhs/json/search_contents_*.json
+    python3 process_xhs_media.py --workers 16 --chunk-kb 4096
 
 作者：大秘书系统
 版本：v1.0
@@ -21,21 +25,37 @@ import sys
 import json
 import shutil
 import argparse
+import threading
 from pathlib import Path
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import subprocess
 import requests
+from requests.adapters import HTTPAdapter
+
+from transcription_service import DEFAULT_MODEL, get_transcription_service, is_available
+from transcript_cache import get_transcript_cache
+
+# 默认并行下载的笔记数
+DEFAULT_DOWNLOAD_WORKERS = 8
+# 默认写入块大小（字节）
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
 
 class XHSMediaProcessor:
     """小红书媒体文件处理器"""
 
-    def __init__(self, input_dir, output_dir=None):
+    def __init__(self, input_dir, output_dir=None, download_workers=DEFAULT_DOWNLOAD_WORKERS,
+                 chunk_size=DEFAULT_CHUNK_SIZE, whisper_model=DEFAULT_MODEL):
         """
         初始化处理器
 
         Args:
             input_dir: MediaCrawler 输出目录
             output_dir: 处理后文件保存目录
+            download_workers: 并行下载的笔记数
+            chunk_size: 下载写入块大小（字节）
+            whisper_model: 转写模型
         """
         self.input_dir = Path(input_dir)
         if output_dir:
@@ -53,6 +73,28 @@ class XHSMediaProcessor:
             'Accept': 'image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8',
             'Accept-Language': 'zh-CN,zh;q=0.9',
         }
+        self.download_workers = max(1, download_workers)
+        self.chunk_size = chunk_size
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.download_workers * 2)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        # 转写服务（未安装 faster-whisper 时为 None，改用 whisper 命令行）
+        self.whisper_model = whisper_model
+        self.transcriber = get_transcription_service(whisper_model) if is_available() else None
+
+        # 下载记录：文件名前缀 -> {url, file, etag, size, complete}
+        self.state_file = self.media_dir / ".downloads.json"
+        self._state_lock = threading.Lock()
+        self.download_state = {}
+        if self.state_file.exists():
+            try:
+                with open(self.state_file, 'r', encoding='utf-8') as f:
+                    self.download_state = json.load(f)
+            except Exception as e:
+                print(f"⚠️  下载记录损坏，将重新校验: {e}")
 
     def load_notes(self):
         """加载笔记数据"""
@@ -72,6 +114,110 @@ class XHSMediaProcessor:
         print(f"✓ 加载了 {len(notes)} 条笔记")
         return notes
 
+    def _save_state(self, stem, **entry):
+        """更新下载记录（原子写入）"""
+        with self._state_lock:
+            self.download_state[stem] = entry
+            tmp = self.state_file.with_suffix('.tmp')
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self.download_state, f, ensure_ascii=False)
+            os.replace(tmp, self.state_file)
+
+    @staticmethod
+    def _image_ext(content_type):
+        """根据 Content-Type 确定图片扩展名"""
+        if 'webp' in content_type:
+            return '.webp'
+        elif 'png' in content_type:
+            return '.png'
+        return '.jpg'
+
+    def _fetch(self, url, stem, timeout, ext=None):
+        """
+        下载文件到媒体目录
+
+        已下载且大小/ETag 未变化时跳过；存在未完成的 .part 文件时用 Range 续传
+        （服务器不支持或文件已变化时从头下载）。
+
+        Args:
+            url: 文件URL
+            stem: 文件名（不含扩展名）
+            timeout: 超时秒数
+            ext: 扩展名（None 表示按 Content-Type 判断）
+
+        Returns:
+            tuple: (文件路径, 状态 downloaded/resumed/skipped)，失败时抛出异常
+        """
+        with self._state_lock:
+            state = self.download_state.get(stem)
+        if state and state.get('url') != url:
+            state = None
+
+        # 已有的完整文件
+        if state:
+            existing = self.media_dir / state['file']
+        elif ext:
+            existing = self.media_dir / f"{stem}{ext}"
+        else:
+            existing = next((p for p in self.media_dir.glob(f"{stem}.*") if p.suffix != '.part'), None)
+        if existing is not None and (not existing.exists() or (state and not state.get('complete'))):
+            existing = None
+
+        part = self.media_dir / f"{stem}.part"
+        headers = {}
+        offset = 0
+        if existing is not None:
+            if state and state.get('etag'):
+                headers['If-None-Match'] = state['etag']
+        elif state and part.exists() and part.stat().st_size > 0:
+            offset = part.stat().st_size
+            headers['Range'] = f"bytes={offset}-"
+            if state.get('etag'):
+                headers['If-Range'] = state['etag']
+
+        with self.session.get(url, headers=headers, timeout=timeout, stream=True) as response:
+            etag = response.headers.get('ETag')
+            length = response.headers.get('Content-Length')
+
+            if response.status_code == 304:
+                return existing, 'skipped'
+            if existing is not None and response.status_code == 200:
+                size = existing.stat().st_size
+                if (etag and state and etag == state.get('etag')) or (length and int(length) == size):
+                    self._save_state(stem, url=url, file=existing.name, etag=etag, size=size, complete=True)
+                    return existing, 'skipped'
+            if response.status_code == 416 and offset:
+                # 续传范围无效（.part 已失效）：删除后从头下载
+                part.unlink()
+                self._save_state(stem, url=url, file=state['file'], etag=None, size=None, complete=False)
+                return self._fetch(url, stem, timeout, ext)
+
+            if response.status_code == 206 and offset:
+                mode = 'ab'
+            elif response.status_code == 200:
+                mode = 'wb'
+                offset = 0
+            else:
+                raise RuntimeError(f"HTTP {response.status_code}")
+
+            filename = f"{stem}{ext or self._image_ext(response.headers.get('content-type', ''))}"
+            total = offset + int(length) if length else None
+            self._save_state(stem, url=url, file=filename, etag=etag, size=total, complete=False)
+
+            with open(part, mode) as f:
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    f.write(chunk)
+
+        size = part.stat().st_size
+        if total is not None and size != total:
+            # 保留 .part，下次续传
+            raise IOError(f"下载不完整 ({size}/{total} 字节)")
+
+        filepath = self.media_dir / filename
+        os.replace(part, filepath)
+        self._save_state(stem, url=url, file=filename, etag=etag, size=size, complete=True)
+        return filepath, 'resumed' if mode == 'ab' else 'downloaded'
+
     def download_cover(self, note, index):
         """
         下载封面图
@@ -88,40 +234,20 @@ class XHSMediaProcessor:
             return None
 
         try:
-            print(f"  [{index}] 下载封面...")
-            response = requests.get(cover_url, headers=self.headers, timeout=30)
-            if response.status_code == 200:
-                # 确定文件扩展名
-                content_type = response.headers.get('content-type', '')
-                if 'webp' in content_type:
-                    ext = '.webp'
-                elif 'png' in content_type:
-                    ext = '.png'
-                elif 'jpg' in content_type or 'jpeg' in content_type:
-                    ext = '.jpg'
-                else:
-                    ext = '.jpg'
-
-                # 保存文件
-                filename = f"{index:04d}_cover{ext}"
-                filepath = self.media_dir / filename
-
-                with open(filepath, 'wb') as f:
-                    f.write(response.content)
-
-                print(f"  ✓ 已保存: {filename}")
-                return str(filepath)
+            filepath, status = self._fetch(cover_url, f"{index:04d}_cover", timeout=30)
+            if status == 'skipped':
+                print(f"  [{index}] ✓ 封面已存在: {filepath.name}")
             else:
-                print(f"  ✗ 下载失败: HTTP {response.status_code}")
-                return None
+                print(f"  [{index}] ✓ 封面已保存: {filepath.name}")
+            return str(filepath)
 
         except Exception as e:
-            print(f"  ✗ 下载异常: {e}")
+            print(f"  [{index}] ✗ 封面下载失败: {e}")
             return None
 
     def download_video(self, note, index):
         """
-        下载视频文件（仅视频笔记）
+        下载视频文件（仅视频笔记，支持断点续传）
 
         Args:
             note: 笔记数据
@@ -138,31 +264,18 @@ class XHSMediaProcessor:
             return None
 
         try:
-            print(f"  [{index}] 下载视频...")
-            response = requests.get(video_url, headers=self.headers, timeout=300, stream=True)
-            if response.status_code == 200:
-                # 视频文件
-                filename = f"{index:04d}_video.mp4"
-                filepath = self.media_dir / filename
-
-                # 流式写入
-                with open(filepath, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
-
-                print(f"  ✓ 已保存: {filename} ({os.path.getsize(filepath)/1024/1024:.1f} MB)")
-                return str(filepath)
-            else:
-                print(f"  ✗ 下载失败: HTTP {response.status_code}")
-                return None
+            filepath, status = self._fetch(video_url, f"{index:04d}_video", timeout=300, ext='.mp4')
+            label = {'skipped': '视频已存在', 'resumed': '视频已续传', 'downloaded': '视频已保存'}[status]
+            print(f"  [{index}] ✓ {label}: {filepath.name} ({os.path.getsize(filepath)/1024/1024:.1f} MB)")
+            return str(filepath)
 
         except Exception as e:
-            print(f"  ✗ 下载异常: {e}")
+            print(f"  [{index}] ✗ 视频下载失败: {e}")
             return None
 
     def transcribe_video(self, video_path, index):
         """
-        使用 Whisper 转录视频
+        转录视频
 
         Args:
             video_path: 视频文件路径
@@ -174,23 +287,64 @@ class XHSMediaProcessor:
         if not video_path or not Path(video_path).exists():
             return None
 
+        print(f"  [{index}] 转录视频...")
+        if self.transcriber is None:
+            return self._transcribe_cli(video_path, index)
+
         try:
-            print(f"  [{index}] 转录视频...")
+            return self._save_transcript(self.transcriber.transcribe(video_path), index)
+        except Exception as e:
+            print(f"  ✗ 转录异常: {e}")
+            return None
+
+    def _save_transcript(self, result, index):
+        """保存转写服务的结果，返回文本文件路径"""
+        output_file = self.media_dir / f"{index:04d}_transcript.txt"
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write(result['text'])
+        if result.get('cached'):
+            print(f"  ✓ 转录完成（缓存）: {output_file.name}")
+        else:
+            print(f"  ✓ 转录完成: {output_file.name}（{result['duration']:.0f}s 音频，{result['elapsed']:.1f}s）")
+        return str(output_file)
 
+    def _transcribe_cli(self, video_path, index):
+        """
+        使用 whisper 命令行转录（未安装 faster-whisper 时的回退方式，每次调用都会重新加载模型；
+        同样先查询转写缓存）
+
+        Args:
+            video_path: 视频文件路径
+            index: 笔记序号
+
+        Returns:
+            str: 转录文本文件路径
+        """
+        output_file = self.media_dir / f"{index:04d}_transcript.txt"
+        cache_model = f"whisper-cli/{self.whisper_model}"
+        try:
+            cache = get_transcript_cache()
+            digest = cache.digest(video_path)
+            cached = cache.get(digest, cache_model)
+        except Exception as e:
+            print(f"  ⚠️  转写缓存不可用: {e}")
+            cache = digest = cached = None
+        if cached is not None:
+            return self._save_transcript({**cached, 'cached': True}, index)
+
+        try:
             # 检查 Whisper 是否可用
             whisper_cmd = shutil.which('whisper')
 
             if whisper_cmd:
                 # 使用系统 Whisper
-                output_file = self.media_dir / f"{index:04d}_transcript.txt"
 
                 cmd = [
                     'whisper',
                     str(video_path),
-                    '--model', 'base',
+                    '--model', self.whisper_model,
                     '--output_format', 'txt',
-                    '--output_dir', str(self.media_dir),
-                    '--output_type', 'txt'
+                    '--output_dir', str(self.media_dir)
                 ]
 
                 result = subprocess.run(
@@ -201,14 +355,19 @@ class XHSMediaProcessor:
                 )
 
                 if result.returncode == 0:
-                    print(f"  ✓ 转录完成: {index:04d}_transcript.txt")
+                    # whisper 按视频文件名输出，统一重命名
+                    whisper_output = self.media_dir / f"{Path(video_path).stem}.txt"
+                    if whisper_output.exists():
+                        os.replace(whisper_output, output_file)
+                        if cache is not None:
+                            cache.put(digest, cache_model, None, {'text': output_file.read_text(encoding='utf-8')})
+                    print(f"  ✓ 转录完成: {output_file.name}")
                     return str(output_file)
                 else:
                     print(f"  ✗ 转录失败: {result.stderr[:100] if result.stderr else 'Unknown error'}")
                     return None
             else:
-                # 系统没有 Whisper，尝试使用 OpenAI API
-                print(f"  ⚠️  未找到系统 Whisper，跳过转录")
+                print(f"  ⚠️  未安装 faster-whisper，也未找到系统 Whisper，跳过转录")
                 return None
 
         except subprocess.TimeoutExpired:
@@ -218,32 +377,23 @@ class XHSMediaProcessor:
             print(f"  ✗ 转录异常: {e}")
             return None
 
-    def process_note(self, note, index):
+    def download_note(self, note, index):
         """
-        处理单条笔记
+        下载单条笔记的封面和视频（可在多个线程中并行调用）
 
         Args:
             note: 笔记数据
             index: 笔记序号
 
         Returns:
-            dict: 处理结果
+            dict: 处理结果（transcript 为空，由调用方转录）
         """
-        note_id = note.get('note_id', '')[:8]
-        title = note.get('title', '无标题')
-        desc = note.get('desc', '')
         note_type = note.get('type', 'normal')
-
-        print(f"\n{'='*60}")
-        print(f"笔记 {index}: {title}")
-        print(f"类型: {note_type}")
-        print(f"{'='*60}")
-
         result = {
             'index': index,
-            'note_id': note_id,
-            'title': title,
-            'desc': desc,
+            'note_id': note.get('note_id', '')[:8],
+            'title': note.get('title', '无标题'),
+            'desc': note.get('desc', ''),
             'type': note_type,
             'cover': None,
             'video': None,
@@ -257,9 +407,29 @@ class XHSMediaProcessor:
         if note_type == 'video':
             result['video'] = self.download_video(note, index)
 
-            # 转录视频
-            if result['video']:
-                result['transcript'] = self.transcribe_video(result['video'], index)
+        return result
+
+    def process_note(self, note, index):
+        """
+        处理单条笔记
+
+        Args:
+            note: 笔记数据
+            index: 笔记序号
+
+        Returns:
+            dict: 处理结果
+        """
+        print(f"\n{'='*60}")
+        print(f"笔记 {index}: {note.get('title', '无标题')}")
+        print(f"类型: {note.get('type', 'normal')}")
+        print(f"{'='*60}")
+
+        result = self.download_note(note, index)
+
+        # 转录视频
+        if result['video']:
+            result['transcript'] = self.transcribe_video(result['video'], index)
 
         return result
 
@@ -374,17 +544,33 @@ class XHSMediaProcessor:
         else:
             limit = len(notes)
 
-        print(f"📋 开始处理 {len(notes)} 条笔记...\n")
-
-        # 处理每条笔记
-        results = []
-        for i, note in enumerate(notes, 1):
-            result = self.process_note(note, i)
-            results.append(result)
-
-            # 每处理5条输出进度
-            if i % 5 == 0:
-                print(f"  进度: {i}/{limit}")
+        print(f"📋 开始处理 {len(notes)} 条笔记（并行下载 {self.download_workers}）...\n")
+
+        # 下载并行；下载完成的视频立即提交转写，与其余下载同时进行
+        results = [None] * len(notes)
+        transcripts = {}
+        with ThreadPoolExecutor(max_workers=self.download_workers) as executor:
+            futures = {executor.submit(self.download_note, note, i): i for i, note in enumerate(notes, 1)}
+            for done, future in enumerate(as_completed(futures), 1):
+                i = futures[future]
+                result = future.result()
+                if result['video']:
+                    if self.transcriber is not None:
+                        transcripts[i] = self.transcriber.submit(result['video'])
+                    else:
+                        result['transcript'] = self.transcribe_video(result['video'], i)
+                results[i - 1] = result
+
+                # 每处理5条输出进度
+                if done % 5 == 0:
+                    print(f"  进度: {done}/{limit}")
+
+        # 等待转写队列完成
+        for i, future in sorted(transcripts.items()):
+            try:
+                results[i - 1]['transcript'] = self._save_transcript(future.result(), i)
+            except Exception as e:
+                print(f"  [{i}] ✗ 转录失败: {e}")
 
         # 生成汇总报告
         self.generate_summary(results)
@@ -420,6 +606,26 @@ def main():
         default=None
     )
 
+    parser.add_argument(
+        '--workers', '-w',
+        type=int,
+        help=f'并行下载的笔记数（默认 {DEFAULT_DOWNLOAD_WORKERS}）',
+        default=DEFAULT_DOWNLOAD_WORKERS
+    )
+
+    parser.add_argument(
+        '--chunk-kb',
+        type=int,
+        help=f'下载写入块大小 KB（默认 {DEFAULT_CHUNK_SIZE // 1024}）',
+        default=DEFAULT_CHUNK_SIZE // 1024
+    )
+
+    parser.add_argument(
+        '--whisper-model',
+        help=f'转写模型（默认 {DEFAULT_MODEL}）',
+        default=DEFAULT_MODEL
+    )
+
     args = parser.parse_args()
 
     # 展开路径
@@ -432,7 +638,8 @@ def main():
         return 1
 
     # 创建处理器并执行
-    processor = XHSMediaProcessor(input_dir, output_dir)
+    processor = XHSMediaProcessor(input_dir, output_dir, download_workers=args.workers,
+                                  chunk_size=args.chunk_kb * 1024, whisper_model=args.whisper_model)
     processor.run(limit=args.limit)
 
 
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+小红书短链接解析缓存
+
+功能：
+1. 短链接 → 完整 URL / 笔记ID 的持久化映射（SQLite WAL，多进程共享）
+2. 成功结果长期缓存，失效链接（无跳转、4xx）短期负缓存
+3. 供 ShortLinkResolver、ContentRouter、process_xhs_links 和
+   competitor-alert 的 parse_short_links 共用，重复导入时不再发请求
+
+默认路径：~/Desktop/DMS/skills/feishu-bot/data/short_links.db
+（可通过环境变量 XHS_SHORT_LINK_CACHE 覆盖）
+
+作者：大秘书系统
+版本：v1.0
+创建时间：2026-03-21
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = "~/Desktop/DMS/skills/feishu-bot/data/short_links.db"
+# 只缓存这些域名的短链接（完整链接无需解析）
+SHORT_LINK_HOSTS = ('xhslink.com',)
+# 成功解析：30 天；失效链接：1 小时
+DEFAULT_TTL = 30 * 24 * 3600
+DEFAULT_NEGATIVE_TTL = 3600
+
+
+class ShortLinkCache:
+    """短链接解析结果缓存"""
+
+    def __init__(self, db_path=None, ttl=DEFAULT_TTL, negative_ttl=DEFAULT_NEGATIVE_TTL, hosts=SHORT_LINK_HOSTS):
+        """
+        初始化缓存
+
+        Args:
+            db_path: SQLite 文件路径
+            ttl: 成功结果的过期秒数
+            negative_ttl: 失效链接的过期秒数
+            hosts: 需要缓存的短链接域名
+        """
+        self.db_path = Path(db_path or os.environ.get('XHS_SHORT_LINK_CACHE') or DEFAULT_DB_PATH).expanduser()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.hosts = tuple(hosts)
+        self.stats = {'hits': 0, 'misses': 0}
+        self._local = threading.local()
+
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS short_links (
+                short_url TEXT PRIMARY KEY,
+                full_url TEXT,
+                note_id TEXT,
+                ok INTEGER NOT NULL,
+                error TEXT,
+                resolved_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def key(self, short_url):
+        """
+        归一化缓存键（忽略协议、域名大小写和末尾斜杠）
+
+        Returns:
+            str: 缓存键，不属于短链接域名时返回 None
+        """
+        parsed = urlparse(short_url.strip())
+        host = parsed.netloc.lower()
+        if host.startswith('www.'):
+            host = host[4:]
+        if host not in self.hosts:
+            return None
+        key = host + parsed.path.rstrip('/')
+        if parsed.query:
+            key += '?' + parsed.query
+        return key
+
+    def get(self, short_url):
+        """
+        查询缓存
+
+        Args:
+            short_url: 短链接
+
+        Returns:
+            dict: {ok, full_url, note_id, error}，未命中或已过期返回 None
+        """
+        key = self.key(short_url)
+        if key is None:
+            return None
+
+        try:
+            row = self._conn().execute(
+                "SELECT ok, full_url, note_id, error FROM short_links WHERE short_url = ? AND expires_at > ?",
+                (key, time.time())
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"读取短链接缓存失败: {e}")
+            return None
+
+        if row is None:
+            self.stats['misses'] += 1
+            return None
+        self.stats['hits'] += 1
+        return {'ok': bool(row[0]), 'full_url': row[1], 'note_id': row[2], 'error': row[3]}
+
+    def put(self, short_url, full_url, note_id=None, ttl=None):
+        """记录成功解析的结果（ttl 默认为正常有效期）"""
+        self._write(short_url, 1, full_url, note_id, None, ttl or self.ttl)
+
+    def put_failure(self, short_url, error):
+        """记录失效链接（负缓存，过期后重新解析）"""
+        self._write(short_url, 0, None, None, error, self.negative_ttl)
+
+    def _write(self, short_url, ok, full_url, note_id, error, ttl):
+        key = self.key(short_url)
+        if key is None:
+            return
+        now = time.time()
+        try:
+            conn = self._conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO short_links (short_url, full_url, note_id, ok, error, resolved_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, full_url, note_id, ok, error, now, now + ttl)
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"写入短链接缓存失败: {e}")
+
+    def purge_expired(self):
+        """删除过期记录，返回删除条数"""
+        conn = self._conn()
+        cursor = conn.execute("DELETE FROM short_links WHERE expires_at <= ?", (time.time(),))
+        conn.commit()
+        return cursor.rowcount
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_short_link_cache(db_path=None):
+    """获取进程内共享的缓存实例（按路径复用）"""
+    path = str(Path(db_path or os.environ.get('XHS_SHORT_LINK_CACHE') or DEFAULT_DB_PATH).expanduser())
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = _caches[path] = ShortLinkCache(path)
+        return cache
@@ -5,6 +5,10 @@
 集成到飞书机器人，自动解析小红书/抖音短链接
 调用 MediaCrawler 采集笔记和评论
 
+批量解析使用共享 keep-alive Session 和有界线程池并发请求，
+按域名限制并发数，逐跳跟随重定向（HEAD 不可用时回退 GET），
+结果按完成顺序流式返回；解析结果写入共享的短链接缓存（short_link_cache）
+
 作者：大秘书系统
 版本：v1.0
 创建时间：2026-02-11
@@ -13,16 +17,76 @@
 import re
 import subprocess
 import json
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime
-from urllib.parse import urlparse, parse_qs, unquote
+from urllib.parse import urlparse, parse_qs, unquote, urljoin
+
+from short_link_cache import get_short_link_cache
+
+REDIRECT_STATUS = (301, 302, 303, 307, 308)
+# HEAD 返回这些状态时改用 GET 重试（部分短链服务不支持 HEAD）
+HEAD_FALLBACK_STATUS = (400, 403, 404, 405, 501)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def _get_session(pool_maxsize=32):
+    """获取进程内共享的 keep-alive Session"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=pool_maxsize)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+        return _session
+
 
 class ShortLinkResolver:
     """短链接解析器 - 支持小红书短链接自动解析"""
 
-    def __init__(self, log_file=None):
-        """初始化解析器"""
+    def __init__(self, log_file=None, max_workers=16, per_host_limit=8, max_redirects=5, timeout=10, cache=None):
+        """
+        初始化解析器
+
+        Args:
+            log_file: 日志文件路径
+            cache: 短链接缓存（默认使用共享缓存，传 False 禁用）
+            max_workers: 批量解析的线程数
+            per_host_limit: 同一域名的最大并发请求数
+            max_redirects: 单个链接最多跟随的重定向次数
+            timeout: 单次请求超时（秒）
+        """
+        self.max_workers = max_workers
+        self.per_host_limit = per_host_limit
+        self.max_redirects = max_redirects
+        self.timeout = timeout
+        self.session = _get_session(pool_maxsize=max(max_workers, per_host_limit))
+        # host -> Semaphore
+        self._host_slots = {}
+        self._host_lock = threading.Lock()
+        self._log_lock = threading.Lock()
+
+        # 日志文件
+        if log_file:
+            self.log_file = log_file
+        else:
+            self.log_file = Path("/tmp/short_link_resolver.log")
+
+        if cache is None:
+            try:
+                cache = get_short_link_cache()
+            except Exception as e:
+                self.log(f"⚠️ 短链接缓存不可用，跳过缓存: {e}")
+                cache = False
+        self.cache = cache or None
+
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (iPhone; CPU iPhone OS 16_6 like Mac OS X) AppleWebKit/605.1.15',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
@@ -33,12 +97,6 @@ class ShortLinkResolver:
         self.mediacrawler_config = self.mediacrawler_dir / "config" / "base_config.py"
         self.mediacrawler_python = self.mediacrawler_dir / ".venv" / "bin" / "python"
 
-        # 日志文件
-        if log_file:
-            self.log_file = log_file
-        else:
-            self.log_file = Path("/tmp/short_link_resolver.log")
-
     def log(self, message):
         """记录日志"""
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
@@ -47,8 +105,49 @@ class ShortLinkResolver:
         print(log_entry)
 
         if self.log_file:
-            with open(self.log_file, 'a', encoding='utf-8') as f:
-                f.write(log_entry)
+            with self._log_lock:
+                with open(self.log_file, 'a', encoding='utf-8') as f:
+                    f.write(log_entry)
+
+    def _host_slot(self, url):
+        """获取域名对应的并发信号量"""
+        host = urlparse(url).netloc.lower()
+        with self._host_lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = self._host_slots[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return slot
+
+    def _request_hop(self, url):
+        """
+        请求一跳（不自动跟随重定向）
+
+        先发 HEAD；服务端不支持 HEAD 时改用 GET（stream=True，不读取响应体）
+
+        Returns:
+            tuple: (状态码, Location 绝对地址或 None)
+        """
+        with self._host_slot(url):
+            response = self.session.head(url, headers=self.headers, allow_redirects=False, timeout=self.timeout)
+            if response.status_code in HEAD_FALLBACK_STATUS:
+                response = self.session.get(url, headers=self.headers, allow_redirects=False,
+                                            timeout=self.timeout, stream=True)
+                response.close()
+
+        location = response.headers.get('Location')
+        return response.status_code, urljoin(url, location) if location else None
+
+    def _failure(self, short_url, error_msg, dead=False):
+        """构造失败结果；dead=True 表示链接已失效（写入负缓存，超时等临时错误不缓存）"""
+        if dead and self.cache:
+            self.cache.put_failure(short_url, error_msg)
+        return {
+            'success': False,
+            'note_id': None,
+            'full_url': short_url,
+            'short_url': short_url,
+            'error': error_msg
+        }
 
     def resolve_xhs_short_link(self, short_url):
         """
@@ -60,86 +159,77 @@ class ShortLinkResolver:
         Returns:
             dict: {success: bool, note_id: str, full_url: str, error: str}
         """
+        cached = self.cache.get(short_url) if self.cache else None
+        if cached:
+            self.log(f"命中缓存: {short_url[:50]} → {cached['note_id'] or cached['error']}")
+            if not cached['ok']:
+                return self._failure(short_url, cached['error'])
+            return {
+                'success': True,
+                'note_id': cached['note_id'],
+                'full_url': cached['full_url'],
+                'short_url': short_url
+            }
+
         self.log(f"解析短链接: {short_url}")
 
+        url = short_url
+        full_url = None
+        # 后续跳转因网络异常中断（结果不完整，不写入缓存）
+        interrupted = False
         try:
-            # 发送 HEAD 请求获取重定向
-            response = requests.head(
-                short_url,
-                headers=self.headers,
-                allow_redirects=False,
-                timeout=10
-            )
-
-            # 检查响应
-            if response.status_code in [301, 302, 303, 307, 308]:
-                # 从 Location 头获取完整 URL
-                full_url = response.headers.get('Location', '')
-
-                if full_url:
-                    # 提取笔记 ID
-                    note_id = self._extract_note_id(full_url)
-
-                    if note_id:
-                        self.log(f"✅ 解析成功: {short_url[:50]}... → {note_id}")
-                        return {
-                            'success': True,
-                            'note_id': note_id,
-                            'full_url': full_url,
-                            'short_url': short_url
-                        }
-                    else:
-                        self.log(f"⚠️  获取完整URL但无法提取笔记ID: {full_url[:80]}")
-                        return {
-                            'success': True,
-                            'note_id': None,
-                            'full_url': full_url,
-                            'short_url': short_url
-                        }
-
-            elif response.status_code == 200:
-                # 没有重定向，可能是完整链接
-                self.log(f"⚠️ 短链接可能已失效或为完整链接")
-                return {
-                    'success': False,
-                    'note_id': None,
-                    'full_url': short_url,
-                    'short_url': short_url,
-                    'error': '短链接已失效或为完整链接'
-                }
-
-            else:
-                error_msg = f"HTTP {response.status_code}"
-                self.log(f"❌ 解析失败: {error_msg}")
-                return {
-                    'success': False,
-                    'note_id': None,
-                    'full_url': short_url,
-                    'short_url': short_url,
-                    'error': error_msg
-                }
+            # 逐跳跟随重定向，直到拿到笔记ID或不再跳转
+            for _ in range(self.max_redirects):
+                status, location = self._request_hop(url)
+
+                if status in REDIRECT_STATUS and location:
+                    full_url = location
+                    if self._extract_note_id(full_url):
+                        break
+                    url = location
+                    continue
+
+                if full_url is None:
+                    if status == 200:
+                        # 没有重定向，可能是完整链接
+                        self.log(f"⚠️ 短链接可能已失效或为完整链接")
+                        return self._failure(short_url, '短链接已失效或为完整链接', dead=True)
+                    error_msg = f"HTTP {status}"
+                    self.log(f"❌ 解析失败: {error_msg}")
+                    return self._failure(short_url, error_msg, dead=400 <= status < 500 and status != 429)
+                break
 
         except requests.Timeout:
-            error_msg = "请求超时"
-            self.log(f"❌ 解析失败: {error_msg}")
-            return {
-                'success': False,
-                'note_id': None,
-                'full_url': short_url,
-                'short_url': short_url,
-                'error': error_msg
-            }
+            if full_url is None:
+                error_msg = "请求超时"
+                self.log(f"❌ 解析失败: {error_msg}")
+                return self._failure(short_url, error_msg)
+            interrupted = True
 
         except Exception as e:
-            error_msg = str(e)[:100]
-            self.log(f"❌ 解析异常: {error_msg}")
-            return {
-                'success': False,
-                'note_id': None,
-                'full_url': short_url,
-                'short_url': short_url,
-                'error': error_msg
-            }
+            if full_url is None:
+                error_msg = str(e)[:100]
+                self.log(f"❌ 解析异常: {error_msg}")
+                return self._failure(short_url, error_msg)
+            interrupted = True
+
+        # 已拿到至少一跳重定向地址（后续跳转失败时使用最后一个地址）
+        note_id = self._extract_note_id(full_url)
+        if note_id:
+            self.log(f"✅ 解析成功: {short_url[:50]}... → {note_id}")
+        else:
+            self.log(f"⚠️  获取完整URL但无法提取笔记ID: {full_url[:80]}")
+        # 只有拿到笔记ID才按正常有效期缓存；跳转完成但没有笔记ID时按失效链接的有效期缓存，
+        # 跳转被网络异常中断时不缓存，下次重新解析
+        if self.cache and not interrupted:
+            self.cache.put(short_url, full_url, note_id,
+                           ttl=None if note_id else self.cache.negative_ttl)
+        return {
+            'success': True,
+            'note_id': note_id,
+            'full_url': full_url,
+            'short_url': short_url
+        }
 
     def _extract_note_id(self, url):
         """
@@ -189,25 +279,62 @@ class ShortLinkResolver:
 
         return None
 
-    def batch_resolve_links(self, short_links):
-        """批量解析短链接"""
-        self.log(f"批量解析 {len(short_links)} 个短链接")
+    def iter_resolve(self, short_links):
+        """
+        并发解析短链接，按完成顺序逐个返回
+
+        Args:
+            short_links: 短链接列表
+
+        Yields:
+            tuple: (在输入列表中的序号, 解析结果 dict)
+        """
+        if not short_links:
+            return
+
+        workers = max(1, min(self.max_workers, len(short_links)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='short-link') as executor:
+            futures = {
+                executor.submit(self.resolve_xhs_short_link, link): i
+                for i, link in enumerate(short_links)
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = self._failure(short_links[i], str(e)[:100])
+                yield i, result
+
+    def batch_resolve_links(self, short_links, on_result=None):
+        """
+        批量解析短链接
 
-        results = []
-        successful = []
-        failed = []
+        Args:
+            short_links: 短链接列表
+            on_result: 每完成一个链接时的回调 fn(result)，用于流式返回进度
 
-        for i, link in enumerate(short_links, 1):
-            self.log(f"[{i}/{len(short_links)}] {link[:60]}...")
+        Returns:
+            dict: {total, successful, failed, success_count, fail_count}，
+                  successful/failed 按输入顺序排列
+        """
+        self.log(f"批量解析 {len(short_links)} 个短链接")
 
-            result = self.resolve_xhs_short_link(link)
+        results = [None] * len(short_links)
+        done = 0
 
+        for i, result in self.iter_resolve(short_links):
+            results[i] = result
+            done += 1
             if result['success']:
-                successful.append(result)
-                self.log(f"  ✓ 笔记ID: {result['note_id']}")
+                self.log(f"[{done}/{len(short_links)}] ✓ 笔记ID: {result['note_id']}")
             else:
-                failed.append(result)
-                self.log(f"  ✗ 失败: {result.get('error', 'Unknown')}")
+                self.log(f"[{done}/{len(short_links)}] ✗ 失败: {result.get('error', 'Unknown')}")
+            if on_result:
+                on_result(result)
+
+        successful = [r for r in results if r['success']]
+        failed = [r for r in results if not r['success']]
 
         self.log(f"解析完成: 成功 {len(successful)}/{len(short_links)}")
 
@@ -265,10 +392,11 @@ def main():
     parser.add_argument('--links', help='短链接列表（逗号分隔）')
     parser.add_argument('--file', help='包含短链接的文件')
     parser.add_argument('--test', action='store_true', help='测试模式')
+    parser.add_argument('--workers', type=int, default=16, help='并发解析线程数')
 
     args = parser.parse_args()
 
-    resolver = ShortLinkResolver()
+    resolver = ShortLinkResolver(max_workers=args.workers)
 
     if args.test:
         # 测试模式：测试单个链接解析
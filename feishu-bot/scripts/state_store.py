@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+跨请求状态存储
+
+功能：
+1. 统一的键值存储接口（get/set/add/update/delete），值为可 JSON 序列化的对象
+2. MemoryStateStore：进程内存储，单进程运行和调试使用
+3. SQLiteStateStore：单机多进程共享（WAL 模式），多 worker 部署时使用
+4. 支持 TTL，add/update 为原子操作；过期记录由 purge_expired 清理
+
+作者：大秘书系统
+版本：v1.0
+创建时间：2026-03-21
+"""
+
+import abc
+import json
+import time
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+class StateStore(abc.ABC):
+    """状态存储接口"""
+
+    @abc.abstractmethod
+    def get(self, key, default=None):
+        """读取值，不存在或已过期返回 default"""
+
+    @abc.abstractmethod
+    def set(self, key, value, ttl=None):
+        """
+        写入值
+
+        Args:
+            key: 键
+            value: 可 JSON 序列化的值
+            ttl: 过期秒数（None 表示不过期）
+        """
+
+    @abc.abstractmethod
+    def add(self, key, value, ttl=None):
+        """
+        仅在键不存在（或已过期）时写入
+
+        Returns:
+            bool: 是否写入成功（False 表示键已存在）
+        """
+
+    @abc.abstractmethod
+    def update(self, key, fn, default=None, ttl=None):
+        """
+        原子地读-改-写
+
+        Args:
+            key: 键
+            fn: 接收当前值（不存在时为 default 的副本），返回新值
+            default: 默认值
+            ttl: 新值的过期秒数
+
+        Returns:
+            新值
+        """
+
+    @abc.abstractmethod
+    def delete(self, key):
+        """删除键"""
+
+    @abc.abstractmethod
+    def purge_expired(self):
+        """
+        删除已过期的记录（读取时已过滤过期记录，此方法只负责回收空间）
+
+        Returns:
+            int: 删除的记录数
+        """
+
+    def close(self):
+        """释放资源"""
+
+
+class MemoryStateStore(StateStore):
+    """进程内状态存储（多 worker 之间不共享）"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # key -> (JSON 文本, 过期时间或 None)
+        self._data = {}
+
+    def _load(self, key, default):
+        entry = self._data.get(key)
+        if entry is None:
+            return _copy(default)
+        raw, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self._data[key]
+            return _copy(default)
+        return json.loads(raw)
+
+    def _store(self, key, value, ttl):
+        expires_at = time.time() + ttl if ttl else None
+        self._data[key] = (json.dumps(value, ensure_ascii=False), expires_at)
+
+    def get(self, key, default=None):
+        with self._lock:
+            return self._load(key, default)
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def add(self, key, value, ttl=None):
+        with self._lock:
+            if self._load(key, None) is not None:
+                return False
+            self._store(key, value, ttl)
+            return True
+
+    def update(self, key, fn, default=None, ttl=None):
+        with self._lock:
+            value = fn(self._load(key, default))
+            self._store(key, value, ttl)
+            return value
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def purge_expired(self):
+        now = time.time()
+        with self._lock:
+            expired = [key for key, (_, expires_at) in self._data.items()
+                       if expires_at is not None and expires_at <= now]
+            for key in expired:
+                del self._data[key]
+            return len(expired)
+
+
+class SQLiteStateStore(StateStore):
+    """SQLite 状态存储（单机多进程共享）"""
+
+    def __init__(self, db_path, timeout=10):
+        """
+        初始化存储
+
+        Args:
+            db_path: 数据库文件路径
+            timeout: 等待写锁的秒数
+        """
+        self.db_path = Path(db_path).expanduser()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.timeout = timeout
+        # 每个线程一个连接（sqlite3 连接不能跨线程共享）
+        self._local = threading.local()
+
+        conn = self._conn()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS state ('
+            ' key TEXT PRIMARY KEY,'
+            ' value TEXT NOT NULL,'
+            ' expires_at REAL)'
+        )
+
+        logger.info(f"SQLiteStateStore initialized: {self.db_path}")
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # isolation_level=None：手动控制事务，BEGIN IMMEDIATE 保证读-改-写原子性
+            conn = sqlite3.connect(str(self.db_path), timeout=self.timeout, isolation_level=None)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _load(self, conn, key, default):
+        row = conn.execute(
+            'SELECT value, expires_at FROM state WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return _copy(default)
+        return json.loads(row[0])
+
+    def _store(self, conn, key, value, ttl):
+        expires_at = time.time() + ttl if ttl else None
+        conn.execute(
+            'INSERT OR REPLACE INTO state (key, value, expires_at) VALUES (?, ?, ?)',
+            (key, json.dumps(value, ensure_ascii=False), expires_at)
+        )
+
+    def get(self, key, default=None):
+        return self._load(self._conn(), key, default)
+
+    def set(self, key, value, ttl=None):
+        self._store(self._conn(), key, value, ttl)
+
+    def add(self, key, value, ttl=None):
+        conn = self._conn()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(
+                'DELETE FROM state WHERE key = ? AND expires_at IS NOT NULL AND expires_at <= ?',
+                (key, now)
+            )
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO state (key, value, expires_at) VALUES (?, ?, ?)',
+                (key, json.dumps(value, ensure_ascii=False), now + ttl if ttl else None)
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return cursor.rowcount == 1
+
+    def update(self, key, fn, default=None, ttl=None):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            value = fn(self._load(conn, key, default))
+            self._store(conn, key, value, ttl)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return value
+
+    def delete(self, key):
+        self._conn().execute('DELETE FROM state WHERE key = ?', (key,))
+
+    def purge_expired(self):
+        cursor = self._conn().execute(
+            'DELETE FROM state WHERE expires_at IS NOT NULL AND expires_at <= ?', (time.time(),)
+        )
+        return cursor.rowcount
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def _copy(value):
+    """返回默认值的深拷贝，避免调用方修改共享的默认对象"""
+    if value is None:
+        return None
+    return json.loads(json.dumps(value))
+
+
+def create_state_store(state_config=None):
+    """
+    根据配置创建状态存储
+
+    Args:
+        state_config: {'backend': 'sqlite' | 'memory', 'path': 数据库路径}
+
+    Returns:
+        StateStore
+    """
+    state_config = state_config or {}
+    backend = state_config.get('backend', 'memory')
+
+    if backend == 'sqlite':
+        return SQLiteStateStore(state_config['path'])
+    if backend == 'memory':
+        return MemoryStateStore()
+
+    raise ValueError(f"未知的状态存储类型: {backend}")
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+语音转写结果缓存
+
+功能：
+1. 按 (音视频内容哈希, 模型, 语言) 缓存转写文本和分段时间戳（SQLite WAL，多进程共享）
+2. 同一视频重复处理（process_xhs_media 重跑、同一笔记经竞品监控和机器人两次到达、
+   热点采集重试）时直接复用结果，不再占用几分钟 CPU
+3. 供 transcription_service 和 whisper 命令行回退路径共用
+
+默认路径：~/Desktop/DMS/skills/feishu-bot/data/transcripts.db
+（可通过环境变量 DMS_TRANSCRIPT_CACHE 覆盖）
+
+作者：大秘书系统
+版本：v1.0
+创建时间：2026-03-21
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+
+from media_store import file_digest
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = "~/Desktop/DMS/skills/feishu-bot/data/transcripts.db"
+
+
+class TranscriptCache:
+    """转写结果缓存"""
+
+    def __init__(self, db_path=None):
+        """
+        初始化缓存
+
+        Args:
+            db_path: SQLite 文件路径
+        """
+        self.db_path = Path(db_path or os.environ.get('DMS_TRANSCRIPT_CACHE') or DEFAULT_DB_PATH).expanduser()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.stats = {'hits': 0, 'misses': 0}
+        self._local = threading.local()
+
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS transcripts (
+                digest TEXT NOT NULL,
+                model TEXT NOT NULL,
+                language TEXT NOT NULL,
+                text TEXT NOT NULL,
+                segments TEXT,
+                detected_language TEXT,
+                duration REAL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (digest, model, language)
+            )
+        """)
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def digest(path):
+        """音视频文件的内容哈希"""
+        return file_digest(path)
+
+    def get(self, digest, model, language=None):
+        """
+        查询缓存
+
+        Args:
+            digest: 内容哈希
+            model: 模型名称
+            language: 转写语言（None 表示自动检测）
+
+        Returns:
+            dict: {text, segments, language, duration}，未命中返回 None
+        """
+        try:
+            row = self._conn().execute(
+                "SELECT text, segments, detected_language, duration FROM transcripts "
+                "WHERE digest = ? AND model = ? AND language = ?",
+                (digest, model, language or 'auto')
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"读取转写缓存失败: {e}")
+            return None
+
+        if row is None:
+            self.stats['misses'] += 1
+            return None
+        self.stats['hits'] += 1
+        return {
+            'text': row[0],
+            'segments': json.loads(row[1]) if row[1] else [],
+            'language': row[2],
+            'duration': row[3]
+        }
+
+    def put(self, digest, model, language, result):
+        """
+        写入转写结果
+
+        Args:
+            digest: 内容哈希
+            model: 模型名称
+            language: 转写语言（None 表示自动检测）
+            result: {text, segments, language, duration}
+        """
+        try:
+            conn = self._conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO transcripts "
+                "(digest, model, language, text, segments, detected_language, duration, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (digest, model, language or 'auto', result.get('text', ''),
+                 json.dumps(result.get('segments') or [], ensure_ascii=False),
+                 result.get('language'), result.get('duration'), time.time())
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"写入转写缓存失败: {e}")
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_transcript_cache(db_path=None):
+    """获取进程内共享的缓存实例（按路径复用）"""
+    path = str(Path(db_path or os.environ.get('DMS_TRANSCRIPT_CACHE') or DEFAULT_DB_PATH).expanduser())
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = _caches[path] = TranscriptCache(path)
+        return cache
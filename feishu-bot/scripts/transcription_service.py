@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+常驻语音转写服务
+
+功能：
+1. 进程内只加载一次 faster-whisper 模型（CTranslate2，CPU 默认 int8），
+   之后的每个文件不再支付 Python 启动和模型加载的开销
+2. 每个文件用一次 ffmpeg 调用直接解码为 16kHz 单声道 PCM（支持本地文件和 URL）
+3. VAD 切分语音段后批量解码（faster-whisper >= 1.1 的 BatchedInferencePipeline，
+   旧版本退回逐段解码 + vad_filter）
+4. 任务队列：submit() 立即返回 Future；音频解码与模型推理流水线并行，
+   推理由单个后台线程串行执行
+5. 转写前按 (内容哈希, 模型, 语言) 查询共享的转写缓存（transcript_cache），
+   重复的视频不再解码和推理
+
+依赖：pip install faster-whisper；系统需安装 ffmpeg（缺失时改用 faster-whisper 内置解码）
+
+用法：
+    service = get_transcription_service()
+    futures = [service.submit(path) for path in videos]
+    texts = [f.result()['text'] for f in futures]
+
+    python transcription_service.py video1.mp4 video2.mp4 [--model small] [--output-dir DIR]
+
+作者：大秘书系统
+版本：v1.0
+创建时间：2026-03-21
+"""
+
+import os
+import sys
+import time
+import queue
+import shutil
+import logging
+import argparse
+import threading
+import subprocess
+from pathlib import Path
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from transcript_cache import get_transcript_cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = os.environ.get('DMS_WHISPER_MODEL', 'base')
+DEFAULT_LANGUAGE = 'zh'
+SAMPLE_RATE = 16000
+# 单次批量解码的语音段数
+DEFAULT_BATCH_SIZE = 8
+# 同时解码音频的文件数（领先于模型推理）
+DEFAULT_PREFETCH = 2
+
+# 关闭时放入队列的哨兵
+_STOP = object()
+
+
+def is_available():
+    """faster-whisper 是否已安装"""
+    try:
+        import faster_whisper  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def extract_audio(source):
+    """
+    用一次 ffmpeg 调用把音视频文件（或 URL）解码为 16kHz 单声道 float32 数组
+
+    Args:
+        source: 文件路径或 URL
+
+    Returns:
+        numpy.ndarray: 音频采样
+    """
+    import numpy as np
+
+    if not shutil.which('ffmpeg'):
+        from faster_whisper import decode_audio
+        return decode_audio(str(source), sampling_rate=SAMPLE_RATE)
+
+    cmd = [
+        'ffmpeg', '-nostdin', '-loglevel', 'error', '-threads', '0',
+        '-i', str(source),
+        '-vn', '-ac', '1', '-ar', str(SAMPLE_RATE), '-f', 's16le', '-'
+    ]
+    result = subprocess.run(cmd, capture_output=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg 解码失败: {result.stderr.decode('utf-8', 'replace')[:200]}")
+    return np.frombuffer(result.stdout, np.int16).astype(np.float32) / 32768.0
+
+
+class TranscriptionService:
+    """常驻转写服务 - 模型只加载一次，按队列顺序转写"""
+
+    def __init__(self, model_size=DEFAULT_MODEL, device='cpu', compute_type='int8', cpu_threads=0,
+                 language=DEFAULT_LANGUAGE, batch_size=DEFAULT_BATCH_SIZE, prefetch=DEFAULT_PREFETCH, cache=None):
+        """
+        初始化服务（模型在第一次转写时加载）
+
+        Args:
+            model_size: 模型名称或本地路径（tiny/base/small/medium/large-v3 等）
+            device: cpu / cuda / auto
+            compute_type: 量化类型（CPU 推荐 int8）
+            cpu_threads: 推理线程数（0 表示由 CTranslate2 决定）
+            language: 语言（None 表示自动检测）
+            batch_size: 批量解码的语音段数
+            prefetch: 同时解码音频的文件数
+            cache: 转写缓存（默认使用共享缓存，传 False 禁用）
+        """
+        self.model_size = model_size
+        self.device = device
+        self.compute_type = compute_type
+        self.cpu_threads = cpu_threads
+        self.language = language
+        self.batch_size = batch_size
+
+        if cache is None:
+            try:
+                cache = get_transcript_cache()
+            except Exception as e:
+                logger.warning(f"转写缓存不可用，跳过缓存: {e}")
+                cache = False
+        self.cache = cache or None
+
+        self._model = None
+        self._pipeline = None
+        self._model_lock = threading.Lock()
+        self._audio_pool = ThreadPoolExecutor(max_workers=max(1, prefetch), thread_name_prefix='transcribe-audio')
+        # 已解码、等待推理的音频数上限（避免长队列把所有音频都解码到内存）
+        self._audio_slots = threading.BoundedSemaphore(max(1, prefetch))
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        self.stats = {'files': 0, 'cached': 0, 'failed': 0, 'audio_seconds': 0.0, 'decode_seconds': 0.0, 'load_seconds': 0.0}
+
+    def _load_model(self):
+        """加载模型（只执行一次）"""
+        with self._model_lock:
+            if self._model is not None:
+                return
+            from faster_whisper import WhisperModel
+
+            start = time.perf_counter()
+            self._model = WhisperModel(self.model_size, device=self.device,
+                                       compute_type=self.compute_type, cpu_threads=self.cpu_threads)
+            try:
+                from faster_whisper import BatchedInferencePipeline
+                self._pipeline = BatchedInferencePipeline(model=self._model)
+            except ImportError:
+                logger.info("faster-whisper 版本不支持批量解码，改为逐段解码")
+            self.stats['load_seconds'] = time.perf_counter() - start
+            logger.info(f"转写模型已加载: {self.model_size} ({self.device}/{self.compute_type}), "
+                        f"{self.stats['load_seconds']:.1f}s")
+
+    def _decode(self, audio):
+        """VAD 切分后解码，返回 (分段列表, 语言)"""
+        if self._pipeline is not None:
+            segments, info = self._pipeline.transcribe(
+                audio, language=self.language, batch_size=self.batch_size, vad_filter=True
+            )
+        else:
+            segments, info = self._model.transcribe(audio, language=self.language, vad_filter=True)
+        # segments 是惰性生成器，需要在推理线程中消费完
+        segments = [
+            {'start': round(seg.start, 2), 'end': round(seg.end, 2), 'text': seg.text.strip()}
+            for seg in segments
+        ]
+        return segments, info.language
+
+    def _extract(self, source, result_future):
+        """
+        查询转写缓存，未命中时解码音频（占用一个预取名额，推理完成后释放）
+
+        Returns:
+            tuple: (内容哈希, 音频)；命中缓存时直接完成 result_future 并返回 None
+        """
+        digest = None
+        if self.cache and os.path.isfile(str(source)):
+            try:
+                digest = self.cache.digest(source)
+                cached = self.cache.get(digest, self.model_size, self.language)
+            except Exception as e:
+                logger.warning(f"查询转写缓存失败 {source}: {e}")
+                cached = None
+            if cached is not None:
+                self.stats['cached'] += 1
+                logger.info(f"转写缓存命中 {Path(str(source)).name}")
+                if result_future.set_running_or_notify_cancel():
+                    result_future.set_result({'source': str(source), **cached, 'elapsed': 0.0, 'cached': True})
+                return None
+
+        self._audio_slots.acquire()
+        try:
+            return digest, extract_audio(source)
+        except BaseException:
+            self._audio_slots.release()
+            raise
+
+    def _ensure_worker(self):
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._loop, name='transcribe-worker', daemon=True)
+                self._worker.start()
+
+    def _loop(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            source, audio_future, result_future = item
+            try:
+                prepared = audio_future.result()
+                if prepared is None:
+                    continue
+                digest, audio = prepared
+            except BaseException as e:
+                self.stats['failed'] += 1
+                logger.error(f"音频解码失败 {source}: {e}")
+                if result_future.set_running_or_notify_cancel():
+                    result_future.set_exception(e)
+                continue
+
+            try:
+                if not result_future.set_running_or_notify_cancel():
+                    continue
+                self._load_model()
+                start = time.perf_counter()
+                segments, language = self._decode(audio)
+                elapsed = time.perf_counter() - start
+
+                duration = len(audio) / SAMPLE_RATE
+                self.stats['files'] += 1
+                self.stats['audio_seconds'] += duration
+                self.stats['decode_seconds'] += elapsed
+                logger.info(f"转写完成 {Path(str(source)).name}: 音频 {duration:.0f}s, 耗时 {elapsed:.1f}s")
+
+                result = {
+                    'source': str(source),
+                    'text': '\n'.join(seg['text'] for seg in segments if seg['text']),
+                    'segments': segments,
+                    'language': language,
+                    'duration': duration,
+                    'elapsed': elapsed,
+                    'cached': False
+                }
+                if digest:
+                    self.cache.put(digest, self.model_size, self.language, result)
+                result_future.set_result(result)
+            except BaseException as e:
+                self.stats['failed'] += 1
+                logger.error(f"转写失败 {source}: {e}")
+                result_future.set_exception(e)
+            finally:
+                del audio
+                self._audio_slots.release()
+
+    def submit(self, source):
+        """
+        提交转写任务（立即返回）
+
+        Args:
+            source: 音视频文件路径或 URL
+
+        Returns:
+            Future: 结果为 {source, text, segments, language, duration, elapsed, cached}
+        """
+        self._ensure_worker()
+        result_future = Future()
+        # 查缓存和音频解码提前进行，与前一个文件的推理重叠
+        audio_future = self._audio_pool.submit(self._extract, source, result_future)
+        self._queue.put((source, audio_future, result_future))
+        return result_future
+
+    def transcribe(self, source):
+        """同步转写单个文件，返回结果字典（见 submit）"""
+        return self.submit(source).result()
+
+    def transcribe_many(self, sources):
+        """
+        批量转写（全部入队后按提交顺序产出结果）
+
+        Yields:
+            tuple: (source, 结果字典或异常)
+        """
+        futures = [(source, self.submit(source)) for source in sources]
+        for source, future in futures:
+            try:
+                yield source, future.result()
+            except Exception as e:
+                yield source, e
+
+    def close(self):
+        """等待队列中的任务完成并停止后台线程"""
+        if self._worker is not None and self._worker.is_alive():
+            self._queue.put(_STOP)
+            self._worker.join()
+        self._audio_pool.shutdown(wait=True)
+
+
+_services = {}
+_services_lock = threading.Lock()
+
+
+def get_transcription_service(model_size=DEFAULT_MODEL, **kwargs):
+    """获取进程内共享的转写服务（按模型复用，模型只加载一次）"""
+    with _services_lock:
+        service = _services.get(model_size)
+        if service is None:
+            service = _services[model_size] = TranscriptionService(model_size, **kwargs)
+        return service
+
+
+def main():
+    """命令行入口"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description='批量语音转写（faster-whisper）')
+    parser.add_argument('files', nargs='+', help='音视频文件或 URL')
+    parser.add_argument('--model', default=DEFAULT_MODEL, help=f'模型（默认 {DEFAULT_MODEL}）')
+    parser.add_argument('--language', default=DEFAULT_LANGUAGE, help='语言（auto 表示自动检测）')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='批量解码的语音段数')
+    parser.add_argument('--output-dir', help='转写文本保存目录（默认只输出到终端）')
+    args = parser.parse_args()
+
+    if not is_available():
+        print("❌ 未安装 faster-whisper：pip install faster-whisper")
+        return 1
+
+    service = TranscriptionService(args.model, language=None if args.language == 'auto' else args.language,
+                                   batch_size=args.batch_size)
+    output_dir = Path(args.output_dir).expanduser() if args.output_dir else None
+    if output_dir:
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+    failed = 0
+    for source, result in service.transcribe_many(args.files):
+        if isinstance(result, Exception):
+            failed += 1
+            print(f"✗ {source}: {result}")
+            continue
+        if output_dir:
+            output_file = output_dir / f"{Path(source).stem}.txt"
+            output_file.write_text(result['text'], encoding='utf-8')
+            print(f"✓ {source} → {output_file}（{result['duration']:.0f}s 音频，{result['elapsed']:.1f}s）")
+        else:
+            print(f"=== {source} ===\n{result['text']}\n")
+    service.close()
+
+    stats = service.stats
+    if stats['decode_seconds']:
+        print(f"共 {stats['files']} 个文件（缓存命中 {stats['cached']} 个），音频 {stats['audio_seconds']:.0f}s，"
+              f"推理 {stats['decode_seconds']:.1f}s（{stats['audio_seconds'] / stats['decode_seconds']:.1f}x 实时），"
+              f"模型加载 {stats['load_seconds']:.1f}s")
+    elif stats['cached']:
+        print(f"全部 {stats['cached']} 个文件命中转写缓存")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
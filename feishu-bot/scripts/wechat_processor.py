@@ -23,6 +23,8 @@ from pathlib import Path
 from datetime import datetime
 from urllib.parse import urlparse
 
+from mcp_bridge import MCPBridge
+
 logger = logging.getLogger(__name__)
 
 
@@ -45,7 +47,7 @@ class WeChatProcessor:
         if queue_dir is None:
             queue_dir = Path(__file__).parent.parent / "data" / "mcp_queue"
         self.queue_dir = Path(queue_dir)
-        self.queue_dir.mkdir(parents=True, exist_ok=True)
+        self.bridge = MCPBridge(self.queue_dir)
 
         # 微信文章输出目录
         self.output_dir = self.material_base / "微信文章"
@@ -64,28 +66,16 @@ class WeChatProcessor:
         Returns:
             dict: 队列结果
         """
-        timestamp = datetime.now().isoformat()
-        task = {
-            'type': 'wechat_article',
-            'url': url,
-            'timestamp': timestamp,
-            'metadata': metadata or {}
-        }
-
-        # 生成任务文件名（按时间）
-        time_str = datetime.now().strftime('%Y%m%d')
-        queue_file = self.queue_dir / f"queue_{time_str}.jsonl"
-
-        # 追加到队列文件
-        with open(queue_file, 'a', encoding='utf-8') as f:
-            f.write(json.dumps(task, ensure_ascii=False) + '\n')
+        # 与 MCPBridge 共用同一任务队列
+        result = self.bridge.add_task('wechat_article', url, metadata)
+        task = self.bridge.get_task(result['task_id'])
 
-        logger.info(f"WeChat article queued: {url[:80]}... -> {queue_file.name}")
+        logger.info(f"WeChat article queued: {url[:80]}... -> {result['task_id']}")
 
         return {
             'success': True,
             'queued': True,
-            'queue_file': str(queue_file),
+            'queue_file': result['queue_file'],
             'task': task
         }
 
@@ -96,45 +86,20 @@ class WeChatProcessor:
         Returns:
             list: 任务列表
         """
-        tasks = []
-
-        # 读取所有队列文件
-        for queue_file in sorted(self.queue_dir.glob('queue_*.jsonl'), reverse=True):
-            try:
-                with open(queue_file, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        line = line.strip()
-                        if line:
-                            try:
-                                tasks.append(json.loads(line))
-                            except json.JSONDecodeError:
-                                logger.warning(f"Invalid JSON in queue: {line[:100]}")
-            except Exception as e:
-                logger.error(f"Error reading queue file {queue_file.name}: {e}")
+        tasks = self.bridge.get_tasks()
 
         logger.info(f"Found {len(tasks)} tasks in queue")
         return tasks
 
-    def clear_queue(self, queue_file=None):
+    def clear_queue(self, status=None):
         """
-        清空队列文件
+        清空队列
 
         Args:
-            queue_file: 队列文件路径（如果为None则清空所有）
+            status: 只清除该状态的任务（如果为None则清空所有）
         """
-        if queue_file:
-            try:
-                queue_file.unlink()
-                logger.info(f"Cleared queue file: {queue_file.name}")
-            except Exception as e:
-                logger.error(f"Error clearing queue {queue_file.name}: {e}")
-        else:
-            # 清空所有队列文件
-            for qf in self.queue_dir.glob('queue_*.jsonl'):
-                try:
-                    qf.unlink()
-                except Exception as e:
-                    logger.error(f"Error clearing queue {qf.name}: {e}")
+        cleared = self.bridge.delete_tasks(status)
+        logger.info(f"Cleared {cleared} queued tasks")
 
     def extract_article_metadata(self, url, html_content=None):
         """
@@ -7,6 +7,12 @@
 import requests
 import json
 import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from feishu_token_provider import get_token_provider
+from feishu_http import get_feishu_client
 
 
 class FeishuBotNotifier:
@@ -28,34 +34,22 @@ class FeishuBotNotifier:
         self.user_open_id = config.get('user_open_id')
         self.chat_id = config.get('chat_id', self.user_open_id)  # 优先使用 chat_id
 
-        self.app_access_token = None
         self.base_url = "https://open.feishu.cn/open-apis"
+        self.token_provider = get_token_provider(self.app_id, self.app_secret)
+        # 共享连接池 + 限流（触发频控时自动退避）
+        self.client = get_feishu_client(self.app_id, self.app_secret)
 
-        # 获取 app_access_token
+        # 获取 app_access_token（命中共享缓存时无网络请求）
         self._get_app_token()
 
     def _get_app_token(self):
-        """获取 app_access_token"""
-        url = f"{self.base_url}/auth/v3/app_access_token/internal"
+        """获取 app_access_token（共享缓存，过期前自动刷新；失败抛出 FeishuTokenError）"""
+        return self.token_provider.get_app_token()
 
-        payload = {
-            "app_id": self.app_id,
-            "app_secret": self.app_secret
-        }
-
-        response = requests.post(url, json=payload)
-
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("code") == 0:
-                self.app_access_token = data.get("app_access_token")
-                print(f"✓ app_access_token 获取成功: {self.app_access_token[:20] if self.app_access_token else 'None'}")
-            else:
-                error_code = data.get('code')
-                error_msg = data.get('msg', '未知错误')
-                raise Exception(f"获取 token 失败: [{error_code}] {error_msg}")
-        else:
-            raise Exception(f"请求失败: HTTP {response.status_code}")
+    @property
+    def app_access_token(self):
+        """当前有效的 app_access_token"""
+        return self._get_app_token()
 
     def send_message(self, content, max_retries=3, retry_delay=1):
         """发送消息到用户
@@ -81,7 +75,6 @@ class FeishuBotNotifier:
             receive_id = self.user_open_id
 
         headers = {
-            "Authorization": f"Bearer {self.app_access_token}",
             "Content-Type": "application/json"
         }
 
@@ -93,7 +86,7 @@ class FeishuBotNotifier:
 
         for attempt in range(max_retries):
             try:
-                response = requests.post(
+                response = self.client.post(
                     url,
                     headers=headers,
                     json=payload,
@@ -196,22 +189,19 @@ class FeishuBotNotifier:
                     }
                     multi_form = MultipartEncoder(form)
                     headers = {
-                        "Authorization": f"Bearer {self.app_access_token}",
                         "Content-Type": multi_form.content_type
                     }
-                    response = requests.post(url, headers=headers, data=multi_form, timeout=30)
+                    # 先编码为 bytes，限流退避重试时可以重复发送
+                    response = self.client.post(url, headers=headers, data=multi_form.to_string(), timeout=30)
 
                 except ImportError:
                     # 回退到标准 requests 格式（使用 'image' 字段名）
-                    headers = {
-                        "Authorization": f"Bearer {self.app_access_token}"
-                    }
                     with open(image_path, 'rb') as f:
                         files = {
                             'image_type': (None, 'message'),
-                            'image': (os.path.basename(image_path), f, 'image/png')
+                            'image': (os.path.basename(image_path), f.read(), 'image/png')
                         }
-                        response = requests.post(url, headers=headers, files=files, timeout=30)
+                    response = self.client.post(url, files=files, timeout=30)
 
                 if response.status_code == 200:
                     data = response.json()
@@ -286,7 +276,6 @@ class FeishuBotNotifier:
         url = f"{self.base_url}/im/v1/messages?receive_id_type=chat_id"
 
         headers = {
-            "Authorization": f"Bearer {self.app_access_token}",
             "Content-Type": "application/json"
         }
 
@@ -298,7 +287,7 @@ class FeishuBotNotifier:
 
         for attempt in range(max_retries):
             try:
-                response = requests.post(
+                response = self.client.post(
                     url,
                     headers=headers,
                     json=payload,
@@ -346,12 +335,12 @@ class FeishuBotNotifier:
 
         return False
 
-    def send_image_batch(self, image_paths, delay=1):
+    def send_image_batch(self, image_paths, delay=0):
         """批量发送多张图片
 
         Args:
             image_paths: 图片文件路径列表
-            delay: 每张图片之间的间隔秒数（默认1秒）
+            delay: 每张图片之间的额外间隔秒数（默认0，由共享客户端按飞书频控限流）
 
         Returns:
             dict: 发送结果统计
@@ -377,8 +366,8 @@ class FeishuBotNotifier:
                 results['failed'] += 1
                 results['details'].append({'path': image_path, 'status': 'failed'})
 
-            # 间隔 delay 秒，避免限流
-            if i < len(image_paths):
+            # 额外间隔（限流已由共享客户端处理）
+            if delay and i < len(image_paths):
                 time.sleep(delay)
 
         print(f"\n✓ 图片发送完成: 成功 {results['success']}/{results['total']}")
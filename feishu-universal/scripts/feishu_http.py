@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+"""
+飞书开放平台共享 HTTP 客户端
+
+- 进程内共享 requests.Session，keep-alive 连接池复用 TCP+TLS 连接
+- 按接口分组的令牌桶限流（贴合飞书频控档位），代替固定 sleep；
+  发消息接口另按接收者（receive_id）单独限流
+- 遇到 HTTP 429 / 99991400（触发频控）自动退避重试，优先使用飞书返回的重置时间
+- 遇到 token 无效时作废共享缓存并重试一次
+- AsyncFeishuClient：同样的限流和重试逻辑，基于 httpx.AsyncClient（供 ASGI 服务使用）
+
+使用示例：
+    from feishu_http import get_feishu_client
+
+    client = get_feishu_client(app_id, app_secret)
+    response = client.post("/im/v1/messages", params={"receive_id_type": "open_id"}, json=payload)
+"""
+
+import time
+import asyncio
+import logging
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from feishu_token_provider import get_token_provider
+
+logger = logging.getLogger(__name__)
+
+BASE_URL = "https://open.feishu.cn/open-apis"
+
+# 接口前缀 -> 每秒请求数（按最长前缀匹配，应用级共享额度）
+# 参考飞书开放平台频控：发消息应用级 50 QPS，上传图片 50 QPS，多维表格写接口 10 QPS
+RATE_LIMITS = {
+    '/auth/': 50,
+    '/im/v1/messages': 50,
+    '/im/v1/images': 50,
+    '/bitable/v1/': 10,
+}
+DEFAULT_RATE_LIMIT = 20
+
+# 接口前缀 -> 同一接收者（请求体中的 receive_id）每秒请求数
+# 飞书发消息对同一用户/群限 5 QPS
+RECIPIENT_RATE_LIMITS = {
+    '/im/v1/messages': 5,
+}
+# 接收者限流器超过该数量时，清理已空闲（令牌已补满）的限流器
+MAX_RECIPIENT_BUCKETS = 1024
+
+# 触发频控的错误码
+RATE_LIMIT_CODES = {99991400}
+# token 无效/过期的错误码
+INVALID_TOKEN_CODES = {99991661, 99991663, 99991664, 99991671}
+
+# 响应监听器 fn(api_path, status_code, code, seconds)，用于监控
+_response_listeners = []
+
+
+def add_response_listener(fn):
+    """
+    注册响应监听器（每次 HTTP 尝试后调用，包括重试）
+
+    Args:
+        fn: fn(api_path, status_code, code, seconds)，code 为飞书业务错误码（非 JSON 响应为 None）
+    """
+    _response_listeners.append(fn)
+
+
+def _notify_response(api_path, response, code, seconds):
+    for fn in _response_listeners:
+        try:
+            fn(api_path, response.status_code, code, seconds)
+        except Exception as e:
+            logger.debug(f"响应监听器异常: {e}")
+
+
+class TokenBucket:
+    """线程安全的令牌桶限流器"""
+
+    def __init__(self, rate, capacity=None):
+        """
+        Args:
+            rate: 每秒补充的令牌数
+            capacity: 桶容量（允许的突发请求数，默认等于 rate）
+        """
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """
+        预留一个令牌
+
+        Returns:
+            float: 调用方需要等待的秒数（0 表示可立即发送）
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # 允许透支：每个调用者预留自己的令牌并计算等待时间
+            self._tokens -= 1
+            return -self._tokens / self.rate if self._tokens < 0 else 0
+
+    def acquire(self):
+        """取一个令牌，不足时阻塞到可用为止"""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """服务端要求退避时，清空令牌使后续请求一起等待"""
+        with self._lock:
+            self._tokens = min(self._tokens, -seconds * self.rate)
+
+    def idle(self):
+        """令牌是否已补满（近期没有请求）"""
+        with self._lock:
+            return self._tokens + (time.monotonic() - self._updated) * self.rate >= self.capacity
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session(pool_maxsize=20):
+    """获取进程内共享的 keep-alive Session"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+        return _session
+
+
+class FeishuClient:
+    """飞书开放平台客户端（连接池 + 限流 + 自动退避）"""
+
+    def __init__(self, app_id, app_secret, max_retries=3, rate_limits=None):
+        """
+        初始化客户端
+
+        Args:
+            app_id: 飞书应用 ID
+            app_secret: 飞书应用 Secret
+            max_retries: 触发频控时的最大重试次数
+            rate_limits: 覆盖默认的接口限流配置 {前缀: QPS}
+        """
+        self.app_id = app_id
+        self.app_secret = app_secret
+        self.max_retries = max_retries
+        self.session = get_session()
+        self.token_provider = get_token_provider(app_id, app_secret)
+
+        limits = dict(RATE_LIMITS)
+        limits.update(rate_limits or {})
+        # 最长前缀优先
+        self._buckets = sorted(
+            ((prefix, TokenBucket(qps)) for prefix, qps in limits.items()),
+            key=lambda item: len(item[0]),
+            reverse=True
+        )
+        self._default_bucket = TokenBucket(DEFAULT_RATE_LIMIT)
+
+        # (前缀, receive_id) -> TokenBucket，按需创建
+        self._recipient_limits = sorted(RECIPIENT_RATE_LIMITS.items(), key=lambda item: len(item[0]), reverse=True)
+        self._recipient_buckets = {}
+        self._recipient_lock = threading.Lock()
+
+        # 统计（供监控使用）
+        self.stats = {'requests': 0, 'throttled': 0, 'token_retries': 0}
+
+    def _bucket_for(self, path):
+        for prefix, bucket in self._buckets:
+            if path.startswith(prefix):
+                return bucket
+        return self._default_bucket
+
+    def _buckets_for(self, path, payload=None):
+        """
+        获取请求需要经过的限流器（接口级 + 接收者级）
+
+        Args:
+            path: 接口路径
+            payload: 请求体（json 参数），从中读取 receive_id
+
+        Returns:
+            list: TokenBucket 列表
+        """
+        buckets = [self._bucket_for(path)]
+        receive_id = payload.get('receive_id') if isinstance(payload, dict) else None
+        if not receive_id:
+            return buckets
+
+        for prefix, qps in self._recipient_limits:
+            if path.startswith(prefix):
+                key = (prefix, receive_id)
+                with self._recipient_lock:
+                    bucket = self._recipient_buckets.get(key)
+                    if bucket is None:
+                        if len(self._recipient_buckets) >= MAX_RECIPIENT_BUCKETS:
+                            self._recipient_buckets = {
+                                k: b for k, b in self._recipient_buckets.items() if not b.idle()
+                            }
+                        bucket = self._recipient_buckets[key] = TokenBucket(qps)
+                buckets.append(bucket)
+                break
+        return buckets
+
+    def request(self, method, path, auth='app', token=None, headers=None, timeout=10, **kwargs):
+        """
+        发送请求
+
+        Args:
+            method: HTTP 方法
+            path: 接口路径（如 /im/v1/messages），也可以是完整 URL
+            auth: 'app' 使用 app_access_token，None 不带认证头
+            token: 显式指定 Bearer token（如 user_access_token），优先于 auth
+            headers: 额外请求头
+            timeout: 超时秒数
+            **kwargs: 透传给 requests（params/json/data/files）
+
+        Returns:
+            requests.Response: 最后一次响应（网络异常照常抛出）
+        """
+        url = path if path.startswith('http') else f"{BASE_URL}{path}"
+        api_path = url[len(BASE_URL):] if url.startswith(BASE_URL) else path
+        buckets = self._buckets_for(api_path, kwargs.get('json'))
+
+        token_retried = False
+        attempt = 0
+        while True:
+            request_headers = dict(headers or {})
+            bearer = token or (self.token_provider.get_app_token() if auth == 'app' else None)
+            if bearer:
+                request_headers['Authorization'] = f"Bearer {bearer}"
+
+            wait = max(bucket.reserve() for bucket in buckets)
+            if wait > 0:
+                time.sleep(wait)
+            self.stats['requests'] += 1
+            start = time.perf_counter()
+            response = self.session.request(method, url, headers=request_headers, timeout=timeout, **kwargs)
+            code = self._error_code(response)
+            _notify_response(api_path, response, code, time.perf_counter() - start)
+
+            # token 失效：作废共享缓存，重试一次
+            if auth == 'app' and not token and code in INVALID_TOKEN_CODES and not token_retried:
+                logger.warning(f"token 无效 ({code})，刷新后重试: {api_path}")
+                self.token_provider.invalidate()
+                self.stats['token_retries'] += 1
+                token_retried = True
+                continue
+
+            # 触发频控：退避后重试
+            if (response.status_code == 429 or code in RATE_LIMIT_CODES) and attempt < self.max_retries:
+                wait = self._retry_after(response, attempt)
+                logger.warning(f"触发飞书频控 ({code or response.status_code})，{wait:.1f}秒后重试: {api_path}")
+                self.stats['throttled'] += 1
+                for bucket in buckets:
+                    bucket.pause(wait)
+                time.sleep(wait)
+                attempt += 1
+                continue
+
+            return response
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    @staticmethod
+    def _error_code(response):
+        """提取飞书业务错误码（非 JSON 响应返回 None）"""
+        try:
+            return response.json().get('code')
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _retry_after(response, attempt):
+        """计算退避时间：优先使用飞书返回的频控重置时间，否则指数退避"""
+        for header in ('x-ogw-ratelimit-reset', 'Retry-After'):
+            value = response.headers.get(header)
+            if value:
+                try:
+                    return max(float(value), 0.1)
+                except ValueError:
+                    pass
+        return 0.5 * (2 ** attempt)
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_feishu_client(app_id, app_secret):
+    """
+    获取共享的飞书客户端（同一进程内同一 app_id 共用连接池和限流器）
+
+    Args:
+        app_id: 飞书应用 ID
+        app_secret: 飞书应用 Secret
+
+    Returns:
+        FeishuClient
+    """
+    with _clients_lock:
+        client = _clients.get(app_id)
+        if client is None or client.app_secret != app_secret:
+            client = FeishuClient(app_id, app_secret)
+            _clients[app_id] = client
+        return client
+
+
+class AsyncFeishuClient:
+    """飞书开放平台异步客户端（httpx 连接池 + 限流 + 自动退避）"""
+
+    def __init__(self, app_id, app_secret, max_retries=3, rate_limits=None, max_connections=100):
+        """
+        初始化客户端
+
+        Args:
+            app_id: 飞书应用 ID
+            app_secret: 飞书应用 Secret
+            max_retries: 触发频控时的最大重试次数
+            rate_limits: 覆盖默认的接口限流配置 {前缀: QPS}
+            max_connections: 连接池上限
+        """
+        import httpx  # 仅异步模式需要：pip install httpx
+
+        # 限流器、token 和统计与同步客户端共用（同一进程内共享频控额度）
+        if rate_limits:
+            self._sync = FeishuClient(app_id, app_secret, max_retries, rate_limits)
+        else:
+            self._sync = get_feishu_client(app_id, app_secret)
+        self.max_retries = max_retries
+        self.token_provider = self._sync.token_provider
+        self.stats = self._sync.stats
+        self._http = httpx.AsyncClient(
+            timeout=10,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=20)
+        )
+
+    async def _app_token(self):
+        # 缓存命中时直接返回，需要刷新时放到线程里执行，避免阻塞事件循环
+        cached = self.token_provider.peek_app_token()
+        if cached:
+            return cached
+        return await asyncio.to_thread(self.token_provider.get_app_token)
+
+    async def request(self, method, path, auth='app', token=None, headers=None, timeout=10, **kwargs):
+        """
+        发送请求（参数同 FeishuClient.request）
+
+        Returns:
+            httpx.Response: 最后一次响应（网络异常照常抛出）
+        """
+        url = path if path.startswith('http') else f"{BASE_URL}{path}"
+        api_path = url[len(BASE_URL):] if url.startswith(BASE_URL) else path
+        buckets = self._sync._buckets_for(api_path, kwargs.get('json'))
+
+        token_retried = False
+        attempt = 0
+        while True:
+            request_headers = dict(headers or {})
+            bearer = token or (await self._app_token() if auth == 'app' else None)
+            if bearer:
+                request_headers['Authorization'] = f"Bearer {bearer}"
+
+            wait = max(bucket.reserve() for bucket in buckets)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self.stats['requests'] += 1
+            start = time.perf_counter()
+            response = await self._http.request(method, url, headers=request_headers, timeout=timeout, **kwargs)
+            code = FeishuClient._error_code(response)
+            _notify_response(api_path, response, code, time.perf_counter() - start)
+
+            # token 失效：作废共享缓存，重试一次
+            if auth == 'app' and not token and code in INVALID_TOKEN_CODES and not token_retried:
+                logger.warning(f"token 无效 ({code})，刷新后重试: {api_path}")
+                self.token_provider.invalidate()
+                self.stats['token_retries'] += 1
+                token_retried = True
+                continue
+
+            # 触发频控：退避后重试
+            if (response.status_code == 429 or code in RATE_LIMIT_CODES) and attempt < self.max_retries:
+                wait = FeishuClient._retry_after(response, attempt)
+                logger.warning(f"触发飞书频控 ({code or response.status_code})，{wait:.1f}秒后重试: {api_path}")
+                self.stats['throttled'] += 1
+                for bucket in buckets:
+                    bucket.pause(wait)
+                await asyncio.sleep(wait)
+                attempt += 1
+                continue
+
+            return response
+
+    async def get(self, path, **kwargs):
+        return await self.request('GET', path, **kwargs)
+
+    async def post(self, path, **kwargs):
+        return await self.request('POST', path, **kwargs)
+
+    async def aclose(self):
+        """关闭连接池"""
+        await self._http.aclose()
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+飞书 Token 统一提供者
+
+所有技能共用的 app_access_token / tenant_access_token / user_access_token 获取入口：
+- 内存缓存 + 磁盘缓存（~/.feishu_token_cache.json），多进程通过文件锁共享
+- 按飞书返回的 expire 计算过期时间，到期前提前刷新
+- user_access_token 刷新时加锁并回写 ~/.feishu_user_config.json
+  （refresh_token 只能使用一次，多进程同时刷新会互相作废）
+
+使用示例：
+    from feishu_token_provider import get_token_provider
+
+    provider = get_token_provider(app_id, app_secret)
+    token = provider.get_app_token()
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+import requests
+
+try:
+    import fcntl
+except ImportError:  # Windows 无 fcntl，退化为仅进程内加锁
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+BASE_URL = "https://open.feishu.cn/open-apis"
+
+# 磁盘缓存和锁文件
+TOKEN_CACHE_FILE = Path.home() / '.feishu_token_cache.json'
+TOKEN_LOCK_FILE = Path.home() / '.feishu_token_cache.lock'
+
+# 用户配置（user_access_token / refresh_token 存放位置）
+USER_CONFIG_FILE = Path.home() / '.feishu_user_config.json'
+
+# 提前刷新时间（秒），飞书 token 有效期 2 小时
+DEFAULT_REFRESH_MARGIN = 300
+
+# 飞书未返回 expire 时的默认有效期（秒）
+DEFAULT_EXPIRE = 7200
+
+
+class FeishuTokenError(Exception):
+    """获取或刷新飞书 token 失败"""
+
+
+@contextmanager
+def _file_lock(lock_file):
+    """跨进程文件锁（无 fcntl 时为空操作）"""
+    lock_file = Path(lock_file)
+    lock_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_file, 'a') as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _read_json(path):
+    """读取 JSON 文件，不存在或损坏时返回空字典"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _write_json(path, data):
+    """原子写入 JSON 文件（仅本人可读写）"""
+    path = Path(path)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.chmod(tmp_path, 0o600)
+    os.replace(tmp_path, path)
+
+
+class FeishuTokenProvider:
+    """飞书应用 token 提供者（按 app_id 共享）"""
+
+    def __init__(self, app_id, app_secret, cache_file=TOKEN_CACHE_FILE,
+                 lock_file=TOKEN_LOCK_FILE, refresh_margin=DEFAULT_REFRESH_MARGIN):
+        """
+        初始化 token 提供者
+
+        Args:
+            app_id: 飞书应用 ID
+            app_secret: 飞书应用 Secret
+            cache_file: 磁盘缓存文件（None 表示仅内存缓存）
+            lock_file: 跨进程锁文件
+            refresh_margin: 距过期多少秒内视为需要刷新
+        """
+        self.app_id = app_id
+        self.app_secret = app_secret
+        self.cache_file = Path(cache_file) if cache_file else None
+        self.lock_file = Path(lock_file)
+        self.refresh_margin = refresh_margin
+
+        self._lock = threading.Lock()
+        # kind -> {'token': str, 'expires_at': float}
+        self._memory = {}
+        self.refresh_count = 0
+
+    def get_app_token(self, force_refresh=False):
+        """获取 app_access_token（自建应用 /auth/v3/app_access_token/internal）"""
+        return self._get_token('app_access_token', force_refresh)
+
+    def get_tenant_token(self, force_refresh=False):
+        """获取 tenant_access_token（/auth/v3/tenant_access_token/internal）"""
+        return self._get_token('tenant_access_token', force_refresh)
+
+    def peek_app_token(self):
+        """返回内存中仍有效的 app_access_token，不触发网络请求（无则返回 None）"""
+        entry = self._memory.get('app_access_token')
+        return entry['token'] if self._is_fresh(entry) else None
+
+    def invalidate(self, kind=None):
+        """
+        作废缓存的 token（接口返回 token 无效时调用）
+
+        Args:
+            kind: 'app_access_token' / 'tenant_access_token'，None 表示全部
+        """
+        kinds = [kind] if kind else ['app_access_token', 'tenant_access_token']
+        with self._lock, self._locked_cache() as cache:
+            for k in kinds:
+                self._memory.pop(k, None)
+                if cache is not None:
+                    cache.pop(self._cache_key(k), None)
+
+    def _cache_key(self, kind):
+        return f"{kind}:{self.app_id}"
+
+    def _is_fresh(self, entry):
+        return bool(entry) and entry.get('expires_at', 0) - self.refresh_margin > time.time()
+
+    @contextmanager
+    def _locked_cache(self):
+        """持有文件锁期间读取磁盘缓存，退出时写回"""
+        if not self.cache_file:
+            yield None
+            return
+
+        with _file_lock(self.lock_file):
+            cache = _read_json(self.cache_file)
+            before = json.dumps(cache, sort_keys=True)
+            yield cache
+            if json.dumps(cache, sort_keys=True) != before:
+                _write_json(self.cache_file, cache)
+
+    def _get_token(self, kind, force_refresh):
+        if not self.app_id or not self.app_secret:
+            raise FeishuTokenError("缺少 app_id / app_secret")
+
+        entry = self._memory.get(kind)
+        if not force_refresh and self._is_fresh(entry):
+            return entry['token']
+
+        with self._lock, self._locked_cache() as cache:
+            # 其他线程/进程可能已经刷新过
+            if not force_refresh:
+                entry = self._memory.get(kind)
+                if self._is_fresh(entry):
+                    return entry['token']
+                if cache is not None:
+                    entry = cache.get(self._cache_key(kind))
+                    if self._is_fresh(entry):
+                        self._memory[kind] = entry
+                        return entry['token']
+
+            fetched = self._fetch(kind)
+            for k, e in fetched.items():
+                self._memory[k] = e
+                if cache is not None:
+                    cache[self._cache_key(k)] = e
+
+            return fetched[kind]['token']
+
+    def _fetch(self, kind):
+        """
+        向飞书请求新 token
+
+        Returns:
+            dict: kind -> {'token', 'expires_at'}（app_access_token 接口会同时返回 tenant_access_token）
+        """
+        endpoint = 'app_access_token' if kind == 'app_access_token' else 'tenant_access_token'
+        url = f"{BASE_URL}/auth/v3/{endpoint}/internal"
+        payload = {"app_id": self.app_id, "app_secret": self.app_secret}
+
+        try:
+            response = requests.post(url, json=payload, timeout=10)
+        except requests.RequestException as e:
+            raise FeishuTokenError(f"请求 {kind} 失败: {e}")
+
+        if response.status_code != 200:
+            raise FeishuTokenError(f"请求 {kind} 失败: HTTP {response.status_code}")
+
+        data = response.json()
+        if data.get("code") != 0:
+            raise FeishuTokenError(f"获取 {kind} 失败: [{data.get('code')}] {data.get('msg')}")
+
+        expires_at = time.time() + data.get('expire', DEFAULT_EXPIRE)
+        result = {}
+        for k in ('app_access_token', 'tenant_access_token'):
+            if data.get(k):
+                result[k] = {'token': data[k], 'expires_at': expires_at}
+
+        if kind not in result:
+            raise FeishuTokenError(f"响应中没有 {kind}")
+
+        self.refresh_count += 1
+        logger.info(f"✓ 已刷新 {kind}（{int(expires_at - time.time())} 秒后过期）")
+        return result
+
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def get_token_provider(app_id, app_secret):
+    """
+    获取共享的 token 提供者（同一进程内同一 app_id 只有一个实例）
+
+    Args:
+        app_id: 飞书应用 ID
+        app_secret: 飞书应用 Secret
+
+    Returns:
+        FeishuTokenProvider
+    """
+    with _providers_lock:
+        provider = _providers.get(app_id)
+        if provider is None or provider.app_secret != app_secret:
+            provider = FeishuTokenProvider(app_id, app_secret)
+            _providers[app_id] = provider
+        return provider
+
+
+def get_user_token(config_path=USER_CONFIG_FILE, fallback_config=None, refresh_margin=1800):
+    """
+    获取有效的 user_access_token（即将过期时用 refresh_token 刷新并回写配置）
+
+    Args:
+        config_path: 用户配置文件路径
+        fallback_config: 配置文件不存在时使用的配置（如从环境变量构造），刷新后会被原地更新
+        refresh_margin: 距过期多少秒内刷新（默认 30 分钟）
+
+    Returns:
+        str: user_access_token，失败返回 None
+    """
+    config_path = Path(os.path.expanduser(str(config_path)))
+    lock_file = config_path.with_name(config_path.name + '.lock')
+
+    with _file_lock(lock_file):
+        # 在锁内重新读取，其他进程可能已刷新（旧 refresh_token 已作废）
+        config = _read_json(config_path) if config_path.exists() else fallback_config
+        if not config:
+            logger.error("飞书用户配置不存在")
+            return None
+
+        current_time = int(time.time())
+        if config.get('user_access_token') and config.get('expires_at', 0) - current_time > refresh_margin:
+            if fallback_config is not None and fallback_config is not config:
+                fallback_config.update(config)
+            return config['user_access_token']
+
+        logger.info('Token 即将过期，正在刷新...')
+
+        app_id = config.get('app_id')
+        app_secret = config.get('app_secret')
+        refresh_token = config.get('refresh_token')
+        if not all([app_id, app_secret, refresh_token]):
+            logger.error("飞书配置不完整，无法刷新 token")
+            return None
+
+        url = f"{BASE_URL}/authen/v1/refresh_access_token"
+        headers = {'Content-Type': 'application/json; charset=utf-8'}
+        payload = {
+            'grant_type': 'refresh_token',
+            'refresh_token': refresh_token,
+            'app_id': app_id,
+            'app_secret': app_secret
+        }
+
+        try:
+            result = requests.post(url, headers=headers, json=payload, timeout=10).json()
+        except Exception as e:
+            logger.error(f'Token 刷新异常: {e}')
+            return None
+
+        if result.get('code') != 0:
+            logger.error(f'刷新 Token 失败: {result.get("msg")}')
+            return None
+
+        config['user_access_token'] = result['data']['access_token']
+        config['refresh_token'] = result['data']['refresh_token']
+        config['expires_at'] = current_time + result['data']['expires_in']
+        _write_json(config_path, config)
+
+        if fallback_config is not None and fallback_config is not config:
+            fallback_config.update(config)
+
+        logger.info('✅ Token 刷新成功')
+        return config['user_access_token']
@@ -10,14 +10,17 @@
 - 字段自动创建
 """
 
-import requests
 import json
 import pandas as pd
-import time
 import os
+import sys
 from datetime import datetime
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent))
+from feishu_token_provider import get_token_provider
+from feishu_http import get_feishu_client
+
 
 class FeishuBotNotifier:
     """飞书机器人通知器（使用应用身份发送消息）"""
@@ -27,32 +30,24 @@ class FeishuBotNotifier:
         self.app_id = app_id
         self.app_secret = app_secret
         self.user_open_id = user_open_id
-        self.tenant_access_token = None
         self.base_url = "https://open.feishu.cn/open-apis"
+        self.token_provider = get_token_provider(app_id, app_secret)
+        self.client = get_feishu_client(app_id, app_secret)
         self._get_tenant_token()
 
     def _get_tenant_token(self):
-        """获取 tenant_access_token"""
-        url = f"{self.base_url}/auth/v3/app_access_token/internal"
-        payload = {"app_id": self.app_id, "app_secret": self.app_secret}
-        response = requests.post(url, json=payload)
+        """获取 tenant_access_token（共享缓存，过期前自动刷新）"""
+        return self.token_provider.get_app_token()
 
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("code") == 0:
-                self.tenant_access_token = data.get("app_access_token")
-                return
-        raise Exception(f"获取 tenant_access_token 失败")
+    @property
+    def tenant_access_token(self):
+        """当前有效的 token"""
+        return self._get_tenant_token()
 
     def send_notification(self, content):
         """发送通知消息"""
-        # 确保token有效
-        if not self.tenant_access_token:
-            self._get_tenant_token()
-
         url = f"{self.base_url}/im/v1/messages?receive_id_type=open_id"
         headers = {
-            "Authorization": f"Bearer {self.tenant_access_token}",
             "Content-Type": "application/json"
         }
         payload = {
@@ -60,7 +55,7 @@ class FeishuBotNotifier:
             "msg_type": "text",
             "content": json.dumps({"text": content})
         }
-        response = requests.post(url, headers=headers, json=payload)
+        response = self.client.post(url, headers=headers, json=payload)
 
         if response.status_code == 200:
             data = response.json()
@@ -94,40 +89,29 @@ class FeishuTenantClient:
         self.folder_token = self.config.get('folder_token', '')
         self.target_table = self.config.get('target_table', {})
 
-        self.tenant_access_token = None
         self.base_url = "https://open.feishu.cn/open-apis"
+        self.token_provider = get_token_provider(self.app_id, self.app_secret)
+        # 共享连接池 + 限流（触发频控时自动退避）
+        self.client = get_feishu_client(self.app_id, self.app_secret)
 
-        # 初始化时获取 token
+        # 初始化时获取 token（命中共享缓存时无网络请求）
         self._get_tenant_token()
 
         # 创建通知器
         self.notifier = FeishuBotNotifier(self.app_id, self.app_secret, self.user_open_id)
 
     def _get_tenant_token(self):
-        """获取 tenant_access_token"""
-        url = f"{self.base_url}/auth/v3/app_access_token/internal"
+        """获取 tenant_access_token（共享缓存，过期前自动刷新；失败抛出 FeishuTokenError）"""
+        return self.token_provider.get_app_token()
 
-        payload = {
-            "app_id": self.app_id,
-            "app_secret": self.app_secret
-        }
-
-        response = requests.post(url, json=payload)
-
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("code") == 0:
-                self.tenant_access_token = data.get("app_access_token")
-                return
-            else:
-                raise Exception(f"获取 tenant_access_token 失败: {data.get('msg')}")
-        else:
-            raise Exception(f"请求失败: {response.status_code}")
+    @property
+    def tenant_access_token(self):
+        """当前有效的 token"""
+        return self._get_tenant_token()
 
     def _ensure_token(self):
-        """确保 token 有效（tenant_token 2小时有效，可以重新获取）"""
-        if not self.tenant_access_token:
-            self._get_tenant_token()
+        """确保 token 有效（tenant_token 2小时有效，到期前由 token 提供者自动刷新）"""
+        self._get_tenant_token()
 
     # ==================== Base 操作 ====================
 
@@ -146,7 +130,6 @@ class FeishuTenantClient:
         url = f"{self.base_url}/bitable/v1/apps"
 
         headers = {
-            "Authorization": f"Bearer {self.tenant_access_token}",
             "Content-Type": "application/json"
         }
 
@@ -160,7 +143,7 @@ class FeishuTenantClient:
         elif self.folder_token:
             payload["folder_token"] = self.folder_token
 
-        response = requests.post(url, headers=headers, json=payload)
+        response = self.client.post(url, headers=headers, json=payload)
 
         if response.status_code == 200:
             data = response.json()
@@ -189,11 +172,10 @@ class FeishuTenantClient:
         url = f"{self.base_url}/bitable/v1/apps/{app_token}/tables"
 
         headers = {
-            "Authorization": f"Bearer {self.tenant_access_token}",
             "Content-Type": "application/json"
         }
 
-        response = requests.get(url, headers=headers)
+        response = self.client.get(url, headers=headers)
 
         if response.status_code == 200:
             data = response.json()
@@ -222,11 +204,10 @@ class FeishuTenantClient:
         url = f"{self.base_url}/bitable/v1/apps/{app_token}/tables/{table_id}/fields"
 
         headers = {
-            "Authorization": f"Bearer {self.tenant_access_token}",
             "Content-Type": "application/json"
         }
 
-        response = requests.get(url, headers=headers)
+        response = self.client.get(url, headers=headers)
 
         if response.status_code == 200:
             data = response.json()
@@ -255,7 +236,6 @@ class FeishuTenantClient:
         url = f"{self.base_url}/bitable/v1/apps/{app_token}/tables/{table_id}/fields"
 
         headers = {
-            "Authorization": f"Bearer {self.tenant_access_token}",
             "Content-Type": "application/json"
         }
 
@@ -264,7 +244,7 @@ class FeishuTenantClient:
             "type": field_type
         }
 
-        response = requests.post(url, headers=headers, json=payload)
+        response = self.client.post(url, headers=headers, json=payload)
 
         if response.status_code == 200:
             data = response.json()
@@ -375,7 +355,6 @@ class FeishuTenantClient:
             url = f"{self.base_url}/bitable/v1/apps/{app_token}/tables/{table_id}/records/batch_create"
 
             headers = {
-                "Authorization": f"Bearer {self.tenant_access_token}",
                 "Content-Type": "application/json"
             }
 
@@ -383,7 +362,8 @@ class FeishuTenantClient:
                 "records": batch
             }
 
-            response = requests.post(url, headers=headers, json=payload)
+            # 限流由共享客户端按多维表格频控处理，无需固定延迟
+            response = self.client.post(url, headers=headers, json=payload, timeout=30)
 
             if response.status_code == 200:
                 data = response.json()
@@ -398,9 +378,6 @@ class FeishuTenantClient:
                 print(f"✗ 批次 {i//batch_size + 1} 请求失败: {response.status_code}")
                 failed += len(batch)
 
-            # 延迟避免超限
-            time.sleep(0.5)
-
         print(f"\n导入完成: {created} 条成功, {failed} 条失败")
 
         # 发送飞书消息通知
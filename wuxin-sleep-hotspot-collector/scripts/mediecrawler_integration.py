@@ -4,7 +4,7 @@ MediaCrawler 集成脚本
 
 功能：
 1. 调用 MediaCrawler 采集小红书数据
-2. 读取采集的 JSON 数据
+2. 读取采集的 JSON 数据（流式逐条读取，大文件内存占用恒定）
 3. 转换并保存到 Skill 数据目录
 4. 下载视频和封面图片
 
@@ -26,6 +26,10 @@ from pathlib import Path
 import argparse
 import re
 
+# 与 feishu-bot 共用 JSON 流式读取
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "feishu-bot" / "scripts"))
+from json_stream import iter_json_items
+
 
 class MediaCrawlerIntegration:
     """MediaCrawler 集成器"""
@@ -172,11 +176,14 @@ class MediaCrawlerIntegration:
         finally:
             os.chdir(original_dir)
 
-    def read_mediacrawler_data(self):
+    def read_mediacrawler_data(self, stream=False):
         """读取 MediaCrawler 采集的数据
 
+        Args:
+            stream: 为 True 时返回逐条读取的生成器（不把整个文件载入内存）
+
         Returns:
-            list: 采集的笔记列表
+            list: 采集的笔记列表（stream=True 时为生成器）
         """
         all_posts = []
 
@@ -193,15 +200,29 @@ class MediaCrawlerIntegration:
 
         print(f"✓ 读取数据: {latest_file}")
 
+        if stream:
+            return self._stream_posts(latest_file)
+
         try:
-            with open(latest_file, "r", encoding="utf-8") as f:
-                all_posts = json.load(f)
+            all_posts = list(iter_json_items(latest_file))
             print(f"✓ 共读取 {len(all_posts)} 条笔记")
         except Exception as e:
             print(f"✗ 读取数据失败: {e}")
 
         return all_posts
 
+    def _stream_posts(self, json_file):
+        """逐条读取笔记，文件损坏时保留已读取的部分"""
+        count = 0
+        try:
+            for post in iter_json_items(json_file):
+                count += 1
+                yield post
+        except Exception as e:
+            print(f"✗ 读取数据失败（已读取 {count} 条）: {e}")
+        else:
+            print(f"✓ 共读取 {count} 条笔记")
+
     def convert_posts(self, posts):
         """转换笔记数据格式
 
@@ -327,19 +348,18 @@ class MediaCrawlerIntegration:
         if not success:
             print("\n⚠️  采集失败，尝试读取已有数据...")
 
-        # 4. 读取数据
+        # 4-5. 逐条读取并转换数据（不保留原始数据）
         print("\n[4/6] 读取采集数据...")
-        posts = self.read_mediacrawler_data()
+        posts = self.read_mediacrawler_data(stream=True)
+
+        print("\n[5/6] 转换数据格式...")
+        converted_posts = self.convert_posts(posts)
 
-        if not posts:
+        if not converted_posts:
             print("✗ 没有采集到数据")
             self.restore_config()
             return []
 
-        # 5. 转换数据
-        print("\n[5/6] 转换数据格式...")
-        converted_posts = self.convert_posts(posts)
-
         # 6. 保存数据
         print("\n[6/6] 保存数据...")
         sorted_posts = self.save_posts(converted_posts)
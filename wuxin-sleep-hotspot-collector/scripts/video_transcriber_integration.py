@@ -4,12 +4,13 @@
 
 功能：
 1. 下载视频文件
-2. 使用 video-scripts-extract Skill 转换为文字
+2. 使用常驻转写服务（feishu-bot/scripts/transcription_service.py，faster-whisper）
+   转换为文字：模型只加载一次，下载与转写并行
 3. 保存转写结果
 
 依赖：
-- video-scripts-extract Skill
-- DASHSCOPE_API_KEY 环境变量
+- pip install faster-whisper
+- ffmpeg
 
 作者：大秘书系统
 版本：v1.0.0
@@ -17,7 +18,6 @@
 """
 
 import json
-import os
 import subprocess
 import sys
 from datetime import datetime
@@ -25,6 +25,9 @@ from pathlib import Path
 import argparse
 import urllib.request
 
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "feishu-bot" / "scripts"))
+from transcription_service import get_transcription_service, is_available
+
 
 class VideoTranscriberIntegration:
     """视频转文字集成器"""
@@ -34,11 +37,11 @@ class VideoTranscriberIntegration:
         self.skill_dir = Path(__file__).parent.parent
         self.data_dir = self.skill_dir / "data"
 
-        # 检查环境变量
-        self.api_key = os.environ.get("DASHSCOPE_API_KEY")
-        if not self.api_key:
-            print("⚠️  警告: DASHSCOPE_API_KEY 环境变量未设置")
-            print("⚠️  请设置: export DASHSCOPE_API_KEY=your_key_here")
+        # 转写服务（进程内共享，模型在第一次转写时加载）
+        self.transcriber = get_transcription_service() if is_available() else None
+        if self.transcriber is None:
+            print("⚠️  警告: 未安装 faster-whisper，无法转写")
+            print("⚠️  请安装: pip install faster-whisper")
 
     def download_video(self, video_url, output_path):
         """下载视频文件
@@ -67,59 +70,47 @@ class VideoTranscriberIntegration:
             video_path: 视频文件路径
 
         Returns:
-            str: 转写文字
+            str: 转写文字（失败时返回 None）
         """
         print(f"转写视频: {video_path}")
-
-        # TODO: 调用 video-scripts-extract Skill
-        # 这里需要集成 video-scripts-extract Skill 的 API
-        # 目前返回示例数据
-
-        # 模拟调用 Skill
-        # transcript = self._call_video_skill(video_path)
-
-        # 示例返回
-        transcript = "示例转写文字内容"
-
-        print(f"✓ 转写完成，字数: {len(transcript)}")
-        return transcript
+        return self._transcribe(video_path)
 
     def transcribe_audio_url(self, audio_url):
-        """转写音频 URL 为文字
+        """转写音频 URL 为文字（ffmpeg 直接读取 URL，无需先下载）
 
         Args:
             audio_url: 音频 URL
 
         Returns:
-            str: 转写文字
+            str: 转写文字（失败时返回 None）
         """
         print(f"转写音频 URL: {audio_url}")
+        return self._transcribe(audio_url)
 
-        # TODO: 使用 douyin MCP 的 recognize_audio_url
-        # transcript = mcp__douyin__recognize_audio_url(audio_url)
-
-        # 示例返回
-        transcript = "示例转写文字内容"
-
-        print(f"✓ 转写完成")
-        return transcript
-
-    def _call_video_skill(self, video_path):
-        """调用 video-scripts-extract Skill
+    def _transcribe(self, source):
+        """调用转写服务
 
         Args:
-            video_path: 视频文件路径
+            source: 文件路径或 URL
 
         Returns:
-            str: 转写文字
+            str: 转写文字（失败时返回 None）
         """
-        # TODO: 实现 Skill 调用
-        # 可能的方法：
-        # 1. 使用 subprocess 调用 Skill CLI
-        # 2. 直接导入 Skill 模块
-        # 3. 使用 MCP 协议调用
+        if self.transcriber is None:
+            print("✗ 转写服务不可用")
+            return None
 
-        return "示例转写文字"
+        try:
+            result = self.transcriber.transcribe(source)
+        except Exception as e:
+            print(f"✗ 转写失败: {e}")
+            return None
+
+        if result.get('cached'):
+            print(f"✓ 转写完成（缓存），字数: {len(result['text'])}")
+        else:
+            print(f"✓ 转写完成，字数: {len(result['text'])}（{result['duration']:.0f}s 音频，{result['elapsed']:.1f}s）")
+        return result['text']
 
     def process_post_video(self, post, output_dir):
         """处理单条笔记的视频
@@ -205,12 +196,40 @@ class VideoTranscriberIntegration:
         (output_dir / "videos").mkdir(exist_ok=True)
         (output_dir / "transcripts").mkdir(exist_ok=True)
 
-        # 处理每条视频笔记
+        if self.transcriber is None:
+            print("✗ 转写服务不可用")
+            return 0
+
+        # 逐条下载，下载完成即加入转写队列（转写与后续下载并行）
         success_count = 0
+        pending = []
         for i, post in enumerate(video_posts, 1):
             print(f"\n[{i}/{len(video_posts)}] 处理: {post.get('title', '未知标题')[:30]}")
 
-            if self.process_post_video(post, output_dir):
+            note_id = post.get("id", "unknown")
+            video_path = output_dir / "videos" / f"{note_id}.mp4"
+            transcript_path = output_dir / "transcripts" / f"{note_id}.txt"
+
+            # 检查是否已转写
+            if transcript_path.exists():
+                print(f"✓ 转写文件已存在: {transcript_path}")
+                success_count += 1
+                continue
+
+            if self.download_video(post["video_url"], video_path):
+                pending.append((transcript_path, self.transcriber.submit(str(video_path))))
+
+        # 收集转写结果
+        for transcript_path, future in pending:
+            try:
+                transcript = future.result()['text']
+            except Exception as e:
+                print(f"✗ 转写失败 {transcript_path.stem}: {e}")
+                continue
+            if transcript:
+                with open(transcript_path, "w", encoding="utf-8") as f:
+                    f.write(transcript)
+                print(f"✓ 转写已保存: {transcript_path}")
                 success_count += 1
 
         print("\n" + "=" * 80)
@@ -2,12 +2,20 @@
 # -*- coding: utf-8 -*-
 """
 数据处理器 - 清洗数据、计算互动分、筛选TOP、处理媒体文件
+
+媒体文件经 feishu-bot 的内容寻址存储（media_store）导入，
+输出目录中为硬链接，同一图片/视频在磁盘上只保存一份
 """
 
+import sys
 import pandas as pd
 import shutil
 from pathlib import Path
 
+# 与 feishu-bot 共用媒体存储
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / 'feishu-bot' / 'scripts'))
+from media_store import get_media_store
+
 
 def convert_count(val):
     """转换互动数为数值"""
@@ -28,7 +36,21 @@ class DataProcessor:
     """数据处理器"""
 
     def __init__(self):
-        pass
+        try:
+            self.media_store = get_media_store()
+        except Exception as e:
+            print(f"  ⚠ 媒体存储不可用，改为直接复制文件: {e}")
+            self.media_store = None
+
+    def _copy_media(self, src, dest):
+        """复制媒体文件（经媒体存储去重，失败时退回普通复制）"""
+        if self.media_store:
+            try:
+                self.media_store.import_file(src, dest)
+                return
+            except Exception as e:
+                print(f"    媒体存储写入失败，改为直接复制 {Path(src).name}: {e}")
+        shutil.copy2(str(src), str(dest))
 
     def process(self, json_data, keywords, temp_dir):
         """处理数据并返回TOP笔记和媒体文件"""
@@ -151,7 +173,7 @@ class DataProcessor:
                         output_image_folder = media_data_path / "images" / f"{safe_title}_{note_id}"
                         output_image_folder.mkdir(parents=True, exist_ok=True)
                         for img_file in image_files:
-                            shutil.copy2(str(img_file), str(output_image_folder / img_file.name))
+                            self._copy_media(img_file, output_image_folder / img_file.name)
                         media_path = str(output_image_folder / image_files[0].name)
             elif not media_path and image_folder.exists():
                 # 文件夹已存在（可能是hash格式或已正确命名）
@@ -169,9 +191,8 @@ class DataProcessor:
                     for vf in video_files:
                         if not vf.is_dir():
                             # 复制并重命名
-                            import shutil
                             new_name = f"{safe_title}_{note_id}{vf.suffix}"
-                            shutil.copy2(str(vf), str(media_data_path / "videos" / new_name))
+                            self._copy_media(vf, media_data_path / "videos" / new_name)
                             media_path = str(media_data_path / "videos" / new_name)
                             break
 